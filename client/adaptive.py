@@ -0,0 +1,85 @@
+# =========================================================
+# SR04 Groupe 9 - Module de budget de latence
+# Fichier : client/adaptive.py
+# Description :
+#   Adaptation du modèle et de la résolution d’entrée à un budget par image
+#   - Échelle de réglages (modèle, imgsz), du plus précis au plus léger
+#   - Moyenne glissante exponentielle (EMA) du temps d’inférence mesuré
+#   - Hystérésis : on descend au-dessus du budget, on ne remonte que nettement en dessous
+#   - Délai minimal entre deux changements (cooldown) et mémoire du coût de chaque niveau :
+#     pas de remontée vers un réglage déjà mesuré trop lent récemment
+# =========================================================
+
+# --- Réglages disponibles, du plus coûteux au plus léger (imgsz multiple de 32) ---
+LADDER = (
+    ("yolov8s.pt", 640),
+    ("yolov8n.pt", 640),
+    ("yolov8n.pt", 480),
+    ("yolov8n.pt", 320),
+)
+DEFAULT_IMGSZ = 640
+
+
+class AdaptiveController:
+    """
+    Choisit le niveau de l’échelle à partir des temps d’inférence observés.
+    Utilisation : observe(ms) après chaque image -> True si le réglage a changé.
+    """
+
+    def __init__(self, budget_ms, ladder=LADDER, start=None, alpha=0.2,
+                 up_ratio=0.6, cooldown=30, memory=600):
+        """
+        :param budget_ms: temps d’inférence visé par image
+        :param start: réglage initial (modèle, imgsz), sinon le premier de l’échelle
+        :param alpha: poids d’une nouvelle mesure dans l’EMA
+        :param up_ratio: remontée seulement si EMA < up_ratio × budget
+        :param cooldown: images minimales entre deux changements
+        :param memory: durée (images) pendant laquelle le coût mesuré d’un niveau reste valable
+        """
+        self.budget_ms = budget_ms
+        self.ladder = list(ladder)
+        if start is not None and start not in self.ladder:
+            self.ladder.insert(0, start)
+        self.level = self.ladder.index(start) if start is not None else 0
+        self.alpha = alpha
+        self.up_ratio = up_ratio
+        self.cooldown = cooldown
+        self.memory = memory
+        self.ema = None
+        self.frames = 0
+        self.changed_at = 0
+        self.known = {}  # niveau -> (EMA au moment de le quitter, n° d’image)
+        self.changes = 0
+
+    # --- Réglage actif ---
+    @property
+    def setting(self):
+        return self.ladder[self.level]
+
+    @property
+    def label(self):
+        model, imgsz = self.setting
+        return f"{model.rsplit('.', 1)[0]}@{imgsz}"
+
+    # --- Décision ---
+    def observe(self, inference_ms):
+        self.frames += 1
+        self.ema = inference_ms if self.ema is None else \
+            self.alpha * inference_ms + (1 - self.alpha) * self.ema
+        if self.frames - self.changed_at < self.cooldown:
+            return False
+        if self.ema > self.budget_ms and self.level < len(self.ladder) - 1:
+            return self._move(+1)
+        if self.ema < self.up_ratio * self.budget_ms and self.level > 0:
+            cost = self.known.get(self.level - 1)
+            if cost is None or self.frames - cost[1] > self.memory or cost[0] <= self.budget_ms:
+                return self._move(-1)
+        return False
+
+    def _move(self, step):
+        self.known[self.level] = (self.ema, self.frames)
+        self.level += step
+        self.ema = None  # le nouveau niveau est mesuré à partir de zéro
+        self.changed_at = self.frames
+        self.changes += 1
+        return True
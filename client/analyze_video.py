@@ -0,0 +1,191 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : client/analyze_video.py
+# Description :
+#   Analyse hors ligne d’une vidéo enregistrée, aussi vite que le matériel le permet
+#   - La vidéo est découpée en plages d’images réparties sur plusieurs processus
+#   - Chaque processus charge son propre modèle (VehicleDetector)
+#   - Résultat fusionné : chronologie compacte par image (.npz : comptages + boîtes)
+#     et trace CSV (frame, timestamp, vehicle_count) pour server/simulator.py,
+#     server/tuner.py et client/load_generator.py --trace
+#
+# Exemple :
+#   python client/analyze_video.py uploads/2.mp4 --workers 4
+#   python server/simulator.py uploads/2_counts.csv
+# =========================================================
+
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+import numpy as np
+
+MODEL_NAME = "yolov8n.pt"
+MIN_SHARD = 200  # images par plage au minimum (le chargement du modèle a un coût)
+
+_detector = None  # un détecteur par processus de travail
+
+
+def _init_worker(model_name, threads):
+    """Initialisation d’un processus : limite des threads de calcul puis chargement du modèle."""
+    global _detector
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from detector import VehicleDetector
+    _detector = VehicleDetector(model_name=model_name)
+
+
+def _open_at(path, start):
+    """Ouvre la vidéo positionnée sur l’image `start` (repli sur une lecture séquentielle)."""
+    cap = cv2.VideoCapture(path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != start:
+            # Positionnement imprécis pour ce codec : on avance image par image
+            cap.release()
+            cap = cv2.VideoCapture(path)
+            for _ in range(start):
+                if not cap.grab():
+                    break
+    return cap
+
+
+def analyze_range(path, start, stop, stride):
+    """
+    Détecte les véhicules sur les images [start, stop[ (une sur `stride`).
+    :return: (n° d’images, boîtes par image)
+    """
+    cap = _open_at(path, start)
+    frames, boxes = [], []
+    index = start
+    while index < stop:
+        if (index - start) % stride:
+            ok = cap.grab()  # image sautée : pas de décodage complet
+        else:
+            ok, frame = cap.read()
+            if ok:
+                frames.append(index)
+                boxes.append(_detector.detect_boxes(frame))
+        if not ok:
+            break
+        index += 1
+    cap.release()
+    return frames, boxes
+
+
+def make_shards(total, workers, stride):
+    """Plages d’images de taille égale (au moins MIN_SHARD), alignées sur le pas."""
+    count = max(1, min(workers * 4, total // MIN_SHARD))
+    size = -(-total // count)
+    size += (-size) % stride
+    return [(a, min(total, a + size)) for a in range(0, total, size)]
+
+
+# =========================================================
+# 🔹 Écriture des résultats
+# =========================================================
+def write_timeline(path, frames, boxes, fps, model_name, video):
+    """Même format que detection_cache.py : décalages + boîtes int16 + classes uint8."""
+    classes = sorted({b[4] for per_frame in boxes for b in per_frame})
+    class_index = {c: i for i, c in enumerate(classes)}
+    counts = np.array([len(b) for b in boxes], dtype=np.uint16)
+    offsets = np.concatenate(([0], np.cumsum(counts, dtype=np.int64)))
+    flat = [b for per_frame in boxes for b in per_frame]
+    np.savez_compressed(
+        path,
+        frames=np.array(frames, dtype=np.int64),
+        counts=counts,
+        offsets=offsets,
+        boxes=np.array([b[:4] for b in flat], dtype=np.int16).reshape(-1, 4),
+        labels=np.array([class_index[b[4]] for b in flat], dtype=np.uint8),
+        classes=np.array(classes, dtype=str),
+        fps=np.array(fps),
+        model=np.array(model_name),
+        video=np.array(os.path.basename(video)),
+    )
+
+
+def write_trace(path, frames, boxes, fps):
+    """Trace de comptage lisible par le simulateur et le générateur de charge."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["frame", "timestamp", "vehicle_count"])
+        for frame, per_frame in zip(frames, boxes):
+            writer.writerow([frame, round(frame / fps, 3), len(per_frame)])
+
+
+# =========================================================
+# 🔹 Point d’entrée
+# =========================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse hors ligne d’une vidéo, répartie sur plusieurs processus")
+    parser.add_argument("video", help="fichier vidéo")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="processus de détection (un modèle chacun)")
+    parser.add_argument("--stride", type=int, default=1, help="analyser une image sur N")
+    parser.add_argument("--output", help="préfixe des fichiers de sortie (défaut : <vidéo>)")
+    parser.add_argument("--fill-cache", action="store_true",
+                        help="remplir aussi le cache des détections (rejeu sans inférence)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cap = cv2.VideoCapture(args.video)
+    if not cap.isOpened():
+        raise SystemExit(f"❌ Impossible d’ouvrir la vidéo : {args.video}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.release()
+    if total <= 0:
+        raise SystemExit("❌ Nombre d’images inconnu pour cette vidéo")
+
+    shards = make_shards(total, args.workers, args.stride)
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    print(f"🎞️ {total} images ({total / fps / 60:.1f} min à {fps:.1f} img/s), "
+          f"{len(shards)} plages sur {args.workers} processus")
+
+    t0 = time.perf_counter()
+    results = {}
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.model, threads)) as pool:
+        futures = {pool.submit(analyze_range, args.video, a, b, args.stride): a for a, b in shards}
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            elapsed = time.perf_counter() - t0
+            print(f"   plage {done}/{len(shards)} terminée ({elapsed:.0f} s)")
+
+    frames, boxes = [], []
+    for start in sorted(results):
+        frames.extend(results[start][0])
+        boxes.extend(results[start][1])
+    wall = time.perf_counter() - t0
+
+    prefix = args.output or os.path.splitext(args.video)[0]
+    write_timeline(prefix + "_timeline.npz", frames, boxes, fps, args.model, args.video)
+    write_trace(prefix + "_counts.csv", frames, boxes, fps)
+    print(f"✅ {len(frames)} images analysées en {wall:.1f} s "
+          f"(×{total / fps / wall:.1f} temps réel) -> {prefix}_timeline.npz, {prefix}_counts.csv")
+
+    if args.fill_cache:
+        from detection_cache import DetectionCache
+        from adaptive import DEFAULT_IMGSZ
+        from ultralytics import YOLO
+        # Même clé que VehicleDetector (réglage par défaut des processus) : poids résolus par Ultralytics
+        weights = getattr(YOLO(args.model), "ckpt_path", None)
+        cache = DetectionCache(args.model, DEFAULT_IMGSZ, fast=False, weights=weights)
+        cache.bind(args.video)
+        for frame, per_frame in zip(frames, boxes):
+            cache.put(frame, per_frame)
+        cache.flush()
+        print(f"🗃️ Cache des détections rempli ({len(frames)} images)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : client/client_fanout.py
+# Description :
+#   Comparaison des protocoles à partir d’une seule détection
+#   - La vidéo est lue une fois, YOLO n’est exécuté qu’une fois par image
+#   - Chaque comptage est envoyé au même instant à tous les serveurs (HTTP / WS / MQTT / Local)
+#   - Une image n’est traitée qu’après la réponse de tous les protocoles :
+#     les séries de latence sont alignées image par image (colonne seq)
+#   - Résultats au format lu par latency_comparator.py (<dossier>/latency_<proto>.csv)
+#
+# Exemple :
+#   python client/client_fanout.py video.mp4 --protocols http,ws,mqtt --frames 2000
+#   python latency_comparator.py fanout
+# =========================================================
+
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import cv2
+from detector import VehicleDetector
+from load_generator import LAT_FILES, percentile
+from transports import PROTOCOLS, make_transport
+
+# ---------- Configuration ----------
+MODEL_NAME = "yolov8n.pt"
+OUTPUT_DIR = "fanout"
+WINDOW_TITLE = "SR04 - Détection de trafic (comparaison simultanée)"
+CSV_HEADER = ["timestamp", "latency_ms", "msg_size_bytes", "vehicle_count", "seq", "error"]
+# -----------------------------------
+
+
+class Sender:
+    """Un protocole : transport persistant, reconnexion après une erreur, lignes CSV."""
+
+    def __init__(self, protocol, timeout):
+        self.protocol = protocol
+        self.transport = make_transport(protocol, client_id="fanout", timeout=timeout)
+        self.connected = False
+        self.rows = []
+
+    def send(self, payload, msg_size):
+        try:
+            if not self.connected:
+                self.transport.connect()
+                self.connected = True
+            t_start = time.perf_counter()
+            reply = self.transport.send(payload)
+            latency = (time.perf_counter() - t_start) * 1000
+            self.rows.append([time.time(), round(latency, 3), msg_size,
+                              payload["vehicle_count"], payload["seq"], ""])
+            return reply.get("led")
+        except Exception as e:
+            self.rows.append([time.time(), 0.0, msg_size, payload["vehicle_count"],
+                              payload["seq"], type(e).__name__])
+            try:
+                self.transport.close()
+            except Exception:
+                pass
+            self.connected = False
+            return None
+
+    def flush(self, path):
+        """Ajoute les lignes accumulées au fichier de latence."""
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(self.rows)
+        self.rows.clear()
+
+    def close(self):
+        try:
+            self.transport.close()
+        except Exception:
+            pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Envoi simultané des comptages à tous les protocoles")
+    parser.add_argument("source", nargs="?", default="0", help="fichier vidéo ou index de caméra (0)")
+    parser.add_argument("--protocols", default="http,ws,mqtt",
+                        help="protocoles, séparés par des virgules (http, ws, mqtt, uds)")
+    parser.add_argument("--frames", type=int, default=0, help="nombre d’images (0 = toute la vidéo)")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--timeout", type=float, default=1.0, help="délai max d’une réponse (s)")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="dossier des fichiers latency_<proto>.csv")
+    parser.add_argument("--show", action="store_true", help="afficher la vidéo annotée")
+    parser.add_argument("--cache", action="store_true",
+                        help="réutiliser les détections en cache (vidéo déjà analysée)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    protocols = [p.strip() for p in args.protocols.split(",") if p.strip()]
+    for p in protocols:
+        if p not in PROTOCOLS:
+            raise SystemExit(f"Protocole inconnu : {p} (choix : {', '.join(PROTOCOLS)})")
+
+    # --- Fichiers de sortie (recréés à chaque exécution) ---
+    os.makedirs(args.output, exist_ok=True)
+    paths = {p: os.path.join(args.output, LAT_FILES[p]) for p in protocols}
+    for path in paths.values():
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(CSV_HEADER)
+
+    detector = VehicleDetector(model_name=args.model, cache=args.cache)
+    source = int(args.source) if args.source.isdigit() else args.source
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise SystemExit(f"❌ Impossible d’ouvrir la source vidéo : {args.source}")
+    is_video = isinstance(source, str)
+    if is_video:
+        detector.open_video(source)
+
+    senders = {p: Sender(p, args.timeout) for p in protocols}
+    # Un thread par protocole : tous les envois d’une image partent ensemble
+    pool = ThreadPoolExecutor(max_workers=len(senders))
+    seq = 0
+    led = "red"
+    t0 = time.perf_counter()
+    try:
+        while not args.frames or seq < args.frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            # Lecture séquentielle depuis le début : n° d’image = seq
+            boxes = detector.detect_boxes(frame, seq if is_video else None)
+            count = len(boxes)
+
+            payload = {"vehicle_count": count, "seq": seq}
+            msg_size = len(json.dumps(payload).encode())
+            futures = {p: pool.submit(s.send, payload, msg_size) for p, s in senders.items()}
+            wait(futures.values())
+            replies = [f.result() for f in futures.values()]
+            led = next((r for r in replies if r), led)
+            seq += 1
+
+            if args.show:
+                detector.draw_boxes(frame, boxes)
+                detector.draw_traffic_light(frame, led)
+                cv2.putText(frame, f"Vehicules : {count}", (10, 95),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+                cv2.imshow(WINDOW_TITLE, frame)
+                if cv2.waitKey(1) & 0xFF == 27:  # ESC
+                    break
+            if seq % 100 == 0:
+                for p, s in senders.items():
+                    s.flush(paths[p])
+                print(f"⏱️ {seq} images ({seq / (time.perf_counter() - t0):.1f} img/s)")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        detector.close_video()
+        if args.show:
+            cv2.destroyAllWindows()
+        pool.shutdown()
+        for p, s in senders.items():
+            s.flush(paths[p])
+            s.close()
+
+    # --- Résumé : mêmes images, mêmes instants pour tous les protocoles ---
+    print(f"✅ {seq} images envoyées à {len(senders)} protocoles -> {args.output}/")
+    for p, path in paths.items():
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        latencies = sorted(float(r["latency_ms"]) for r in rows if not r["error"])
+        errors = sum(1 for r in rows if r["error"])
+        print(f"   {p:<5} p50 {percentile(latencies, 50):>8.3f}  p95 {percentile(latencies, 95):>8.3f}  "
+              f"p99 {percentile(latencies, 99):>8.3f} ms | erreurs {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@
 #   - Mesure la latence et l’enregistre dans un fichier CSV
 #   - Enregistre aussi la taille du message envoyé (pour bande passante)
 #   - Affiche un feu tricolore virtuel (rouge / jaune / vert)
+#   - Chronomètre chaque étape de la boucle (décodage, YOLO, réseau, affichage)
 # =========================================================
 
 import cv2
@@ -21,23 +22,40 @@ import csv
 import os
 import json
 import sys
-from detector import VehicleDetector  # 🔹 module externe pour la détection YOLO
+from detector import create_detector  # 🔹 module externe pour la détection YOLO
+from stage_timer import StageTimer    # ⏱️ chronométrage par étape
+from clock_sync import ClockSync, SPLIT_COLUMNS  # 🕒 décalage d’horloge client / serveur
 
 # ---------- Configuration ----------
 SERVER_URL = "http://127.0.0.1:5000/traffic"
 MODEL_NAME = "yolov8n.pt"
 LAT_FILE = "latency_http.csv"
 WINDOW_TITLE = "SR04 - Détection de trafic (HTTP)"
+STAGE_TIMING = True  # ⏱️ True = durées par étape dans le CSV et à l’écran
+DETECTION_CACHE = True  # 🗃️ True = réutilise les détections d’une vidéo déjà analysée
+LATENCY_BUDGET_MS = None  # ⚖️ ex. 50 = modèle / résolution adaptés pour tenir ce temps d’inférence
+FAST_PATH = False  # 🚀 True = prétraitement dans des tampons préalloués, réseau appelé directement
+DETECTOR_DAEMON = True  # 🧠 True = utilise le démon de détection s’il tourne (modèle déjà chargé)
 # -----------------------------------
 
 # --- Initialisation du détecteur YOLO ---
-detector = VehicleDetector(model_name=MODEL_NAME, latency_file=LAT_FILE)
-
-# --- Création du fichier CSV s’il n’existe pas ---
-if not os.path.exists(LAT_FILE):
+timer = StageTimer(enabled=STAGE_TIMING)
+detector = create_detector(model_name=MODEL_NAME, latency_file=LAT_FILE, timer=timer,
+                           cache=DETECTION_CACHE, budget_ms=LATENCY_BUDGET_MS,
+                           fast=FAST_PATH, remote=DETECTOR_DAEMON)
+
+# --- Création du fichier CSV s’il n’existe pas (ou si ses colonnes ont changé) ---
+CSV_HEADER = ["timestamp", "latency_ms", "msg_size_bytes", "vehicle_count", "seq"] + SPLIT_COLUMNS + \
+    timer.csv_header()
+if os.path.exists(LAT_FILE):
+    with open(LAT_FILE, newline="", encoding="utf-8") as f:
+        existing_header = next(csv.reader(f), [])
+else:
+    existing_header = None
+if existing_header != CSV_HEADER:
     with open(LAT_FILE, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["timestamp", "latency_ms", "msg_size_bytes"])
+        writer.writerow(CSV_HEADER)
 
 # --- Fenêtre principale Tkinter ---
 root = tk.Tk()
@@ -47,6 +65,7 @@ root.resizable(False, False)
 
 # --- Gestion du thread de détection ---
 detector_thread = None
+clock = ClockSync()  # montée / traitement serveur / descente à partir des horodatages du serveur
 
 
 def run_detection(source_type: str, path: str | None = None):
@@ -67,7 +86,16 @@ def run_detection(source_type: str, path: str | None = None):
             root.deiconify()
             return
 
+    if source_type == "video":
+        detector.open_video(path)
+    try:
+        clock.handshake(lambda p: requests.post(SERVER_URL, json=p, timeout=1.0).json())
+    except Exception as e:
+        print(f"⚠️ Synchronisation d’horloge impossible : {e}")
+    seq = 0  # numéro de tentative d’envoi : un trou dans le CSV = message perdu
+
     while True:
+        timer.start()
         ret, frame = cap.read()
         if not ret:
             # Redémarre la vidéo automatiquement
@@ -76,31 +104,34 @@ def run_detection(source_type: str, path: str | None = None):
                 continue
             else:
                 break
+        timer.lap("decode")
 
         # --- Détection via YOLO ---
-        count, frame = detector.detect(frame)
+        # N° d’image : clé du cache des détections (vidéo uniquement)
+        frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1 if source_type == "video" else None
+        count, frame = detector.detect(frame, frame_index)
 
         # --- Préparation du message JSON ---
-        payload = {"vehicle_count": count}
+        seq += 1
+        payload = {"vehicle_count": count, "seq": seq}
         msg_str = json.dumps(payload)
         msg_size = sys.getsizeof(msg_str)  # Taille en octets
 
-        # --- Mesure et enregistrement de la latence HTTP ---
+        # --- Mesure de la latence HTTP ---
+        row = None
         try:
             t_start = time.time()
             res = requests.post(SERVER_URL, json=payload, timeout=1.0)
             t_end = time.time()
             latency = (t_end - t_start) * 1000  # millisecondes
+            reply = res.json()
+            row = [time.time(), round(latency, 2), msg_size, count, seq] + clock.split(t_start, reply, t_end)
 
-            # Enregistre la latence et la taille du message
-            with open(LAT_FILE, "a", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow([time.time(), round(latency, 2), msg_size])
-
-            led = res.json().get("led", "red")
+            led = reply.get("led", "red")
         except Exception:
             led = "red"
             latency = 0
+        timer.lap("network")
 
         # --- Dessin du feu tricolore ---
         detector.draw_traffic_light(frame, led)
@@ -112,16 +143,26 @@ def run_detection(source_type: str, path: str | None = None):
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 2)
         cv2.putText(frame, f"Taille msg : {msg_size} o", (10, 155),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (180, 180, 180), 2)
+        timer.draw(frame)
+        timer.lap("overlay")
 
         # --- Affiche la fenêtre OpenCV ---
         cv2.imshow(WINDOW_TITLE, frame)
+        key = cv2.waitKey(1) & 0xFF
+        timer.lap("display")
+
+        # --- Enregistre la latence, la taille du message et les durées par étape ---
+        if row:
+            with open(LAT_FILE, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(row + timer.csv_row())
 
         # Quitter avec la touche Échap
-        key = cv2.waitKey(1) & 0xFF
         if key == 27:
             break
 
     cap.release()
+    detector.close_video()
     cv2.destroyAllWindows()
     root.deiconify()  # Réaffiche la fenêtre principale
 
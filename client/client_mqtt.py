@@ -6,7 +6,10 @@
 #   - Utilise le module VehicleDetector (YOLOv8)
 #   - Publie le nombre de véhicules sur "traffic/vehicle_count"
 #   - S’abonne au topic "traffic/led" pour recevoir la couleur du feu
-#   - Mesure la latence + taille du message, et les enregistre dans un fichier CSV
+#   - Mesure la latence aller-retour (publication -> réponse du serveur sur le topic
+#     de réponse) + taille du message, et les enregistre dans un fichier CSV
+#   - Message sans réponse après REPLY_TIMEOUT : perdu (absent du CSV, trou de 'seq')
+#   - Chronomètre chaque étape de la boucle (décodage, YOLO, réseau, affichage)
 # =========================================================
 
 import cv2
@@ -19,7 +22,9 @@ import csv
 import os
 import sys
 import paho.mqtt.client as mqtt
-from detector import VehicleDetector  # 🔹 Import du module YOLO commun
+from detector import create_detector  # 🔹 Import du module YOLO commun
+from stage_timer import StageTimer  # ⏱️ chronométrage par étape
+from clock_sync import ClockSync, SPLIT_COLUMNS, SYNC_ROUNDS, sync_payload  # 🕒 décalage d’horloge
 
 # --- Paramètres MQTT et configuration YOLO ---
 BROKER = "localhost"
@@ -30,16 +35,26 @@ MODEL_NAME = "yolov8n.pt"
 LAT_FILE = "latency_mqtt.csv"
 WINDOW_TITLE = "SR04 - Détection de trafic (MQTT)"
 RESET_LATENCY_FILE = True  # 🧹 True = recrée le CSV à chaque exécution
+STAGE_TIMING = True  # ⏱️ True = durées par étape dans le CSV et à l’écran
+DETECTION_CACHE = True  # 🗃️ True = réutilise les détections d’une vidéo déjà analysée
+LATENCY_BUDGET_MS = None  # ⚖️ ex. 50 = modèle / résolution adaptés pour tenir ce temps d’inférence
+FAST_PATH = False  # 🚀 True = prétraitement dans des tampons préalloués, réseau appelé directement
+DETECTOR_DAEMON = True  # 🧠 True = utilise le démon de détection s’il tourne (modèle déjà chargé)
+REPLY_TIMEOUT = 2.0  # ⌛ s sans réponse avant de compter un message perdu (seuil MAX_LATENCY_MS de l’analyse)
 # ---------------------------------------------
 
 # --- Initialisation du détecteur ---
-detector = VehicleDetector(model_name=MODEL_NAME, latency_file=LAT_FILE)
+timer = StageTimer(enabled=STAGE_TIMING)
+detector = create_detector(model_name=MODEL_NAME, latency_file=LAT_FILE, timer=timer,
+                           cache=DETECTION_CACHE, budget_ms=LATENCY_BUDGET_MS,
+                           fast=FAST_PATH, remote=DETECTOR_DAEMON)
 
 # --- Initialisation du fichier CSV ---
 if RESET_LATENCY_FILE or not os.path.exists(LAT_FILE):
     with open(LAT_FILE, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["timestamp", "latency_ms", "msg_size_bytes"])
+        writer.writerow(["timestamp", "latency_ms", "msg_size_bytes", "vehicle_count", "seq"] + SPLIT_COLUMNS +
+                        timer.csv_header())
 
 # --- Variables globales ---
 client = None
@@ -47,6 +62,12 @@ led_color = "red"
 detector_thread = None
 video_path = None
 running = True
+clock = ClockSync()  # montée / traitement serveur / descente à partir des horodatages du serveur
+sent_at = {}         # seq -> horloge murale à la publication (en attente de la réponse du serveur)
+replies = {}         # seq -> (réception, publication, colonnes SPLIT_COLUMNS), dès que la réponse est arrivée
+pending = {}         # seq -> (taille, comptage, durées par étape) des messages pas encore écrits, dans l’ordre
+lost = 0             # messages sans réponse après REPLY_TIMEOUT
+lock = threading.Lock()  # sent_at / replies partagés avec le thread réseau de paho
 
 
 # --- Fonctions de rappel MQTT ---
@@ -54,16 +75,60 @@ def on_connect(client, userdata, flags, rc):
     """Appelée lors de la connexion au broker MQTT."""
     print(f"Connecté au broker MQTT ({BROKER}:{PORT})")
     client.subscribe(TOPIC_LED)
+    # Synchronisation d’horloge (après l’abonnement : les réponses arrivent dans on_message)
+    for i in range(SYNC_ROUNDS):
+        payload = sync_payload(-1 - i)
+        with lock:
+            sent_at[payload["seq"]] = time.time()
+        client.publish(TOPIC_COUNT, json.dumps(payload))
 
 
 def on_message(client, userdata, msg):
     """Appelée lorsqu’un message est reçu sur le topic 'traffic/led'."""
     global led_color
+    t_recv = time.time()
     try:
         data = json.loads(msg.payload.decode())
-        led_color = data.get("led", "red")
     except Exception:
-        pass
+        return
+    # Réponse horodatée à l’un de nos messages : latence aller-retour et découpage
+    # montée / serveur / descente (réponse arrivée après REPLY_TIMEOUT : ignorée, déjà perdue)
+    with lock:
+        t_sent = sent_at.pop(data.get("seq"), None)
+        if t_sent is not None:
+            split = clock.split(t_sent, data, t_recv)
+            if data.get("op") != "sync":
+                replies[data["seq"]] = (t_recv, t_sent, split)
+    if "led" in data:
+        led_color = data["led"]
+
+
+# --- Écriture des mesures ---
+def write_replies(now):
+    """
+    Écrit, dans l’ordre des seq, les messages dont la réponse est arrivée ; ceux restés sans
+    réponse plus de REPLY_TIMEOUT sont comptés perdus et laissés hors du CSV (trou de séquence).
+    :return: dernière latence écrite (ms) ou None
+    """
+    global lost
+    rows = []
+    with lock:
+        for seq in list(pending):
+            if seq in replies:
+                t_recv, t_sent, split = replies.pop(seq)
+                msg_size, count, stages = pending.pop(seq)
+                rows.append([t_recv, round((t_recv - t_sent) * 1000, 2), msg_size, count, seq] + split + stages)
+            elif seq not in sent_at or now - sent_at[seq] > REPLY_TIMEOUT:
+                pending.pop(seq)
+                sent_at.pop(seq, None)
+                lost += 1
+            else:
+                break  # réponse encore attendue : les suivants attendent leur tour
+    if rows:
+        with open(LAT_FILE, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
+        return rows[-1][1]
+    return None
 
 
 # --- Connexion au broker MQTT ---
@@ -90,10 +155,14 @@ def run_detection(source_type="camera", path=None):
         root.deiconify()
         return
 
+    if source_type == "video":
+        detector.open_video(path)
     last_latency = 0
     last_msg_size = 0
+    seq = 0  # numéro de tentative d’envoi : un trou dans le CSV = message perdu
 
     while running:
+        timer.start()
         ret, frame = cap.read()
         if not ret:
             if source_type == "video":
@@ -101,29 +170,31 @@ def run_detection(source_type="camera", path=None):
                 continue
             else:
                 break
+        timer.lap("decode")
 
         # --- Détection via le module YOLO ---
-        count, frame = detector.detect(frame)
+        # N° d’image : clé du cache des détections (vidéo uniquement)
+        frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1 if source_type == "video" else None
+        count, frame = detector.detect(frame, frame_index)
 
-        # --- Publication MQTT + mesure latence + taille message ---
+        # --- Publication MQTT + taille message (latence mesurée à l’arrivée de la réponse) ---
+        published = False
         try:
-            payload = json.dumps({"vehicle_count": count})
+            seq += 1
+            payload = json.dumps({"vehicle_count": count, "seq": seq})
             msg_size = sys.getsizeof(payload)
 
-            t_start = time.time()
+            with lock:
+                sent_at[seq] = time.time()
             client.publish(TOPIC_COUNT, payload)
-            t_end = time.time()
-            latency = (t_end - t_start) * 1000  # en ms
-            last_latency = latency
             last_msg_size = msg_size
-
-            # Enregistre dans le CSV
-            with open(LAT_FILE, "a", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow([time.time(), round(latency, 2), msg_size])
+            published = True
 
         except Exception as e:
+            with lock:
+                sent_at.pop(seq, None)  # jamais envoyé : trou de séquence = message perdu
             print(f"Erreur de publication MQTT : {e}")
+        timer.lap("network")
 
         # --- Dessin du feu tricolore ---
         detector.draw_traffic_light(frame, led_color)
@@ -135,14 +206,37 @@ def run_detection(source_type="camera", path=None):
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 2)
         cv2.putText(frame, f"Taille msg : {last_msg_size} o", (10, 155),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (180, 180, 180), 2)
+        timer.draw(frame)
+        timer.lap("overlay")
 
         cv2.imshow(WINDOW_TITLE, frame)
+        key = cv2.waitKey(1) & 0xFF
+        timer.lap("display")
+
+        # --- Enregistre la latence, la taille du message et les durées par étape ---
+        # (écrites à l’arrivée de la réponse, en général dès l’image suivante)
+        if published:
+            with lock:
+                pending[seq] = (msg_size, count, timer.csv_row())
+        latency = write_replies(time.time())
+        if latency is not None:
+            last_latency = latency
 
-        if cv2.waitKey(1) & 0xFF == 27:
+        if key == 27:
             running = False
             break
 
+    # Dernières réponses en vol
+    deadline = time.time() + REPLY_TIMEOUT
+    while pending and time.time() < deadline:
+        write_replies(time.time())
+        time.sleep(0.05)
+    write_replies(time.time() + REPLY_TIMEOUT)
+    if lost:
+        print(f"📉 {lost} message(s) MQTT sans réponse après {REPLY_TIMEOUT:.0f} s (perdus)")
+
     cap.release()
+    detector.close_video()
     cv2.destroyAllWindows()
     root.deiconify()
 
@@ -0,0 +1,280 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : client/client_multicam.py
+# Description :
+#   Client multi-caméras : N flux vidéo, un nombre fixe de processus d’inférence
+#   - Un thread de capture par flux (vidéo rejouée à sa cadence, ou caméra)
+#   - Les images sont confiées à un pool de processus (un modèle YOLO chacun, pas de GIL)
+#   - Transfert sans copie : image décodée dans un anneau en mémoire partagée (frame_ring.py),
+#     seul le n° d’emplacement passe par la file du pool
+#   - Le résultat revient au transport du bon flux (cam_id / seq, topic de réponse MQTT propre)
+#   - Une seule image en cours par flux : si l’inférence est en retard, les images
+#     intermédiaires sont sautées (on traite toujours la plus récente)
+#   - Mémoire proportionnelle au nombre de processus d’inférence, pas au nombre de caméras
+#
+# Exemple :
+#   python client/client_multicam.py uploads/1.mp4 uploads/2.mp4 0 --workers 2 --protocol ws
+# =========================================================
+
+import argparse
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from frame_ring import FrameRing, read_into
+from load_generator import LAT_FILES, percentile
+from transports import PROTOCOLS, make_transport
+
+# ---------- Configuration ----------
+MODEL_NAME = "yolov8n.pt"
+OUTPUT_DIR = "multicam"
+CSV_HEADER = ["timestamp", "latency_ms", "msg_size_bytes", "vehicle_count", "camera", "seq",
+              "error", "pipeline_ms", "inference_ms", "setting"]
+FLUSH_EVERY = 100  # lignes accumulées avant écriture
+# -----------------------------------
+
+_detector = None  # un détecteur par processus d’inférence
+_ring = None      # anneau d’images partagé, rattaché dans chaque processus
+
+
+# =========================================================
+# 🔹 Processus d’inférence
+# =========================================================
+def _init_worker(model_name, threads, ring, budget_ms, fast):
+    global _detector, _ring
+    _ring = ring
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from detector import VehicleDetector
+    _detector = VehicleDetector(model_name=model_name, budget_ms=budget_ms, fast=fast)
+
+
+def _infer(slot, shape):
+    """Exécuté dans un processus du pool : renvoie (nombre de véhicules, durée d’inférence ms, réglage)."""
+    t_start = time.perf_counter()
+    frame = _ring.frame(slot, shape)  # lecture sur place dans la mémoire partagée
+    boxes = _detector.detect_boxes(frame)
+    del frame
+    return len(boxes), (time.perf_counter() - t_start) * 1000, _detector.setting
+
+
+# =========================================================
+# 🔹 Un flux : capture + envoi
+# =========================================================
+class Stream:
+    """Capture d’une source et envoi de ses comptages sur son propre transport."""
+
+    def __init__(self, cam_id, source, protocol, timeout, writer):
+        self.cam_id = cam_id
+        self.source = int(source) if source.isdigit() else source
+        self.transport = make_transport(protocol, client_id=f"cam{cam_id}", timeout=timeout)
+        self.connected = False
+        self.writer = writer
+        self.results = queue.Queue()
+        self.busy = threading.Event()  # une image en cours d’inférence
+        self.read = self.submitted = self.dropped = 0
+        self.oversized = 0  # images plus grandes que l’emplacement (résolution changée en cours de flux)
+        self.latencies = []
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            raise SystemExit(f"❌ Caméra {cam_id} : impossible d’ouvrir {source}")
+        self.shape = (int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                      int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+
+    # --- Capture (thread) ---
+    def capture(self, pool, ring, stop, loop):
+        cap = self.cap
+        is_file = isinstance(self.source, str)
+        # Fichier vidéo : rejoué à sa cadence réelle, comme une caméra
+        interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 25.0) if is_file else 0.0
+        next_at = time.perf_counter()
+        while not stop.is_set():
+            # Inférence en retard : image sautée sans être décodée (grab)
+            slot = None if self.busy.is_set() else ring.acquire(timeout=0)
+            if slot is None:
+                ret = cap.grab()
+            else:
+                try:
+                    ret, frame = read_into(cap, ring, slot, self.shape)
+                    shape = frame.shape
+                    del frame
+                except ValueError as e:
+                    # Image décodée mais trop grande pour l’anneau : sautée, l’emplacement est rendu
+                    ring.release(slot)
+                    slot, ret = None, True
+                    if not self.oversized:
+                        print(f"⚠️ Caméra {self.cam_id} : {e}, images sautées")
+                    self.oversized += 1
+            if not ret:
+                if slot is not None:
+                    ring.release(slot)
+                if is_file and loop:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+            self.read += 1
+            if slot is None:
+                self.dropped += 1
+            else:
+                self.busy.set()
+                # seq = n° d’envoi (pas d’image) : un trou de séquence reste une vraie perte
+                t_capture = time.perf_counter()
+                future = pool.submit(_infer, slot, shape)
+                future.add_done_callback(
+                    lambda f, s=self.submitted, t=t_capture, k=slot: self._on_result(f, s, t, ring, k))
+                self.submitted += 1
+            if interval:
+                next_at += interval
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_at = time.perf_counter()
+        cap.release()
+
+    def _on_result(self, future, seq, t_capture, ring, slot):
+        """Appelé par le pool : on libère l’emplacement et on route vers le thread d’envoi du flux."""
+        ring.release(slot)
+        self.busy.clear()
+        try:
+            count, inference_ms, setting = future.result()
+        except Exception as e:
+            print(f"⚠️ Caméra {self.cam_id} : inférence en échec ({e})")
+            return
+        self.results.put((seq, count, t_capture, inference_ms, setting))
+
+    # --- Envoi (thread) ---
+    def send_loop(self):
+        rows = []
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            seq, count, t_capture, inference_ms, setting = item
+            payload = {"vehicle_count": count, "cam_id": self.cam_id, "seq": seq}
+            msg_size = len(json.dumps(payload).encode())
+            error, latency = "", 0.0
+            try:
+                if not self.connected:
+                    self.transport.connect()
+                    self.connected = True
+                t_start = time.perf_counter()
+                self.transport.send(payload)
+                latency = (time.perf_counter() - t_start) * 1000
+                self.latencies.append(latency)
+            except Exception as e:
+                error = type(e).__name__
+                try:
+                    self.transport.close()
+                except Exception:
+                    pass
+                self.connected = False
+            pipeline_ms = (time.perf_counter() - t_capture) * 1000
+            rows.append([time.time(), round(latency, 3), msg_size, count, self.cam_id, seq, error,
+                         round(pipeline_ms, 2), round(inference_ms, 2), setting])
+            if len(rows) >= FLUSH_EVERY:
+                self.writer(rows)
+                rows = []
+        self.writer(rows)
+        try:
+            self.transport.close()
+        except Exception:
+            pass
+
+
+# =========================================================
+# 🔹 Point d’entrée
+# =========================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Client multi-caméras avec pool d’inférence partagé")
+    parser.add_argument("sources", nargs="+", help="fichiers vidéo ou index de caméras")
+    parser.add_argument("--workers", type=int, default=2, help="processus d’inférence (un modèle chacun)")
+    parser.add_argument("--protocol", choices=PROTOCOLS, default="ws")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--budget", type=float, default=None,
+                        help="temps d’inférence visé par image (ms) : modèle / résolution adaptés")
+    parser.add_argument("--fast", action="store_true",
+                        help="chemin rapide : tampons préalloués, réseau appelé directement")
+    parser.add_argument("--duration", type=float, default=0, help="durée (s), 0 = jusqu’à Ctrl+C")
+    parser.add_argument("--no-loop", action="store_true", help="ne pas rejouer les vidéos en boucle")
+    parser.add_argument("--timeout", type=float, default=1.0)
+    parser.add_argument("--output", default=OUTPUT_DIR, help="dossier du fichier latency_<proto>.csv")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output, exist_ok=True)
+    lat_path = os.path.join(args.output, LAT_FILES[args.protocol])
+    with open(lat_path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(CSV_HEADER)
+    write_lock = threading.Lock()
+
+    def write_rows(rows):
+        if rows:
+            with write_lock, open(lat_path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(rows)
+
+    streams = []
+    for i, src in enumerate(args.sources):
+        stream = Stream(i, src, args.protocol, args.timeout, write_rows)
+        if stream.shape[0] <= 0 or stream.shape[1] <= 0:
+            # Résolution inconnue : impossible de dimensionner son emplacement dans l’anneau
+            print(f"⚠️ Caméra {i} : taille d’image inconnue pour {src} ({stream.shape[1]}x{stream.shape[0]}), ignorée")
+            stream.cap.release()
+            continue
+        streams.append(stream)
+    if not streams:
+        raise SystemExit("❌ Aucune source exploitable")
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    stop = threading.Event()
+    # Une image en cours au plus par caméra : un emplacement chacune, à la taille de la plus grande
+    slot_bytes = max(s.shape[0] * s.shape[1] * 3 for s in streams)
+    ring = FrameRing(len(streams), slot_bytes)
+    print(f"🎥 {len(streams)} flux -> {args.workers} processus d’inférence ({args.protocol}), "
+          f"anneau partagé {len(streams) * slot_bytes / 1e6:.1f} Mo")
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.model, threads, ring, args.budget, args.fast)) as pool:
+        senders = [threading.Thread(target=s.send_loop, daemon=True) for s in streams]
+        captures = [threading.Thread(target=s.capture, args=(pool, ring, stop, not args.no_loop),
+                                     daemon=True) for s in streams]
+        for t in senders + captures:
+            t.start()
+        try:
+            while any(t.is_alive() for t in captures):
+                if args.duration and time.perf_counter() - t0 >= args.duration:
+                    break
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        stop.set()
+        for t in captures:
+            t.join()
+    # Le pool est fermé : tous les résultats ont été routés, fin des threads d’envoi
+    for s in streams:
+        s.results.put(None)
+    for t in senders:
+        t.join()
+    ring.close()
+    wall = time.perf_counter() - t0
+
+    total = sum(s.submitted for s in streams)
+    print(f"✅ {total} images analysées en {wall:.1f} s ({total / wall:.1f} img/s) -> {lat_path}")
+    for s in streams:
+        lat = sorted(s.latencies)
+        oversized = f" (dont {s.oversized} trop grandes)" if s.oversized else ""
+        print(f"   caméra {s.cam_id}: lues {s.read}, analysées {s.submitted}, sautées {s.dropped}{oversized} | "
+              f"p50 {percentile(lat, 50):.2f} ms p95 {percentile(lat, 95):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : client/client_uds.py
+# Description :
+#   Client graphique de détection YOLO (version locale, même machine que le serveur)
+#   - Utilise le module VehicleDetector (YOLOv8)
+#   - Communique via une socket de domaine Unix (repli TCP local sous Windows)
+#   - Mesure la latence + taille du message, et les sauvegarde dans un fichier CSV
+#   - Affiche en temps réel l’état du feu (rouge/jaune/vert)
+#   - Se reconnecte automatiquement si le serveur redémarre
+#   - Chronomètre chaque étape de la boucle (décodage, YOLO, réseau, affichage)
+# =========================================================
+
+import cv2
+import threading
+import time
+import tkinter as tk
+from tkinter import filedialog, messagebox
+import json
+import csv
+import os
+import socket
+import sys
+import tempfile
+from detector import create_detector  # 🔹 Module commun pour la détection YOLO
+from stage_timer import StageTimer  # ⏱️ chronométrage par étape
+from clock_sync import ClockSync, SPLIT_COLUMNS  # 🕒 décalage d’horloge client / serveur
+
+# ---------- Configuration ----------
+SOCKET_PATH = os.path.join(tempfile.gettempdir(), "sr04_traffic.sock")
+FALLBACK_HOST = "127.0.0.1"   # Utilisé uniquement si AF_UNIX n’existe pas
+FALLBACK_PORT = 5002
+MODEL_NAME = "yolov8n.pt"
+LAT_FILE = "latency_uds.csv"
+WINDOW_TITLE = "SR04 - Détection de trafic (Local)"
+RESET_LATENCY_FILE = True  # 🧹 True = recrée le fichier CSV à chaque exécution
+STAGE_TIMING = True  # ⏱️ True = durées par étape dans le CSV et à l’écran
+DETECTION_CACHE = True  # 🗃️ True = réutilise les détections d’une vidéo déjà analysée
+LATENCY_BUDGET_MS = None  # ⚖️ ex. 50 = modèle / résolution adaptés pour tenir ce temps d’inférence
+FAST_PATH = False  # 🚀 True = prétraitement dans des tampons préalloués, réseau appelé directement
+DETECTOR_DAEMON = True  # 🧠 True = utilise le démon de détection s’il tourne (modèle déjà chargé)
+# -----------------------------------
+
+# --- Initialisation du détecteur YOLO ---
+timer = StageTimer(enabled=STAGE_TIMING)
+detector = create_detector(model_name=MODEL_NAME, latency_file=LAT_FILE, timer=timer,
+                           cache=DETECTION_CACHE, budget_ms=LATENCY_BUDGET_MS,
+                           fast=FAST_PATH, remote=DETECTOR_DAEMON)
+
+# --- Préparation du fichier CSV ---
+if RESET_LATENCY_FILE or not os.path.exists(LAT_FILE):
+    with open(LAT_FILE, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "latency_ms", "msg_size_bytes", "vehicle_count", "seq"] + SPLIT_COLUMNS +
+                        timer.csv_header())
+
+# --- Variables globales ---
+sock = None
+sock_file = None
+detector_thread = None
+video_path = None
+led_color = "red"
+running = True
+clock = ClockSync()  # montée / traitement serveur / descente à partir des horodatages du serveur
+
+
+# --- Connexion locale ---
+def local_connect():
+    """Établit la connexion avec le serveur local (avec tentatives automatiques)."""
+    global sock, sock_file
+    while True:
+        try:
+            if hasattr(socket, "AF_UNIX"):
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(SOCKET_PATH)
+            else:
+                sock = socket.create_connection((FALLBACK_HOST, FALLBACK_PORT))
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock_file = sock.makefile("rb")
+            print("Connecté au serveur local")
+            clock.handshake(local_exchange)
+            return
+        except OSError as e:
+            print(f"Échec de la connexion locale : {e}")
+            print("⏳ Nouvelle tentative dans 1 seconde...")
+            time.sleep(1)
+
+
+def local_exchange(payload):
+    """Un message et sa réponse (poignée de main de synchronisation)."""
+    sock.sendall(json.dumps(payload).encode() + b"\n")
+    line = sock_file.readline()
+    if not line:
+        raise ConnectionError("connexion fermée par le serveur")
+    return json.loads(line)
+
+
+def local_close():
+    """Ferme la connexion locale si elle existe."""
+    global sock, sock_file
+    try:
+        if sock_file:
+            sock_file.close()
+        if sock:
+            sock.close()
+    except OSError:
+        pass
+    sock, sock_file = None, None
+
+
+# --- Thread principal de détection ---
+def run_detection(source_type="camera", path=None):
+    """Exécute la détection en temps réel (caméra ou vidéo) et communique avec le serveur local."""
+    global led_color, running
+    root.withdraw()  # Masquer la fenêtre principale
+    local_connect()
+
+    cap = cv2.VideoCapture(0 if source_type == "camera" else path)
+    if not cap.isOpened():
+        messagebox.showerror("Erreur", "Impossible d’ouvrir la source vidéo.")
+        root.deiconify()
+        return
+
+    if source_type == "video":
+        detector.open_video(path)
+    last_latency = 0
+    last_msg_size = 0
+    seq = 0  # numéro de tentative d’envoi : un trou dans le CSV = message perdu
+
+    while running:
+        timer.start()
+        ret, frame = cap.read()
+        if not ret:
+            if source_type == "video":
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            else:
+                print("📷 Fin du flux caméra.")
+                break
+        timer.lap("decode")
+
+        # --- Détection YOLO via le module ---
+        # N° d’image : clé du cache des détections (vidéo uniquement)
+        frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1 if source_type == "video" else None
+        count, frame = detector.detect(frame, frame_index)
+
+        # --- Envoi des données + mesure de latence + taille du message ---
+        row = None
+        try:
+            seq += 1
+            message = json.dumps({"vehicle_count": count, "seq": seq})
+            msg_size = sys.getsizeof(message)
+
+            # perf_counter : résolution suffisante pour des latences sous la milliseconde
+            t_wall = time.time()  # horloge murale : comparée aux horodatages du serveur
+            t_start = time.perf_counter()
+            sock.sendall(message.encode() + b"\n")
+            response = sock_file.readline()
+            t_end = time.perf_counter()
+            t_wall_end = time.time()
+            if not response:
+                raise ConnectionError("connexion fermée par le serveur")
+            latency = (t_end - t_start) * 1000  # en millisecondes
+            last_latency = latency
+            last_msg_size = msg_size
+
+            # Mise à jour de l’état du feu
+            data = json.loads(response)
+            row = [time.time(), round(latency, 2), msg_size, count, seq] + clock.split(t_wall, data, t_wall_end)
+            led_color = data.get("led", "red")
+
+        except (ConnectionError, OSError):
+            print("Connexion locale perdue, reconnexion...")
+            local_close()
+            local_connect()
+        except Exception as e:
+            print(f"Erreur de communication locale : {e}")
+        timer.lap("network")
+
+        # --- Affichage du feu tricolore ---
+        detector.draw_traffic_light(frame, led_color)
+
+        # --- Informations à l’écran ---
+        cv2.putText(frame, f"Vehicules : {count}", (10, 95),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        cv2.putText(frame, f"Latence : {last_latency:.2f} ms", (10, 125),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 2)
+        cv2.putText(frame, f"Taille msg : {last_msg_size} o", (10, 155),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (180, 180, 180), 2)
+        timer.draw(frame)
+        timer.lap("overlay")
+
+        # --- Fenêtre OpenCV ---
+        cv2.imshow(WINDOW_TITLE, frame)
+        key = cv2.waitKey(1) & 0xFF
+        timer.lap("display")
+
+        # --- Enregistre la latence, la taille du message et les durées par étape ---
+        if row:
+            with open(LAT_FILE, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(row + timer.csv_row())
+
+        if key == 27:  # ESC
+            running = False
+            break
+
+    cap.release()
+    detector.close_video()
+    cv2.destroyAllWindows()
+    root.deiconify()
+    local_close()
+    print("🛑 Détection terminée.")
+
+
+# --- Interface graphique ---
+def start_camera():
+    """Lance la détection depuis la caméra."""
+    global detector_thread, running
+    running = True
+    if detector_thread and detector_thread.is_alive():
+        messagebox.showinfo("Info", "La détection est déjà en cours.")
+        return
+    detector_thread = threading.Thread(target=run_detection, args=("camera",), daemon=True)
+    detector_thread.start()
+
+
+def upload_video():
+    """Lance la détection depuis un fichier vidéo."""
+    global detector_thread, running, video_path
+    running = True
+    if detector_thread and detector_thread.is_alive():
+        messagebox.showinfo("Info", "La détection est déjà en cours.")
+        return
+    path = filedialog.askopenfilename(
+        title="Choisir une vidéo",
+        filetypes=[("Fichiers vidéo", "*.mp4 *.avi *.mov *.mkv"), ("Tous les fichiers", "*.*")]
+    )
+    if not path:
+        return
+    video_path = path
+    detector_thread = threading.Thread(target=run_detection, args=("video", path), daemon=True)
+    detector_thread.start()
+
+
+def exit_app():
+    """Ferme proprement l’application."""
+    global running
+    running = False
+    try:
+        local_close()
+        cv2.destroyAllWindows()
+    except Exception:
+        pass
+    root.destroy()
+
+
+# --- Fenêtre principale Tkinter ---
+root = tk.Tk()
+root.title("SR04 - Client de trafic intelligent (Local)")
+root.geometry("420x280")
+root.resizable(False, False)
+
+tk.Label(root, text="SR04 Groupe 9 - Détection intelligente (Local)",
+         font=("Segoe UI", 14, "bold")).pack(pady=15)
+
+tk.Button(root, text="Ouvrir la caméra",
+          command=start_camera, width=22, height=2,
+          bg="#4CAF50", fg="white").pack(pady=6)
+
+tk.Button(root, text="Choisir une vidéo",
+          command=upload_video, width=22, height=2,
+          bg="#2196F3", fg="white").pack(pady=6)
+
+tk.Button(root, text="Quitter",
+          command=exit_app, width=22, height=2,
+          bg="#f44336", fg="white").pack(pady=12)
+
+root.mainloop()
@@ -9,6 +9,7 @@
 #   - Mesure la latence + taille du message, et les sauvegarde dans un fichier CSV
 #   - Affiche en temps réel l’état du feu (rouge/jaune/vert)
 #   - Redémarre automatiquement la vidéo et se reconnecte en cas de déconnexion
+#   - Chronomètre chaque étape de la boucle (décodage, YOLO, réseau, affichage)
 # =========================================================
 
 import cv2
@@ -21,7 +22,9 @@ import csv
 import os
 import sys
 from websocket import create_connection, WebSocketConnectionClosedException
-from detector import VehicleDetector  # 🔹 Module commun pour la détection YOLO
+from detector import create_detector  # 🔹 Module commun pour la détection YOLO
+from stage_timer import StageTimer  # ⏱️ chronométrage par étape
+from clock_sync import ClockSync, SPLIT_COLUMNS  # 🕒 décalage d’horloge client / serveur
 
 # ---------- Configuration ----------
 SERVER_URL = "ws://127.0.0.1:5001"
@@ -29,16 +32,25 @@ MODEL_NAME = "yolov8n.pt"
 LAT_FILE = "latency_ws.csv"
 WINDOW_TITLE = "SR04 - Détection de trafic (WebSocket)"
 RESET_LATENCY_FILE = True  # 🧹 True = recrée le fichier CSV à chaque exécution
+STAGE_TIMING = True  # ⏱️ True = durées par étape dans le CSV et à l’écran
+DETECTION_CACHE = True  # 🗃️ True = réutilise les détections d’une vidéo déjà analysée
+LATENCY_BUDGET_MS = None  # ⚖️ ex. 50 = modèle / résolution adaptés pour tenir ce temps d’inférence
+FAST_PATH = False  # 🚀 True = prétraitement dans des tampons préalloués, réseau appelé directement
+DETECTOR_DAEMON = True  # 🧠 True = utilise le démon de détection s’il tourne (modèle déjà chargé)
 # -----------------------------------
 
 # --- Initialisation du détecteur YOLO ---
-detector = VehicleDetector(model_name=MODEL_NAME, latency_file=LAT_FILE)
+timer = StageTimer(enabled=STAGE_TIMING)
+detector = create_detector(model_name=MODEL_NAME, latency_file=LAT_FILE, timer=timer,
+                           cache=DETECTION_CACHE, budget_ms=LATENCY_BUDGET_MS,
+                           fast=FAST_PATH, remote=DETECTOR_DAEMON)
 
 # --- Préparation du fichier CSV ---
 if RESET_LATENCY_FILE or not os.path.exists(LAT_FILE):
     with open(LAT_FILE, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["timestamp", "latency_ms", "msg_size_bytes"])
+        writer.writerow(["timestamp", "latency_ms", "msg_size_bytes", "vehicle_count", "seq"] + SPLIT_COLUMNS +
+                        timer.csv_header())
 
 # --- Variables globales ---
 ws = None
@@ -46,6 +58,7 @@ detector_thread = None
 video_path = None
 led_color = "red"
 running = True
+clock = ClockSync()  # montée / traitement serveur / descente à partir des horodatages du serveur
 
 
 # --- Connexion WebSocket ---
@@ -56,6 +69,7 @@ def ws_connect():
         try:
             ws = create_connection(SERVER_URL)
             print(f"Connecté au serveur WebSocket ({SERVER_URL})")
+            clock.handshake(lambda p: (ws.send(json.dumps(p)), json.loads(ws.recv()))[1])
             return
         except Exception as e:
             print(f"Échec de la connexion WebSocket : {e}")
@@ -76,10 +90,14 @@ def run_detection(source_type="camera", path=None):
         root.deiconify()
         return
 
+    if source_type == "video":
+        detector.open_video(path)
     last_latency = 0
     last_msg_size = 0
+    seq = 0  # numéro de tentative d’envoi : un trou dans le CSV = message perdu
 
     while running:
+        timer.start()
         ret, frame = cap.read()
         if not ret:
             if source_type == "video":
@@ -93,14 +111,19 @@ def run_detection(source_type="camera", path=None):
             else:
                 print("📷 Fin du flux caméra.")
                 break
+        timer.lap("decode")
 
         # --- Détection YOLO via le module ---
-        count, frame = detector.detect(frame)
+        # N° d’image : clé du cache des détections (vidéo uniquement)
+        frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1 if source_type == "video" else None
+        count, frame = detector.detect(frame, frame_index)
 
         # --- Envoi des données + mesure de latence + taille du message ---
+        row = None
         try:
             if ws:
-                message = json.dumps({"vehicle_count": count})
+                seq += 1
+                message = json.dumps({"vehicle_count": count, "seq": seq})
                 msg_size = sys.getsizeof(message)
 
                 t_start = time.time()
@@ -111,13 +134,9 @@ def run_detection(source_type="camera", path=None):
                 last_latency = latency
                 last_msg_size = msg_size
 
-                # Enregistre la latence et la taille du message dans le fichier CSV
-                with open(LAT_FILE, "a", newline="", encoding="utf-8") as f:
-                    writer = csv.writer(f)
-                    writer.writerow([time.time(), round(latency, 2), msg_size])
-
                 # Mise à jour de l’état du feu
                 data = json.loads(response)
+                row = [time.time(), round(latency, 2), msg_size, count, seq] + clock.split(t_start, data, t_end)
                 led_color = data.get("led", "red")
 
         except WebSocketConnectionClosedException:
@@ -125,6 +144,7 @@ def run_detection(source_type="camera", path=None):
             ws_connect()
         except Exception as e:
             print(f"Erreur de communication WebSocket : {e}")
+        timer.lap("network")
 
         # --- Affichage du feu tricolore ---
         detector.draw_traffic_light(frame, led_color)
@@ -136,15 +156,26 @@ def run_detection(source_type="camera", path=None):
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 2)
         cv2.putText(frame, f"Taille msg : {last_msg_size} o", (10, 155),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (180, 180, 180), 2)
+        timer.draw(frame)
+        timer.lap("overlay")
 
         # --- Fenêtre OpenCV ---
         cv2.imshow(WINDOW_TITLE, frame)
         key = cv2.waitKey(1) & 0xFF
+        timer.lap("display")
+
+        # --- Enregistre la latence, la taille du message et les durées par étape ---
+        if row:
+            with open(LAT_FILE, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(row + timer.csv_row())
+
         if key == 27:  # ESC
             running = False
             break
 
     cap.release()
+    detector.close_video()
     cv2.destroyAllWindows()
     root.deiconify()
     if ws:
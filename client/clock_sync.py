@@ -0,0 +1,85 @@
+# =========================================================
+# SR04 Groupe 9 - Module de synchronisation d’horloge
+# Fichier : client/clock_sync.py
+# Description :
+#   Estimation du décalage d’horloge client / serveur, à la manière de NTP
+#   - Le serveur horodate chaque réponse : réception (t_recv) et envoi (t_send)
+#   - Avec l’envoi (t0) et la réception (t3) côté client :
+#       décalage = ((t1 - t0) + (t2 - t3)) / 2     aller-retour réseau = (t3 - t0) - (t2 - t1)
+#   - Le décalage retenu est celui de l’échange au plus court aller-retour parmi les
+#     derniers (le moins perturbé par les files d’attente), comme le filtre de NTP
+#   - Latence découpée en montée (client -> serveur), traitement serveur, descente
+#   - Poignée de main à la connexion : quelques messages {"op": "sync"} sans effet sur le feu
+# =========================================================
+
+import time
+from collections import deque
+
+SYNC_ROUNDS = 8    # échanges de la poignée de main
+WINDOW = 64        # échanges conservés pour le filtre
+SPLIT_COLUMNS = ["uplink_ms", "server_ms", "downlink_ms", "clock_offset_ms"]
+
+
+def sync_payload(seq=-1):
+    """Message de synchronisation (seq négatif : jamais confondu avec un comptage)."""
+    return {"op": "sync", "seq": seq}
+
+
+def stamps(reply):
+    """(t_recv, t_send) de la réponse, ou None si le serveur ne les fournit pas."""
+    try:
+        return float(reply["t_recv"]), float(reply["t_send"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class ClockSync:
+    """Décalage d’horloge d’un serveur, affiné à chaque réponse horodatée."""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)  # (aller-retour réseau, décalage) en secondes
+
+    def add(self, t0, t1, t2, t3):
+        delay = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        self.samples.append((delay, offset))
+
+    @property
+    def offset(self):
+        """Décalage serveur - client (s) de l’échange le plus rapide, None si aucun."""
+        if not self.samples:
+            return None
+        return min(self.samples)[1]
+
+    def handshake(self, exchange, rounds=SYNC_ROUNDS):
+        """
+        Série d’échanges de synchronisation.
+        :param exchange: fonction envoyant un message et renvoyant la réponse du serveur
+        :return: nombre d’échanges horodatés
+        """
+        done = 0
+        for i in range(rounds):
+            t0 = time.time()
+            reply = exchange(sync_payload(-1 - i))
+            t3 = time.time()
+            s = stamps(reply)
+            if s:
+                self.add(t0, s[0], s[1], t3)
+                done += 1
+        return done
+
+    def split(self, t0, reply, t3):
+        """
+        Découpage d’un aller-retour (horloge murale du client : time.time()).
+        :return: valeurs des colonnes SPLIT_COLUMNS (vides si la réponse n’est pas horodatée)
+        """
+        s = stamps(reply)
+        if s is None:
+            return [""] * len(SPLIT_COLUMNS)
+        t1, t2 = s
+        self.add(t0, t1, t2, t3)
+        offset = self.offset
+        return [round((t1 - offset - t0) * 1000, 3),
+                round((t2 - t1) * 1000, 3),
+                round((t3 - (t2 - offset)) * 1000, 3),
+                round(offset * 1000, 3)]
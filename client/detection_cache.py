@@ -0,0 +1,187 @@
+# =========================================================
+# SR04 Groupe 9 - Module de cache des détections
+# Fichier : client/detection_cache.py
+# Description :
+#   Cache persistant des détections YOLO pour les vidéos rejouées en boucle
+#   - Clé : empreinte du contenu de la vidéo + modèle (nom, résolution, prédicteur,
+#     empreinte des poids) + n° d’image
+#   - Format compact : un .npz par (vidéo, modèle) avec comptages / décalages / boîtes / classes
+#   - Taille bornée : les fichiers les moins récemment utilisés sont supprimés (LRU)
+#   - Modèle modifié (nouveaux poids) : les entrées de l’ancien modèle sont invalidées
+# =========================================================
+
+import hashlib
+import json
+import os
+import re
+import numpy as np
+
+CACHE_DIR = ".detection_cache"
+MAX_BYTES = 200 * 1024 * 1024   # taille maximale du cache sur disque
+FLUSH_EVERY = 500               # écriture sur disque toutes les N nouvelles images
+CHUNK = 1024 * 1024
+
+
+def file_digest(path, length=16):
+    """Empreinte BLAKE2 du contenu d’un fichier (lecture par blocs)."""
+    h = hashlib.blake2b(digest_size=length)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class DetectionCache:
+    """
+    Détections par image d’une vidéo pour un modèle donné.
+    Utilisation : bind(vidéo) -> get(i) / put(i, boîtes) -> flush()
+    """
+
+    def __init__(self, model_name, imgsz=640, fast=False, weights=None, cache_dir=CACHE_DIR,
+                 max_bytes=MAX_BYTES):
+        """
+        :param imgsz: résolution d’inférence (les boîtes en dépendent)
+        :param fast: True si les détections viennent du chemin rapide (fast_path.py)
+        :param weights: chemin des poids effectivement chargés (ex. model.ckpt_path
+                        pour un modèle téléchargé), à défaut model_name
+        """
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        variant = f"-{imgsz}" + ("-fast" if fast else "")
+        self.model_slug = re.sub(r"[^A-Za-z0-9_.-]", "_", os.path.basename(model_name)) + variant
+        self.model_id = self._model_fingerprint(weights or model_name)
+        self.entries = {}       # n° d’image -> [(x1, y1, x2, y2, label), ...]
+        self.path = None
+        self.video_key = None
+        self.dirty = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # --- Empreintes ---
+    @staticmethod
+    def _model_fingerprint(weights):
+        """Empreinte des poids si le fichier est trouvé, sinon le nom seul."""
+        if weights and os.path.isfile(weights):
+            return file_digest(weights, length=8)
+        return "nofile"
+
+    def _video_fingerprint(self, video_path):
+        """
+        Empreinte du contenu, mémorisée par (chemin, taille, date) dans index.json
+        pour ne pas relire une grosse vidéo à chaque lancement.
+        """
+        st = os.stat(video_path)
+        stamp = f"{os.path.abspath(video_path)}|{st.st_size}|{st.st_mtime_ns}"
+        index_path = os.path.join(self.cache_dir, "index.json")
+        try:
+            with open(index_path, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        if stamp not in index:
+            index[stamp] = file_digest(video_path)
+            tmp = index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp, index_path)
+        return index[stamp]
+
+    # --- Liaison à une vidéo ---
+    def bind(self, video_path):
+        """Charge les détections déjà connues pour cette vidéo et ce modèle."""
+        self.flush()
+        self.video_key = self._video_fingerprint(video_path)
+        name = f"{self.video_key}_{self.model_slug}_{self.model_id}.npz"
+        self.path = os.path.join(self.cache_dir, name)
+        self.entries = {}
+        self._invalidate_other_models()
+        if os.path.exists(self.path):
+            try:
+                self.entries = self._load(self.path)
+                os.utime(self.path)  # dernier usage (LRU)
+            except (OSError, ValueError, KeyError):
+                os.remove(self.path)  # fichier corrompu : on repart de zéro
+        return len(self.entries)
+
+    def _invalidate_other_models(self):
+        """Même vidéo et même nom de modèle mais poids différents : entrées obsolètes."""
+        prefix = f"{self.video_key}_{self.model_slug}_"
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith(".npz") and \
+                    os.path.join(self.cache_dir, name) != self.path:
+                os.remove(os.path.join(self.cache_dir, name))
+
+    # --- Accès ---
+    def get(self, frame_index):
+        """Boîtes de l’image, ou None si elle n’est pas en cache."""
+        boxes = self.entries.get(frame_index)
+        if boxes is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return boxes
+
+    def put(self, frame_index, boxes):
+        if self.path is None:
+            return
+        self.entries[frame_index] = list(boxes)
+        self.dirty += 1
+        if self.dirty >= FLUSH_EVERY:
+            self.flush()
+
+    # --- Format disque ---
+    @staticmethod
+    def _load(path):
+        with np.load(path, allow_pickle=False) as data:
+            frames, offsets = data["frames"], data["offsets"]
+            boxes, labels, classes = data["boxes"], data["labels"], data["classes"]
+        entries = {}
+        for i, frame in enumerate(frames.tolist()):
+            a, b = offsets[i], offsets[i + 1]
+            entries[frame] = [(*map(int, boxes[j]), str(classes[labels[j]])) for j in range(a, b)]
+        return entries
+
+    def flush(self):
+        """Écrit les détections sur disque (remplacement atomique) puis applique la borne de taille."""
+        if self.path is None or not self.dirty:
+            return
+        frames = np.array(sorted(self.entries), dtype=np.int64)
+        classes = sorted({box[4] for boxes in self.entries.values() for box in boxes})
+        class_index = {c: i for i, c in enumerate(classes)}
+        counts = np.array([len(self.entries[f]) for f in frames.tolist()], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        all_boxes = [box for f in frames.tolist() for box in self.entries[f]]
+        boxes = np.array([b[:4] for b in all_boxes], dtype=np.int16).reshape(-1, 4)
+        labels = np.array([class_index[b[4]] for b in all_boxes], dtype=np.uint8)
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, frames=frames, counts=counts.astype(np.uint16), offsets=offsets,
+                                boxes=boxes, labels=labels, classes=np.array(classes, dtype=str),
+                                model=np.array(self.model_name), model_id=np.array(self.model_id))
+        os.replace(tmp, self.path)
+        self.dirty = 0
+        self.evict()
+
+    def evict(self):
+        """Supprime les fichiers les moins récemment utilisés au-delà de max_bytes."""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                path = os.path.join(self.cache_dir, name)
+                st = os.stat(path)
+                files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == self.path:
+                continue  # la vidéo en cours reste en cache
+            os.remove(path)
+            total -= size
+
+    def stats(self):
+        total = self.hits + self.misses
+        return f"cache : {self.hits}/{total} images ({self.hits / total:.0%})" if total else "cache : vide"
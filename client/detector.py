@@ -6,12 +6,28 @@
 #   - Détection des voitures, camions, bus, motos
 #   - Dessin des cadres et du feu tricolore
 #   - Option de sauvegarde de la latence de communication
+#   - Chronométrage optionnel des étapes (voir stage_timer.py)
+#   - Cache optionnel des détections pour les vidéos rejouées (voir detection_cache.py)
+#   - Budget de latence optionnel : modèle et résolution adaptés à la charge (voir adaptive.py)
+#   - Chemin rapide optionnel : tampons d’entrée préalloués, réseau appelé directement (voir fast_path.py)
+#   - RemoteDetector : même interface, inférence confiée au démon résident (detector_daemon.py)
 # =========================================================
 
-from ultralytics import YOLO
 import cv2
+import json
+import socket
+import tempfile
 import time
 import os
+import numpy as np
+from detection_cache import DetectionCache
+from adaptive import AdaptiveController, DEFAULT_IMGSZ
+
+# --- Démon de détection résident (voir detector_daemon.py et run_all.py) ---
+DAEMON_PATH = os.path.join(tempfile.gettempdir(), "sr04_detector.sock")
+DAEMON_FALLBACK = ("127.0.0.1", 5003)  # si AF_UNIX est indisponible (Windows)
+DAEMON_WAIT = 10.0  # s d’attente d’un démon en cours de redémarrage
+VEHICLE_CLASSES = {"car", "truck", "bus", "motorbike"}
 
 
 class VehicleDetector:
@@ -19,39 +35,163 @@ class VehicleDetector:
     Classe responsable du chargement du modèle YOLO et de la détection.
     """
 
-    def __init__(self, model_name="yolov8n.pt", latency_file=None):
+    def __init__(self, model_name="yolov8n.pt", latency_file=None, timer=None, cache=False,
+                 budget_ms=None, fast=False):
         """
         Initialise le détecteur avec un modèle YOLO.
         :param model_name: nom du modèle YOLO (ex: 'yolov8n.pt')
         :param latency_file: chemin du fichier CSV pour sauvegarder les latences
+        :param timer: StageTimer optionnel pour chronométrer les étapes de détection
+        :param cache: True pour réutiliser les détections d’une vidéo déjà analysée
+        :param budget_ms: temps d’inférence visé par image (None = réglage fixe)
+        :param fast: True pour le chemin rapide (fast_path.py) au lieu du prédicteur Ultralytics
         """
         self.model_name = model_name
         self.latency_file = latency_file
-        self.model = YOLO(model_name)
-        self.vehicle_classes = {"car", "truck", "bus", "motorbike"}
+        self.timer = timer
+        self.imgsz = DEFAULT_IMGSZ
+        self.current_model = model_name
+        self.models = {}
+        self.weights = {}  # modèle -> chemin des poids chargés (empreinte du cache)
+        self.fast = fast
+        self.lean = {}  # modèle -> LeanPredictor (chemin rapide)
+        self.adaptive = None
+        names = [model_name]
+        if budget_ms:
+            self.adaptive = AdaptiveController(budget_ms, start=(model_name, DEFAULT_IMGSZ))
+            # Tous les modèles de l’échelle sont chargés d’avance : pas d’arrêt en plein flux
+            names += [name for name, _ in self.adaptive.ladder if name not in names]
+        self._load_models(names)
+        if budget_ms:
+            if timer:
+                timer.tag("setting", self.adaptive.label)
+            if cache:
+                print("⚠️ Budget de latence actif : cache des détections désactivé (réglages variables)")
+                cache = False
+        # Après le chargement : les poids éventuellement téléchargés entrent dans l’empreinte
+        self.cache = DetectionCache(model_name, self.imgsz, fast, self.weights.get(model_name)) if cache else None
+        self.vehicle_classes = VEHICLE_CLASSES
         print(f"✅ Modèle YOLO chargé : {model_name}")
 
-    def detect(self, frame):
+    def _load_models(self, names):
+        from ultralytics import YOLO  # import différé : inutile pour RemoteDetector
+        for name in names:
+            if name not in self.models:
+                self.models[name] = YOLO(name)
+                # Nom seul (ex. 'yolov8n.pt') : poids téléchargés ailleurs que dans le dossier courant
+                self.weights[name] = getattr(self.models[name], "ckpt_path", None) or name
+
+    @property
+    def model(self):
+        """Modèle YOLO du réglage actif."""
+        return self.models[self.current_model]
+
+    @property
+    def setting(self):
+        """Réglage actif, ex. 'yolov8n@480'."""
+        return self.adaptive.label if self.adaptive else f"{self.model_name.rsplit('.', 1)[0]}@{self.imgsz}"
+
+    def _adapt(self, inference_ms):
+        """Transmet la mesure au contrôleur et applique un éventuel changement de réglage."""
+        if not self.adaptive.observe(inference_ms):
+            return
+        self.current_model, self.imgsz = self.adaptive.setting
+        if self.timer:
+            self.timer.tag("setting", self.adaptive.label)
+        print(f"⚖️ Budget {self.adaptive.budget_ms:.0f} ms : passage à {self.adaptive.label}")
+
+    def open_video(self, path):
+        """Associe le cache à une vidéo (à appeler avant de lire ses images)."""
+        if self.cache:
+            known = self.cache.bind(path)
+            print(f"🗃️ {known} images déjà analysées en cache pour {os.path.basename(path)}")
+
+    def close_video(self):
+        """Écrit les nouvelles détections sur disque."""
+        if self.cache:
+            self.cache.flush()
+            print(f"🗃️ {self.cache.stats()}")
+
+    def detect(self, frame, frame_index=None):
         """
         Détecte les véhicules sur une image OpenCV.
         :param frame: image (numpy array)
+        :param frame_index: n° de l’image dans la vidéo ouverte (None : caméra, pas de cache)
         :return: tuple (nombre_de_véhicules, image_annotée)
         """
-        results = self.model(frame, verbose=False)
-        count = 0
-
-        if results and len(results) > 0:
-            r = results[0]
-            for box in r.boxes:
-                cls_id = int(box.cls[0])
-                label = self.model.names[cls_id]
-                if label in self.vehicle_classes:
-                    count += 1
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    cv2.putText(frame, label, (x1, y1 - 6),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-        return count, frame
+        boxes = self.detect_boxes(frame, frame_index)
+        self.draw_boxes(frame, boxes)
+        if self.timer:
+            self.timer.lap("boxes")
+        return len(boxes), frame
+
+    def detect_boxes(self, frame, frame_index=None):
+        """
+        Détecte les véhicules sans modifier l’image.
+        :param frame: image (numpy array)
+        :param frame_index: n° de l’image dans la vidéo ouverte (None : pas de cache)
+        :return: liste de tuples (x1, y1, x2, y2, label)
+        """
+        timer = self.timer
+        if timer:
+            timer.mark()
+        use_cache = self.cache is not None and frame_index is not None
+        if use_cache:
+            boxes = self.cache.get(frame_index)
+            if boxes is not None:
+                if timer:
+                    timer.lap("predict")
+                return boxes
+        t_start = time.perf_counter()
+        boxes, speed = self._predict(frame, self.current_model, self.imgsz)
+        if self.adaptive:
+            self._adapt((time.perf_counter() - t_start) * 1000)
+        if timer:
+            timer.lap("predict")
+            # Détail fourni par Ultralytics (déjà en millisecondes)
+            for stage, duration in speed.items():
+                timer.record(stage, duration)
+        if use_cache:
+            self.cache.put(frame_index, boxes)
+        return boxes
+
+    def _predict(self, frame, model_name, imgsz, fast=None):
+        """
+        Inférence brute avec le modèle demandé.
+        :param fast: chemin rapide pour cette image (None = réglage du détecteur ; démon : choix du client)
+        :return: (liste de tuples (x1, y1, x2, y2, label), durées Ultralytics en ms)
+        """
+        if self.fast if fast is None else fast:
+            lean = self.lean.get(model_name)
+            if lean is None:
+                from fast_path import LeanPredictor
+                lean = self.lean[model_name] = LeanPredictor(self.models[model_name], self.vehicle_classes)
+            return lean.predict(frame, imgsz)
+        model = self.models[model_name]
+        results = model(frame, imgsz=imgsz, verbose=False)
+        boxes = []
+        if not results:
+            return boxes, {}
+        r = results[0]
+        for box in r.boxes:
+            cls_id = int(box.cls[0])
+            label = model.names[cls_id]
+            if label in self.vehicle_classes:
+                x1, y1, x2, y2 = map(int, box.xyxy[0])
+                boxes.append((x1, y1, x2, y2, label))
+        return boxes, r.speed
+
+    @staticmethod
+    def draw_boxes(frame, boxes):
+        """
+        Dessine les cadres des véhicules détectés.
+        :param frame: image OpenCV
+        :param boxes: liste de tuples (x1, y1, x2, y2, label)
+        """
+        for x1, y1, x2, y2, label in boxes:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(frame, label, (x1, y1 - 6),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
 
     def save_latency(self, latency_ms):
         """
@@ -78,3 +218,117 @@ class VehicleDetector:
         else:
             color = (0, 0, 255)
         cv2.circle(frame, (50, 50), 20, color, -1)
+
+
+# =========================================================
+# 🔹 Détection déléguée au démon résident
+# =========================================================
+def _daemon_connect(path=DAEMON_PATH, fallback=DAEMON_FALLBACK, timeout=None):
+    if hasattr(socket, "AF_UNIX"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+    sock = socket.create_connection(fallback, timeout=timeout)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+def daemon_available(timeout=0.2):
+    """True si le démon de détection accepte les connexions."""
+    try:
+        _daemon_connect(timeout=timeout).close()
+        return True
+    except OSError:
+        return False
+
+
+class RemoteDetector(VehicleDetector):
+    """
+    Même interface que VehicleDetector (cache, chronométrage, budget, dessin),
+    mais le modèle reste chargé dans detector_daemon.py : démarrage immédiat,
+    un seul modèle en mémoire pour tous les clients.
+    Protocole : une ligne JSON d’en-tête (+ octets bruts de l’image), une ligne JSON en réponse.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.sock = None
+        self.reader = None
+        super().__init__(*args, **kwargs)
+
+    def _connect(self):
+        """(Re)connexion, en attendant un démon en cours de redémarrage par le superviseur."""
+        self.close()
+        deadline = time.monotonic() + DAEMON_WAIT
+        while True:
+            try:
+                self.sock = _daemon_connect()
+                self.reader = self.sock.makefile("rb")
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+
+    def _request(self, header, payload=None):
+        for attempt in (1, 2):
+            try:
+                if self.sock is None:
+                    self._connect()
+                self.sock.sendall(json.dumps(header).encode() + b"\n")
+                if payload is not None:
+                    self.sock.sendall(payload)
+                line = self.reader.readline()
+                if not line:
+                    raise ConnectionError("démon de détection fermé")
+                break
+            except OSError:
+                self.close()
+                if attempt == 2:
+                    raise
+        reply = json.loads(line)
+        if "error" in reply:
+            raise RuntimeError(f"démon de détection : {reply['error']}")
+        return reply
+
+    def _load_models(self, names):
+        for name in names:
+            reply = self._request({"op": "load", "model": name})
+            self.models[name] = reply["load_s"]  # chargé côté démon
+            self.weights[name] = reply.get("weights") or name
+
+    @property
+    def model(self):
+        return None  # le modèle est dans le démon
+
+    def _predict(self, frame, model_name, imgsz, fast=None):
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        # Le démon choisit le prédicteur image par image : FAST_PATH du client respecté
+        header = {"op": "detect", "model": model_name, "imgsz": imgsz, "shape": list(frame.shape),
+                  "fast": self.fast if fast is None else fast}
+        reply = self._request(header, memoryview(frame).cast("B"))
+        return [tuple(b) for b in reply["boxes"]], reply.get("speed", {})
+
+    def close(self):
+        for f in (self.reader, self.sock):
+            if f is not None:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+        self.sock = self.reader = None
+
+
+def create_detector(*args, remote=True, **kwargs):
+    """
+    Détecteur distant si le démon résident répond, sinon chargement local du modèle.
+    Mêmes arguments que VehicleDetector.
+    """
+    if remote and daemon_available():
+        print("🔌 Démon de détection trouvé : modèle déjà chargé")
+        return RemoteDetector(*args, **kwargs)
+    return VehicleDetector(*args, **kwargs)
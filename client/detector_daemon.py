@@ -0,0 +1,121 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : client/detector_daemon.py
+# Description :
+#   Service de détection résident : le modèle YOLO reste chargé entre deux lancements
+#   - Lancé une fois par run_all.py (superviseur), survit aux changements de mode
+#   - Les clients de tous les protocoles s’y connectent via detector.create_detector()
+#     (RemoteDetector) : plus de chargement du modèle à chaque lancement
+#   - Socket de domaine Unix (repli TCP local), une ligne JSON d’en-tête + octets de l’image
+#   - Un seul modèle en mémoire partagé par tous les clients ; inférences exécutées
+#     une à une dans un thread dédié (la boucle asyncio reste disponible)
+#   - Chemin rapide (fast_path.py) choisi à chaque requête par le client (FAST_PATH) ;
+#     --fast ne fixe que la valeur par défaut des clients qui ne le précisent pas
+#
+# Exemple :
+#   python client/detector_daemon.py --preload yolov8n.pt
+# =========================================================
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from detector import DAEMON_FALLBACK, DAEMON_PATH, VehicleDetector
+
+MODEL_NAME = "yolov8n.pt"
+STATS_EVERY = 1000  # images entre deux lignes de statistiques
+
+
+class DetectorService:
+    """Modèles chargés + file d’inférence unique."""
+
+    def __init__(self, preload, fast=False):
+        self.detector = VehicleDetector(model_name=preload, fast=fast)
+        self.executor = ThreadPoolExecutor(max_workers=1)  # un modèle = une inférence à la fois
+        self.clients = 0
+        self.frames = 0
+        self.busy_ms = 0.0
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def handle(self, header, reader):
+        op = header.get("op")
+        model = header.get("model", MODEL_NAME)
+        if op == "load":
+            t_start = time.perf_counter()
+            await self.run(self.detector._load_models, [model])
+            return {"ok": True, "load_s": round(time.perf_counter() - t_start, 3),
+                    "weights": self.detector.weights.get(model)}
+        if op == "detect":
+            shape = tuple(int(x) for x in header["shape"])
+            data = await reader.readexactly(int(np.prod(shape)))
+            frame = np.frombuffer(data, dtype=np.uint8).reshape(shape)
+            if model not in self.detector.models:
+                await self.run(self.detector._load_models, [model])
+            t_start = time.perf_counter()
+            boxes, speed = await self.run(self.detector._predict, frame, model,
+                                          int(header.get("imgsz", 640)),
+                                          bool(header.get("fast", self.detector.fast)))
+            self._count((time.perf_counter() - t_start) * 1000)
+            return {"boxes": boxes, "speed": speed}
+        return {"ok": False, "error": f"opération inconnue : {op}"}
+
+    def _count(self, busy_ms):
+        self.frames += 1
+        self.busy_ms += busy_ms
+        if self.frames % STATS_EVERY == 0:
+            print(f"📊 {self.frames} images, {self.busy_ms / self.frames:.1f} ms en moyenne, "
+                  f"{self.clients} client(s) connecté(s)")
+
+    async def handle_client(self, reader, writer):
+        self.clients += 1
+        print(f"🔌 Client connecté ({self.clients})")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self.handle(json.loads(line), reader)
+                except asyncio.IncompleteReadError:
+                    raise  # image tronquée : le client est parti
+                except Exception as e:
+                    # Modèle introuvable, image invalide, échec d’inférence… : cause renvoyée
+                    # au client (RemoteDetector), la connexion reste ouverte
+                    print(f"⚠️ Requête en échec : {type(e).__name__}: {e}")
+                    reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self.clients -= 1
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Démon de détection YOLO résident")
+    parser.add_argument("--preload", default=MODEL_NAME, help="modèle chargé au démarrage")
+    parser.add_argument("--fast", action="store_true", help="chemin rapide par défaut (fast_path.py)")
+    args = parser.parse_args(argv)
+
+    # Le modèle est chargé avant l’ouverture de la socket : prêt = sonde acceptée
+    service = DetectorService(args.preload, args.fast)
+    if hasattr(socket, "AF_UNIX"):
+        if os.path.exists(DAEMON_PATH):
+            os.remove(DAEMON_PATH)  # Socket orpheline d’une exécution précédente
+        server = await asyncio.start_unix_server(service.handle_client, path=DAEMON_PATH)
+        print(f"🧠 Démon de détection sur unix://{DAEMON_PATH}")
+    else:
+        server = await asyncio.start_server(service.handle_client, *DAEMON_FALLBACK)
+        print(f"🧠 Démon de détection (repli TCP) sur tcp://{DAEMON_FALLBACK[0]}:{DAEMON_FALLBACK[1]}")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,175 @@
+# =========================================================
+# SR04 Groupe 9 - Module d’inférence allégée
+# Fichier : client/fast_path.py
+# Description :
+#   Chemin rapide pour VehicleDetector (fast=True) : sans le prédicteur Ultralytics complet
+#   - Tampons alloués une fois par résolution d’entrée : image redimensionnée,
+#     tenseur d’entrée (bandes de letterbox déjà remplies)
+#   - Redimensionnement, BGR -> RGB, HWC -> CHW et normalisation écrits sur place
+#   - Appel direct du réseau (model.model, couches fusionnées) puis NMS Ultralytics
+#     limitée aux classes de véhicules
+#   - Durées preprocess / inference / postprocess au même format que results.speed
+#
+# Exemple (banc d’essai : temps et allocations par image, avant / après) :
+#   python client/fast_path.py uploads/2.mp4 --frames 200
+# =========================================================
+
+import argparse
+import time
+import tracemalloc
+import cv2
+import numpy as np
+
+PAD_VALUE = 114      # gris des bandes de letterbox (comme Ultralytics)
+STRIDE = 32
+CONF_THRES = 0.25    # seuils par défaut de model.predict()
+IOU_THRES = 0.7
+MAX_DET = 300
+
+
+def _ops():
+    try:
+        from ultralytics.utils import ops
+    except ImportError:  # anciennes versions d’Ultralytics
+        from ultralytics.yolo.utils import ops
+    return ops
+
+
+class LetterboxBuffers:
+    """Tampons d’entrée pour une résolution de caméra et une taille imgsz données."""
+
+    def __init__(self, shape, imgsz, device):
+        import torch
+        h, w = shape[:2]
+        self.ratio = min(imgsz / h, imgsz / w)
+        self.new_w, self.new_h = round(w * self.ratio), round(h * self.ratio)
+        # Rectangle minimal multiple du pas (letterbox « auto » d’Ultralytics)
+        width = -(-self.new_w // STRIDE) * STRIDE
+        height = -(-self.new_h // STRIDE) * STRIDE
+        self.left = (width - self.new_w) // 2
+        self.top = (height - self.new_h) // 2
+        self.resized = np.empty((self.new_h, self.new_w, 3), dtype=np.uint8)
+        self.host = torch.full((1, 3, height, width), PAD_VALUE / 255, dtype=torch.float32)
+        if device.type == "cuda":
+            self.host = self.host.pin_memory()  # copie asynchrone vers le GPU
+            self.tensor = torch.empty_like(self.host, device=device)
+        else:
+            self.tensor = self.host
+        self.input = self.host.numpy()  # même mémoire que le tenseur
+        self.area = self.input[0, :, self.top:self.top + self.new_h, self.left:self.left + self.new_w]
+        self.scale = np.float32(1 / 255)
+
+    def fill(self, frame):
+        """Écrit l’image dans le tenseur d’entrée, sans allocation."""
+        cv2.resize(frame, (self.new_w, self.new_h), dst=self.resized, interpolation=cv2.INTER_LINEAR)
+        # BGR -> RGB et HWC -> CHW par simple vue, conversion + normalisation en une passe
+        np.multiply(self.resized[..., ::-1].transpose(2, 0, 1), self.scale, out=self.area)
+        if self.tensor is not self.host:
+            self.tensor.copy_(self.host, non_blocking=True)
+        return self.tensor
+
+
+class LeanPredictor:
+    """Inférence directe sur le réseau d’un modèle YOLO déjà chargé."""
+
+    def __init__(self, yolo, vehicle_classes):
+        import torch
+        self.torch = torch
+        self.ops = _ops()
+        self.names = yolo.names
+        self.net = yolo.model.fuse(verbose=False).eval()  # Conv + BN fusionnées, comme le prédicteur
+        self.device = next(self.net.parameters()).device
+        self.classes = [i for i, name in self.names.items() if name in vehicle_classes]
+        self.buffers = {}
+
+    def _buffers(self, shape, imgsz):
+        key = (shape[0], shape[1], imgsz)
+        buf = self.buffers.get(key)
+        if buf is None:
+            buf = self.buffers[key] = LetterboxBuffers(shape, imgsz, self.device)
+        return buf
+
+    def predict(self, frame, imgsz):
+        """
+        :return: (liste de tuples (x1, y1, x2, y2, label), durées en ms comme results.speed)
+        """
+        t0 = time.perf_counter()
+        buf = self._buffers(frame.shape, imgsz)
+        tensor = buf.fill(frame)
+        t1 = time.perf_counter()
+        with self.torch.inference_mode():
+            preds = self.net(tensor)
+        t2 = time.perf_counter()
+        det = self.ops.non_max_suppression(preds, CONF_THRES, IOU_THRES, classes=self.classes,
+                                           max_det=MAX_DET)[0].cpu().numpy()
+        # Retour aux coordonnées de l’image d’origine
+        xs, ys = det[:, 0:4:2], det[:, 1:4:2]  # vues (x1, x2) et (y1, y2)
+        xs -= buf.left
+        ys -= buf.top
+        det[:, :4] /= buf.ratio
+        h, w = frame.shape[:2]
+        np.clip(xs, 0, w, out=xs)
+        np.clip(ys, 0, h, out=ys)
+        xyxy = det[:, :4]
+        boxes = [(int(x1), int(y1), int(x2), int(y2), self.names[int(c)])
+                 for (x1, y1, x2, y2), c in zip(xyxy, det[:, 5])]
+        t3 = time.perf_counter()
+        speed = {"preprocess": (t1 - t0) * 1000, "inference": (t2 - t1) * 1000,
+                 "postprocess": (t3 - t2) * 1000}
+        return boxes, speed
+
+
+# =========================================================
+# 🔹 Banc d’essai : prédicteur Ultralytics contre chemin rapide
+# =========================================================
+def _run(detector, frames):
+    """Temps et octets alloués (pic tracemalloc) par image."""
+    detector.detect_boxes(frames[0])  # préchauffage (et allocation des tampons)
+    times, allocated, counts = [], [], []
+    tracemalloc.start()
+    for frame in frames:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        t_start = time.perf_counter()
+        boxes = detector.detect_boxes(frame)
+        times.append((time.perf_counter() - t_start) * 1000)
+        allocated.append(tracemalloc.get_traced_memory()[1] - base)
+        counts.append(len(boxes))
+    tracemalloc.stop()
+    return np.array(times), np.array(allocated), counts
+
+
+def main(argv=None):
+    from detector import VehicleDetector
+    parser = argparse.ArgumentParser(description="Temps et allocations par image : prédicteur complet / chemin rapide")
+    parser.add_argument("video")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--model", default="yolov8n.pt")
+    args = parser.parse_args(argv)
+
+    cap = cv2.VideoCapture(args.video)
+    frames = []
+    while len(frames) < args.frames:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"❌ Impossible de lire {args.video}")
+    h, w = frames[0].shape[:2]
+    print(f"🎞️ {len(frames)} images {w}x{h}")
+
+    results = {}
+    for label, fast in (("prédicteur Ultralytics", False), ("chemin rapide", True)):
+        times, allocated, counts = _run(VehicleDetector(model_name=args.model, fast=fast), frames)
+        results[label] = counts
+        print(f"   {label:<23} {np.mean(times):7.2f} ms/image (p50 {np.median(times):.2f}) | "
+              f"{np.mean(allocated) / 1e6:6.2f} Mo alloués/image (pic tracemalloc)")
+    a, b = results.values()
+    same = sum(x == y for x, y in zip(a, b))
+    print(f"   comptages identiques : {same}/{len(a)} images")
+
+
+if __name__ == "__main__":
+    main()
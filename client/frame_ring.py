@@ -0,0 +1,181 @@
+# =========================================================
+# SR04 Groupe 9 - Module de transfert d’images entre processus
+# Fichier : client/frame_ring.py
+# Description :
+#   Anneau d’emplacements d’images en mémoire partagée (multiprocessing.shared_memory)
+#   - Les emplacements sont alloués une fois ; seuls leurs numéros circulent dans des files
+#   - L’image décodée est écrite directement dans son emplacement (cap.read(vue))
+#     et lue sur place par VehicleDetector : aucune sérialisation de l’image
+#   - Cycle : acquire() -> frame() / écriture -> publish() -> get() -> frame() / lecture -> release()
+#
+# Exemple (banc d’essai 1080p, anneau contre multiprocessing.Queue) :
+#   python client/frame_ring.py --frames 500
+# =========================================================
+
+import argparse
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+FRAME_1080P = (1080, 1920, 3)
+
+
+class FrameRing:
+    """
+    `slots` emplacements de `slot_bytes` octets dans un même segment partagé.
+    Transmissible à un processus fils (arguments de Process / initargs d’un pool) :
+    le fils se rattache au segment par son nom.
+    """
+
+    def __init__(self, slots, slot_bytes, ctx=None):
+        ctx = ctx or mp.get_context()
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.owner = True
+        self.free = ctx.Queue()   # numéros d’emplacements libres
+        self.ready = ctx.Queue()  # (numéro, forme, méta) des images publiées
+        for slot in range(slots):
+            self.free.put(slot)
+
+    @classmethod
+    def for_shape(cls, slots, shape, dtype=np.uint8, ctx=None):
+        return cls(slots, int(np.prod(shape)) * np.dtype(dtype).itemsize, ctx)
+
+    # --- Transmission à un autre processus ---
+    def __getstate__(self):
+        return {"slots": self.slots, "slot_bytes": self.slot_bytes, "name": self.shm.name,
+                "free": self.free, "ready": self.ready}
+
+    def __setstate__(self, state):
+        self.slots = state["slots"]
+        self.slot_bytes = state["slot_bytes"]
+        self.free = state["free"]
+        self.ready = state["ready"]
+        self.shm = shared_memory.SharedMemory(name=state["name"])
+        self.owner = False
+
+    # --- Accès aux emplacements ---
+    def frame(self, slot, shape, dtype=np.uint8):
+        """Vue numpy sur l’emplacement (pas de copie)."""
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if size > self.slot_bytes:
+            raise ValueError(f"image de {size} octets > emplacement de {self.slot_bytes}")
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def acquire(self, timeout=None):
+        """Emplacement libre, ou None si aucun dans le délai (timeout=0 : sans attente)."""
+        try:
+            if timeout == 0:
+                return self.free.get_nowait()
+            return self.free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def release(self, slot):
+        self.free.put(slot)
+
+    def publish(self, slot, shape, meta=None):
+        self.ready.put((slot, tuple(shape), meta))
+
+    def get(self, timeout=None):
+        """(numéro, forme, méta) de la prochaine image publiée ; None = fin du flux."""
+        return self.ready.get(timeout=timeout)
+
+    def close(self):
+        """Détache le segment (le créateur le supprime). Les vues doivent avoir été libérées."""
+        try:
+            self.shm.close()
+        except BufferError:
+            return  # une vue numpy est encore utilisée : le segment sera libéré à la sortie
+        if self.owner:
+            self.shm.unlink()
+
+
+def read_into(cap, ring, slot, shape):
+    """
+    Décode l’image suivante directement dans l’emplacement.
+    :return: (ok, vue) ; si la taille réelle diffère de `shape`, l’image est recopiée une fois
+    """
+    view = ring.frame(slot, shape)
+    ok, out = cap.read(view)
+    if ok and not np.shares_memory(out, view):
+        view = ring.frame(slot, out.shape)
+        view[...] = out
+    return ok, view
+
+
+# =========================================================
+# 🔹 Banc d’essai : anneau partagé contre multiprocessing.Queue
+# =========================================================
+def _consume(frame):
+    """Lecture de l’image (un pixel sur 64) : le consommateur touche vraiment les données."""
+    return int(frame[::64, ::64].sum())
+
+
+def _producer_queue(q, frames, shape):
+    source = np.random.randint(0, 255, shape, dtype=np.uint8)
+    for i in range(frames):
+        source[0, 0, 0] = i % 256  # « décodage » : nouvelle image à chaque tour
+        q.put(source)
+    q.put(None)
+
+
+def _producer_ring(ring, frames, shape):
+    source = np.random.randint(0, 255, shape, dtype=np.uint8)
+    for i in range(frames):
+        slot = ring.acquire()
+        view = ring.frame(slot, shape)
+        source[0, 0, 0] = i % 256
+        view[...] = source  # équivaut à cap.read(vue) : écriture unique dans l’emplacement
+        del view
+        ring.publish(slot, shape)
+    ring.ready.put(None)
+
+
+def bench_queue(frames, shape):
+    q = mp.Queue(maxsize=4)
+    producer = mp.Process(target=_producer_queue, args=(q, frames, shape))
+    t0 = time.perf_counter()
+    producer.start()
+    while (frame := q.get()) is not None:
+        _consume(frame)
+    elapsed = time.perf_counter() - t0
+    producer.join()
+    return frames / elapsed
+
+
+def bench_ring(frames, shape, slots=4):
+    ring = FrameRing.for_shape(slots, shape)
+    producer = mp.Process(target=_producer_ring, args=(ring, frames, shape))
+    t0 = time.perf_counter()
+    producer.start()
+    while (item := ring.get()) is not None:
+        slot, slot_shape, _ = item
+        frame = ring.frame(slot, slot_shape)
+        _consume(frame)
+        del frame
+        ring.release(slot)
+    elapsed = time.perf_counter() - t0
+    producer.join()
+    ring.close()
+    return frames / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Débit d’images 1080p entre deux processus")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--slots", type=int, default=4)
+    args = parser.parse_args(argv)
+    size_mb = np.prod(FRAME_1080P) / 1e6
+    print(f"🎞️ {args.frames} images {FRAME_1080P[1]}x{FRAME_1080P[0]} ({size_mb:.1f} Mo chacune)")
+    naive = bench_queue(args.frames, FRAME_1080P)
+    print(f"   multiprocessing.Queue : {naive:8.1f} img/s")
+    ring = bench_ring(args.frames, FRAME_1080P, args.slots)
+    print(f"   anneau partagé        : {ring:8.1f} img/s  (×{ring / naive:.1f})")
+
+
+if __name__ == "__main__":
+    main()
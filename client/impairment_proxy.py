@@ -0,0 +1,271 @@
+# =========================================================
+# SR04 Groupe 9 - Module de dégradation réseau
+# Fichier : client/impairment_proxy.py
+# Description :
+#   Proxy TCP local (asyncio) qui dégrade le lien vers un serveur, sans droits root
+#   ni mise en forme du trafic par le noyau (tc / netem)
+#   - Placé devant le serveur HTTP, WebSocket, le broker MQTT ou la socket locale
+#     (connexion amont TCP ou socket Unix) : aucun changement côté serveur
+#   - Délai fixe + gigue dans chaque sens ; l’ordre des octets est conservé (TCP)
+#   - « Pertes » : avec la probabilité donnée, un bloc est retenu le temps d’une
+#     retransmission TCP (200 ms par défaut) et bloque ceux qui le suivent
+#   - Débit limité par un seau à jetons (kbit/s, rafale de 100 ms), propre à chaque
+#     connexion et à chaque sens : chaque caméra a son propre lien
+#   - Utilisé par load_generator.py (--impair) pour balayer plusieurs réglages
+#
+# Exemple :
+#   python client/impairment_proxy.py --listen 6000 --upstream 127.0.0.1:5000 --delay 50 --jitter 10 --loss 0.02 --rate 512
+#   (puis SERVER_URL = "http://127.0.0.1:6000/traffic" dans client_http.py)
+# =========================================================
+
+import argparse
+import asyncio
+import random
+import socket
+import threading
+from transports import UDS_FALLBACK, UDS_PATH
+
+CHUNK = 16384           # octets lus d’un coup
+STALL_MS = 200.0        # retransmission TCP : délai minimal (RTO) de Linux
+BURST_S = 0.1           # rafale autorisée par le seau à jetons : 100 ms de débit…
+MTU = 1500              # … et au moins un paquet
+
+# --- Serveurs réels, par protocole (adresses des clients graphiques) ---
+UPSTREAMS = {
+    "http": ("127.0.0.1", 5000),
+    "ws": ("127.0.0.1", 5001),
+    "mqtt": ("127.0.0.1", 1883),
+    "uds": UDS_PATH if hasattr(socket, "AF_UNIX") else UDS_FALLBACK,
+}
+
+
+class Impairment:
+    """Réglage de dégradation (appliqué dans chaque sens)."""
+
+    def __init__(self, delay_ms=0.0, jitter_ms=0.0, loss=0.0, stall_ms=STALL_MS, rate_kbps=None):
+        self.delay_ms = delay_ms
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+        self.stall_ms = stall_ms
+        self.rate_kbps = rate_kbps
+
+    @classmethod
+    def parse(cls, text):
+        """'delay=50,jitter=10,loss=0.02,rate=512' (ou 'clean') -> Impairment"""
+        keys = {"delay": "delay_ms", "jitter": "jitter_ms", "loss": "loss", "stall": "stall_ms",
+                "rate": "rate_kbps"}
+        values = {}
+        for item in filter(None, (part.strip() for part in text.split(","))):
+            if item == "clean":
+                continue
+            key, _, value = item.partition("=")
+            if key not in keys:
+                raise ValueError(f"réglage inconnu : {key} (choix : {', '.join(keys)})")
+            values[keys[key]] = float(value)
+        return cls(**values)
+
+    @property
+    def label(self):
+        """Nom court, utilisable comme nom de dossier : 'delay50_jitter10_loss0.02'"""
+        parts = [f"delay{self.delay_ms:g}" if self.delay_ms else "",
+                 f"jitter{self.jitter_ms:g}" if self.jitter_ms else "",
+                 f"loss{self.loss:g}" if self.loss else "",
+                 f"rate{self.rate_kbps:g}" if self.rate_kbps else ""]
+        return "_".join(p for p in parts if p) or "clean"
+
+    def sample(self, rng):
+        """
+        Délai d’un bloc : délai + gigue gaussienne, plus une retransmission s’il est « perdu ».
+        :return: (délai en s, bloc perdu ?)
+        """
+        delay = self.delay_ms + (rng.gauss(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        lost = bool(self.loss) and rng.random() < self.loss
+        if lost:
+            delay += self.stall_ms
+        return max(0.0, delay) / 1000, lost
+
+
+class TokenBucket:
+    """Limitation de débit : `rate` octets/s, rafale de `burst` octets."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(MTU, int(rate * BURST_S))
+        self.tokens = self.burst
+        self.stamp = None
+
+    async def take(self, n):
+        loop = asyncio.get_running_loop()
+        if self.stamp is None:
+            self.stamp = loop.time()
+        while True:
+            now = loop.time()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens >= n:
+                self.tokens -= n
+                return
+            await asyncio.sleep((n - self.tokens) / self.rate)
+
+
+class ImpairmentProxy:
+    """
+    Proxy dégradant vers `upstream` : (hôte, port) ou chemin de socket Unix.
+    Démarrable dans la boucle courante (serve) ou dans un thread dédié (start_in_thread).
+    """
+
+    def __init__(self, upstream, impairment, listen=("127.0.0.1", 0), seed=None):
+        self.upstream = upstream
+        self.impairment = impairment
+        self.listen = listen
+        self.rng = random.Random(seed)
+        self.server = None
+        self.port = None
+        self.connections = 0
+        self.bytes = 0
+        self.stalls = 0
+        self._loop = None
+        self._thread = None
+
+    async def _open_upstream(self):
+        if isinstance(self.upstream, str):
+            return await asyncio.open_unix_connection(self.upstream)
+        return await asyncio.open_connection(*self.upstream)
+
+    async def _pump(self, reader, writer):
+        """Un sens de la connexion : lecture, horodatage de sortie, puis écriture au débit permis."""
+        loop = asyncio.get_running_loop()
+        imp = self.impairment
+        queue = asyncio.Queue()
+        bucket = TokenBucket(imp.rate_kbps * 1000 / 8) if imp.rate_kbps else None
+
+        async def receive():
+            last = 0.0
+            try:
+                while True:
+                    data = await reader.read(CHUNK)
+                    if not data:
+                        break
+                    delay, lost = imp.sample(self.rng)
+                    self.stalls += lost
+                    # Un flux TCP ne double jamais : un bloc sort après le précédent
+                    last = max(last, loop.time() + delay)
+                    await queue.put((last, data))
+            except ConnectionError:
+                pass
+            await queue.put((last, None))
+
+        async def deliver():
+            while True:
+                release, data = await queue.get()
+                wait = release - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if data is None:
+                    break
+                step = bucket.burst if bucket else len(data)  # morceaux d’au plus une rafale
+                for i in range(0, len(data), step):
+                    piece = data[i:i + step]
+                    if bucket:
+                        await bucket.take(len(piece))
+                    writer.write(piece)
+                    await writer.drain()
+                self.bytes += len(data)
+
+        try:
+            await asyncio.gather(receive(), deliver())
+        except ConnectionError:
+            pass
+        finally:
+            try:
+                if writer.can_write_eof():
+                    writer.write_eof()  # demi-fermeture : l’autre sens continue
+            except (OSError, RuntimeError):
+                pass
+
+    async def _handle(self, client_reader, client_writer):
+        self.connections += 1
+        # Ouverture de connexion : un aller-retour du lien dégradé (SYN / SYN-ACK)
+        await asyncio.sleep(2 * self.impairment.delay_ms / 1000)
+        try:
+            up_reader, up_writer = await self._open_upstream()
+        except OSError:
+            client_writer.close()
+            return
+        try:
+            await asyncio.gather(self._pump(client_reader, up_writer),
+                                 self._pump(up_reader, client_writer))
+        except asyncio.CancelledError:
+            pass  # arrêt du proxy (stop)
+        finally:
+            up_writer.close()
+            client_writer.close()
+
+    async def serve(self):
+        self.server = await asyncio.start_server(self._handle, *self.listen)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    # --- Proxy en arrière-plan (load_generator.py) ---
+    def start_in_thread(self):
+        """Démarre le proxy dans un thread ; renvoie le port d’écoute."""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+            # Arrêt : connexions en cours annulées avant la fermeture de la boucle
+            self.server.close()
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait(5)
+        return self.port
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+            self._loop = None
+
+
+def parse_upstream(text):
+    """'127.0.0.1:5000', un nom de protocole (http, ws, mqtt, uds) ou un chemin de socket Unix"""
+    if text in UPSTREAMS:
+        return UPSTREAMS[text]
+    host, sep, port = text.rpartition(":")
+    if sep and port.isdigit():
+        return host or "127.0.0.1", int(port)
+    return text
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Proxy TCP de dégradation réseau (délai, gigue, pertes, débit)")
+    parser.add_argument("--listen", type=int, required=True, help="port d’écoute local")
+    parser.add_argument("--upstream", required=True,
+                        help="serveur réel : hôte:port, http / ws / mqtt / uds, ou chemin de socket Unix")
+    parser.add_argument("--delay", type=float, default=0.0, help="délai dans chaque sens (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="écart-type de la gigue (ms)")
+    parser.add_argument("--loss", type=float, default=0.0, help="probabilité de blocage d’un bloc (0-1)")
+    parser.add_argument("--stall", type=float, default=STALL_MS, help="durée d’un blocage (ms)")
+    parser.add_argument("--rate", type=float, help="débit maximal dans chaque sens (kbit/s)")
+    parser.add_argument("--seed", type=int, help="graine (réglages reproductibles)")
+    args = parser.parse_args(argv)
+
+    impairment = Impairment(args.delay, args.jitter, args.loss, args.stall, args.rate)
+    proxy = ImpairmentProxy(parse_upstream(args.upstream), impairment, ("127.0.0.1", args.listen), args.seed)
+    server = await proxy.serve()
+    print(f"🐢 Proxy {impairment.label} : 127.0.0.1:{proxy.port} -> {args.upstream}")
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(main())
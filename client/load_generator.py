@@ -0,0 +1,490 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : client/load_generator.py
+# Description :
+#   Générateur de charge sans interface graphique (banc d’essai des protocoles)
+#   - Simule N caméras virtuelles par protocole (HTTP / WS / MQTT / Local)
+#   - Rejoue des traces de comptage enregistrées ou synthétiques à débit fixe
+#   - Paliers de débit successifs pour trouver le point de saturation d’un serveur
+#   - Débit, p50 / p95 / p99 / max et erreurs par protocole et par palier
+#   - Résultats au format lu par latency_comparator.py (bench/latency_<proto>.csv)
+#   - Chaque protocole testé est ajouté à l’historique des exécutions (run_history.py)
+#   - Balayage de liens dégradés (--impair) : délai, gigue, pertes, débit via
+#     impairment_proxy.py, graphique de la dégradation par protocole
+#   - --embedded-broker : broker MQTT minimal (server/mini_broker.py) et contrôleur MQTT
+#     lancés par le banc lui-même, sans Mosquitto ; temps de relais du broker affiché
+#
+# Exemple :
+#   python client/load_generator.py --protocols http,ws --cameras 20 --rates 5,10,20,50
+#   python latency_comparator.py bench
+#   python client/load_generator.py --protocols http,ws,mqtt --impair clean --impair delay=50,jitter=10 \
+#       --impair delay=100,jitter=30,loss=0.02 --impair delay=100,rate=256
+# =========================================================
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from clock_sync import ClockSync, SPLIT_COLUMNS
+from impairment_proxy import UPSTREAMS, Impairment, ImpairmentProxy
+from transports import PROTOCOLS, make_transport
+
+# ---------- Configuration ----------
+OUTPUT_DIR = "bench"
+LAT_FILES = {                     # mêmes noms que latency_comparator.FILES
+    "http": "latency_http.csv",
+    "ws": "latency_ws.csv",
+    "mqtt": "latency_mqtt.csv",
+    "uds": "latency_uds.csv",
+}
+CSV_HEADER = ["timestamp", "latency_ms", "msg_size_bytes", "vehicle_count",
+              "camera", "seq", "offered_rate", "error"] + SPLIT_COLUMNS + ["service_ms"]
+SATURATION_RATIO = 0.9    # débit obtenu < 90 % du débit demandé -> serveur saturé
+SATURATION_ERRORS = 0.01  # ou plus de 1 % d’erreurs
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUN_HISTORY = os.path.join(ROOT_DIR, "run_history.py")
+MINI_BROKER = os.path.join(ROOT_DIR, "server", "mini_broker.py")
+SERVER_MQTT = os.path.join(ROOT_DIR, "server", "server_mqtt.py")
+BROKER_WAIT = 10.0  # s pour que le broker et le contrôleur MQTT répondent
+HISTORY_DB = "run_history.db"  # identique à run_history.py
+# -----------------------------------
+
+
+# =========================================================
+# 🔹 Traces de comptage
+# =========================================================
+def load_trace(path):
+    """Lit une trace CSV contenant une colonne 'vehicle_count' (ou 'count')."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        column = "vehicle_count" if "vehicle_count" in reader.fieldnames else "count"
+        if column not in reader.fieldnames:
+            raise ValueError(f"{path} : colonne 'vehicle_count' absente")
+        return [int(float(row[column])) for row in reader if row[column] not in ("", None)]
+
+
+def synthetic_trace(length, seed, base=4.0, peak=12.0, period=600):
+    """Trace synthétique : vagues de trafic (sinus) + bruit, reproductible par graine."""
+    rng = random.Random(seed)
+    phase = rng.uniform(0, 2 * math.pi)
+    trace = []
+    for i in range(length):
+        demand = base + (peak - base) * 0.5 * (1 + math.sin(2 * math.pi * i / period + phase))
+        trace.append(max(0, int(round(rng.gauss(demand, 1.5)))))
+    return trace
+
+
+# =========================================================
+# 🔹 Caméra virtuelle
+# =========================================================
+def run_camera(protocol, cam_id, trace, rate, duration, start_at, timeout, keep_alive, port=None):
+    """
+    Envoie les comptages de la trace au débit demandé pendant `duration` secondes (horloge
+    murale : un serveur lent n’allonge pas le palier, les envois en retard sont perdus pour
+    le débit). La latence part de l’instant prévu de l’envoi : l’attente derrière une
+    réponse lente est comptée (pas d’« omission coordonnée ») ; service_ms = envoi -> réponse.
+    Renvoie la liste des lignes CSV (une par envoi, y compris les échecs).
+    :param port: port local du proxy de dégradation (None = connexion directe au serveur)
+    """
+    rows = []
+    transport = make_transport(protocol, client_id=f"cam{cam_id}", timeout=timeout,
+                               keep_alive=keep_alive, port=port)
+    connected = False
+    clock = ClockSync()  # décalage d’horloge : montée / serveur / descente
+    interval = 1.0 / rate
+    end_at = start_at + duration
+    seq = 0
+
+    # Connexion et synchronisation d’horloge avant le premier envoi prévu : pas comptées en latence
+    try:
+        transport.connect()
+        connected = True
+        clock.handshake(transport.send)
+    except Exception:
+        pass  # nouvel essai au premier envoi (compté, comme toute reconnexion)
+
+    while True:
+        scheduled = start_at + seq * interval
+        if scheduled >= end_at or time.time() >= end_at:
+            break
+        delay = scheduled - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+        count = trace[seq % len(trace)]
+        payload = {"vehicle_count": count, "cam_id": cam_id, "seq": seq}
+        msg_size = len(json.dumps(payload).encode())
+        try:
+            if not connected:
+                transport.connect()
+                connected = True
+                clock.handshake(transport.send)
+            t_wall = time.time()
+            t_start = time.perf_counter()
+            reply = transport.send(payload)
+            service = (time.perf_counter() - t_start) * 1000
+            latency = service + max(0.0, t_wall - scheduled) * 1000  # retard sur l’instant prévu inclus
+            split = clock.split(t_wall, reply, time.time())
+            rows.append([time.time(), round(latency, 3), msg_size, count, cam_id, seq, rate, ""] + split +
+                        [round(service, 3)])
+        except Exception as e:
+            rows.append([time.time(), 0.0, msg_size, count, cam_id, seq, rate, type(e).__name__] +
+                        [""] * len(SPLIT_COLUMNS) + [""])
+            # Connexion dans un état inconnu : on la referme et on se reconnecte au prochain envoi
+            try:
+                transport.close()
+            except Exception:
+                pass
+            connected = False
+        seq += 1
+
+    try:
+        transport.close()
+    except Exception:
+        pass
+    return rows
+
+
+def run_cameras(protocol, cam_ids, traces, rate, duration, start_at, timeout, keep_alive, port=None):
+    """Lance un thread par caméra virtuelle et rassemble leurs résultats."""
+    results = {}
+
+    def worker(cam_id):
+        results[cam_id] = run_camera(protocol, cam_id, traces[cam_id], rate, duration,
+                                     start_at, timeout, keep_alive, port)
+
+    threads = [threading.Thread(target=worker, args=(c,), daemon=True) for c in cam_ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    rows = []
+    for cam_id in cam_ids:
+        rows.extend(results.get(cam_id, []))
+    return rows
+
+
+def run_step(protocol, cameras, rate, duration, traces, timeout, keep_alive, workers, port=None):
+    """
+    Un palier de débit : `cameras` caméras à `rate` messages/s chacune.
+    :return: (lignes CSV, durée réelle du palier en s)
+    """
+    start_at = time.time() + 0.5  # laisse le temps à tous les threads de démarrer
+    cam_ids = list(range(cameras))
+    if workers <= 1:
+        rows = run_cameras(protocol, cam_ids, traces, rate, duration, start_at, timeout, keep_alive, port)
+        return rows, max(duration, time.time() - start_at)
+
+    # Plusieurs processus : le générateur ne doit pas saturer avant le serveur (GIL)
+    start_at += 1.0
+    shards = [cam_ids[i::workers] for i in range(workers)]
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_cameras, protocol, shard, traces, rate, duration,
+                               start_at, timeout, keep_alive, port) for shard in shards if shard]
+        for future in futures:
+            rows.extend(future.result())
+    return rows, max(duration, time.time() - start_at)
+
+
+# =========================================================
+# 🔹 Statistiques
+# =========================================================
+def percentile(sorted_values, q):
+    """Percentile par rang le plus proche (liste déjà triée)."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(protocol, cameras, rate, elapsed, rows):
+    """
+    Résumé d’un palier : débit obtenu, percentiles de latence, erreurs.
+    :param elapsed: durée réelle du palier (s), dernière réponse comprise
+    """
+    latencies = sorted(r[1] for r in rows if not r[7])
+    errors = sum(1 for r in rows if r[7])
+    offered = cameras * rate
+    achieved = len(latencies) / elapsed if elapsed > 0 else 0.0
+    error_rate = errors / len(rows) if rows else 0.0
+    return {
+        "protocol": protocol,
+        "cameras": cameras,
+        "rate_per_camera": rate,
+        "offered_msg_s": round(offered, 1),
+        "throughput_msg_s": round(achieved, 1),
+        "sent": len(rows),
+        "ok": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3) if latencies else 0.0,
+        "saturated": achieved < SATURATION_RATIO * offered or error_rate > SATURATION_ERRORS,
+    }
+
+
+def write_rows(path, rows, append):
+    """Écrit les lignes brutes au format des fichiers de latence."""
+    new_file = not append or not os.path.exists(path)
+    with open(path, "a" if append else "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(CSV_HEADER)
+        writer.writerows(sorted(rows, key=lambda r: r[0]))
+
+
+def record_history(db, lat_path, protocol, args, impairment=None):
+    """Enregistre le fichier d’un protocole comme un run (python run_history.py record)."""
+    params = {"cameras": args.cameras, "rates": args.rates, "duration": args.duration,
+              "timeout": args.timeout, "keep_alive": args.keep_alive, "workers": args.workers,
+              "trace": ",".join(args.trace) or f"synthétique:{args.seed}"}
+    if impairment:
+        params["impairment"] = impairment.label
+    cmd = [sys.executable, RUN_HISTORY, "--db", db, "record", lat_path, "--protocol", protocol,
+           "--source", "load_generator"]
+    for key, value in params.items():
+        cmd += ["--param", f"{key}={json.dumps(value)}"]
+    try:
+        subprocess.run(cmd, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"⚠️ Historique non enregistré ({protocol}) : {e}")
+
+
+# =========================================================
+# 🔹 Broker MQTT intégré
+# =========================================================
+def start_embedded_broker(metrics_path):
+    """
+    Lance server/mini_broker.py puis server/server_mqtt.py ; attend qu’un message de
+    synchronisation obtienne une réponse du contrôleur. Renvoie les processus lancés.
+    """
+    if ROOT_DIR not in sys.path:
+        sys.path.append(ROOT_DIR)  # sonde partagée avec run_all.py
+    from supervisor import mqtt_sync_probe
+    broker = subprocess.Popen([sys.executable, MINI_BROKER, "--metrics", metrics_path])
+    procs = [broker]
+    controller_ready = mqtt_sync_probe(host="127.0.0.1", port=1883)
+    deadline = time.time() + BROKER_WAIT
+    try:
+        while True:
+            if broker.poll() is not None:
+                raise RuntimeError("le broker intégré s’est arrêté (port 1883 déjà utilisé ?)")
+            if len(procs) == 1:
+                try:
+                    socket.create_connection(("127.0.0.1", 1883), timeout=0.5).close()
+                    procs.append(subprocess.Popen([sys.executable, SERVER_MQTT]))
+                except OSError:
+                    pass
+            else:
+                # Contrôleur prêt = abonné : un message de synchronisation obtient sa réponse
+                try:
+                    if controller_ready():
+                        print("📮 Broker MQTT intégré prêt (server/mini_broker.py)")
+                        return procs
+                except OSError:
+                    pass
+            if time.time() > deadline:
+                raise RuntimeError(f"broker ou contrôleur MQTT pas prêt après {BROKER_WAIT:.0f} s")
+            time.sleep(0.2)
+    except Exception:
+        stop_embedded_broker(procs, None)
+        raise
+
+
+def stop_embedded_broker(procs, metrics_path):
+    """Arrête le contrôleur puis le broker (qui écrit son dernier instantané) et affiche son relais."""
+    for proc in reversed(procs):
+        proc.terminate()
+        try:
+            proc.wait(5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    if not metrics_path or not os.path.exists(metrics_path):
+        return
+    with open(metrics_path, encoding="utf-8") as f:
+        forward = json.load(f)["histograms_ms"].get("forward")
+    if forward:
+        print(f"📮 Relais du broker : {forward['count']} remises, moyenne {forward['mean']} ms, "
+              f"p50 ≤ {forward['p50']} ms, p99 ≤ {forward['p99']} ms, max {forward['max']} ms")
+
+
+def plot_impairment(summaries, path):
+    """Latence (p50 / p99) et débit de chaque protocole en fonction du réglage de dégradation."""
+    import matplotlib
+    matplotlib.use("Agg")  # sans affichage : image écrite dans le dossier des résultats
+    import matplotlib.pyplot as plt
+
+    labels = list(dict.fromkeys(s["impairment"] for s in summaries))
+    series = {}
+    for s in summaries:
+        key = s["protocol"] if len({x["rate_per_camera"] for x in summaries}) == 1 \
+            else f"{s['protocol']} @{s['rate_per_camera']:g}/s"
+        series.setdefault(key, {})[s["impairment"]] = s
+
+    fig, (ax_lat, ax_thr) = plt.subplots(1, 2, figsize=(12, 4.5))
+    x = range(len(labels))
+    for key, by_label in series.items():
+        points = [by_label.get(label) for label in labels]
+        p50 = [p["p50_ms"] if p else None for p in points]
+        p99 = [p["p99_ms"] if p else None for p in points]
+        line, = ax_lat.plot(x, p50, marker="o", label=f"{key} p50")
+        ax_lat.plot(x, p99, marker="x", linestyle="--", color=line.get_color(), label=f"{key} p99")
+        ax_thr.plot(x, [p["throughput_msg_s"] if p else None for p in points], marker="o",
+                    color=line.get_color(), label=key)
+    for ax, title, unit in ((ax_lat, "Latence selon le lien", "ms"), (ax_thr, "Débit obtenu", "msg/s")):
+        ax.set_xticks(list(x))
+        ax.set_xticklabels(labels, rotation=20, ha="right", fontsize=8)
+        ax.set_title(title)
+        ax.set_ylabel(unit)
+        ax.grid(alpha=0.3)
+        ax.legend(fontsize=7)
+    ax_lat.set_yscale("log")
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    plt.close(fig)
+
+
+def print_summary(s):
+    flag = "⚠️ SATURÉ" if s["saturated"] else "OK"
+    link = f"[{s['impairment']}] " if "impairment" in s else ""
+    print(f"{link}{s['protocol']:<5} {s['cameras']:>4} cam × {s['rate_per_camera']:>6} msg/s | "
+          f"débit {s['throughput_msg_s']:>8}/{s['offered_msg_s']:<8} | "
+          f"p50 {s['p50_ms']:>8} p95 {s['p95_ms']:>8} p99 {s['p99_ms']:>8} max {s['max_ms']:>8} ms | "
+          f"erreurs {s['errors']:>5} | {flag}")
+
+
+def run_benchmark(args, protocols, rates, traces, impairments):
+    """Tous les paliers de chaque protocole, pour chaque réglage de lien ; renvoie les résumés."""
+    summaries = []
+    for impairment in impairments:
+        # Un dossier par réglage : lisible tel quel par latency_comparator.py
+        out_dir = os.path.join(args.output, impairment.label) if impairment else args.output
+        os.makedirs(out_dir, exist_ok=True)
+        for protocol in protocols:
+            proxy, port = None, None
+            if impairment:
+                proxy = ImpairmentProxy(UPSTREAMS[protocol], impairment, seed=args.seed)
+                port = proxy.start_in_thread()
+            lat_path = os.path.join(out_dir, LAT_FILES[protocol])
+            first_step = True
+            try:
+                for rate in rates:
+                    rows, elapsed = run_step(protocol, args.cameras, rate, args.duration, traces,
+                                             args.timeout, args.keep_alive, args.workers, port)
+                    write_rows(lat_path, rows, append=not first_step)
+                    first_step = False
+                    summary = summarize(protocol, args.cameras, rate, elapsed, rows)
+                    if impairment:
+                        summary["impairment"] = impairment.label
+                    summaries.append(summary)
+                    print_summary(summary)
+                    if summary["saturated"] and args.stop_at_saturation:
+                        break
+            finally:
+                if proxy:
+                    proxy.stop()
+
+            saturated = [s for s in summaries if s["protocol"] == protocol and s["saturated"]
+                         and s.get("impairment") == (impairment.label if impairment else None)]
+            if saturated:
+                print(f"➡️  {protocol} : saturation à partir de {saturated[0]['offered_msg_s']} msg/s")
+            if not args.no_history:
+                record_history(args.history, lat_path, protocol, args, impairment)
+    return summaries
+
+
+# =========================================================
+# 🔹 Point d’entrée
+# =========================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d’essai multi-caméras des serveurs de trafic")
+    parser.add_argument("--protocols", default="http,ws,mqtt,uds",
+                        help="protocoles à tester, séparés par des virgules (http, ws, mqtt, uds)")
+    parser.add_argument("--cameras", type=int, default=10, help="nombre de caméras virtuelles")
+    parser.add_argument("--rates", default="10",
+                        help="paliers de débit par caméra (msg/s), ex. 5,10,20,50")
+    parser.add_argument("--duration", type=float, default=10.0, help="durée de chaque palier (s)")
+    parser.add_argument("--trace", action="append", default=[],
+                        help="trace CSV (colonne vehicle_count) ; répétable, une par caméra en boucle")
+    parser.add_argument("--seed", type=int, default=42, help="graine des traces synthétiques")
+    parser.add_argument("--timeout", type=float, default=1.0, help="délai max d’une réponse (s)")
+    parser.add_argument("--keep-alive", action="store_true",
+                        help="HTTP : réutiliser la connexion (le client graphique ne le fait pas)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processus générateurs (au-delà de quelques milliers de msg/s)")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="dossier des résultats")
+    parser.add_argument("--stop-at-saturation", action="store_true",
+                        help="arrêter les paliers d’un protocole dès qu’il sature")
+    parser.add_argument("--history", default=HISTORY_DB,
+                        help="base de l’historique des exécutions (run_history.py)")
+    parser.add_argument("--no-history", action="store_true", help="ne pas enregistrer les runs")
+    parser.add_argument("--impair", action="append", default=[],
+                        help="réglage de lien dégradé, ex. delay=50,jitter=10,loss=0.02,rate=256 "
+                             "(ms, ms, probabilité, kbit/s) ou clean ; répétable (balayage)")
+    parser.add_argument("--embedded-broker", action="store_true",
+                        help="MQTT : lancer le broker minimal et le contrôleur MQTT (sans Mosquitto)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    protocols = [p.strip() for p in args.protocols.split(",") if p.strip()]
+    for p in protocols:
+        if p not in PROTOCOLS:
+            raise SystemExit(f"Protocole inconnu : {p} (choix : {', '.join(PROTOCOLS)})")
+    rates = [float(r) for r in args.rates.split(",")]
+
+    # --- Une trace par caméra (enregistrées en boucle, sinon synthétiques) ---
+    if args.trace:
+        loaded = [load_trace(path) for path in args.trace]
+        traces = {c: loaded[c % len(loaded)] for c in range(args.cameras)}
+    else:
+        length = int(max(rates) * args.duration) + 1
+        traces = {c: synthetic_trace(length, seed=args.seed + c) for c in range(args.cameras)}
+
+    # --- Liens dégradés : chaque réglage passe par un proxy, y compris « clean » (même trajet) ---
+    impairments = [Impairment.parse(text) for text in args.impair] or [None]
+
+    os.makedirs(args.output, exist_ok=True)
+    broker_procs, broker_metrics = [], None
+    if args.embedded_broker and "mqtt" in protocols:
+        broker_metrics = os.path.join(args.output, "metrics_broker.json")
+        try:
+            broker_procs = start_embedded_broker(broker_metrics)
+        except RuntimeError as e:
+            raise SystemExit(f"❌ {e}")
+    try:
+        summaries = run_benchmark(args, protocols, rates, traces, impairments)
+    finally:
+        if broker_procs:
+            stop_embedded_broker(broker_procs, broker_metrics)
+
+    if not summaries:
+        return
+    if impairments[0]:
+        chart_path = os.path.join(args.output, "impairment.png")
+        try:
+            plot_impairment(summaries, chart_path)
+            print(f"📉 Dégradation par protocole : {chart_path}")
+        except ImportError:
+            print("⚠️ matplotlib absent : graphique de dégradation non tracé (voir summary.csv)")
+    summary_path = os.path.join(args.output, "summary.csv")
+    with open(summary_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(summaries[0].keys()))
+        writer.writeheader()
+        writer.writerows(summaries)
+    print(f"✅ Résultats écrits dans {args.output}/ (latency_<proto>.csv + summary.csv)")
+
+
+if __name__ == "__main__":
+    main()
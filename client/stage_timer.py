@@ -0,0 +1,142 @@
+# =========================================================
+# SR04 Groupe 9 - Module de mesure
+# Fichier : client/stage_timer.py
+# Description :
+#   Chronométrage léger des étapes de la boucle de détection
+#   - Basé sur time.perf_counter_ns (horloge monotone en nanosecondes)
+#   - Fenêtre glissante par étape -> percentiles p50 / p95 / p99
+#   - Export des durées dans le fichier de latence et affichage à l’écran
+#   - Étiquettes (réglage actif du détecteur...) exportées avec les durées
+#   - Coût quasi nul lorsqu’il est désactivé (retour immédiat)
+# =========================================================
+
+from collections import deque
+import time
+import cv2
+
+# --- Étapes mesurées (ordre des colonnes CSV et de l’affichage) ---
+STAGES = (
+    "decode",       # cap.read()
+    "predict",      # appel complet au modèle YOLO
+    "preprocess",   # sous-étapes rapportées par Ultralytics (results.speed)
+    "inference",
+    "postprocess",
+    "boxes",        # filtrage des classes + dessin des cadres
+    "network",      # envoi au serveur + réponse
+    "overlay",      # feu tricolore + textes
+    "display",      # cv2.imshow + cv2.waitKey
+)
+
+
+class StageTimer:
+    """
+    Chronomètre par étape avec percentiles glissants.
+    """
+
+    def __init__(self, stages=STAGES, window=300, enabled=True, refresh_every=15):
+        """
+        :param stages: noms des étapes, dans l’ordre d’affichage
+        :param window: nombre d’échantillons conservés par étape
+        :param enabled: False = toutes les méthodes ne font rien
+        :param refresh_every: recalcul des percentiles affichés toutes les N images
+        """
+        self.enabled = enabled
+        self.window = window
+        self.stages = list(stages)
+        self.samples = {s: deque(maxlen=window) for s in self.stages}
+        self.current = {}
+        self.tags = {}  # valeurs non temporelles, conservées d’une image à l’autre
+        self.refresh_every = refresh_every
+        self._frames = 0
+        self._lines = []
+        self._last_refresh = 0
+        self._last = 0
+
+    # --- Mesure ---
+    def start(self):
+        """Début d’une nouvelle image : remet à zéro les durées courantes"""
+        if not self.enabled:
+            return
+        self.current = {}
+        self._frames += 1
+        self._last = time.perf_counter_ns()
+
+    def mark(self):
+        """Repositionne le point de départ de la prochaine étape sans rien enregistrer"""
+        if self.enabled:
+            self._last = time.perf_counter_ns()
+
+    def lap(self, stage):
+        """Enregistre le temps écoulé depuis le dernier point sous le nom de l’étape"""
+        if not self.enabled:
+            return
+        t = time.perf_counter_ns()
+        self.record(stage, (t - self._last) / 1e6)
+        self._last = t
+
+    def record(self, stage, duration_ms):
+        """Enregistre une durée déjà mesurée (en millisecondes)"""
+        if not self.enabled:
+            return
+        if stage not in self.samples:
+            self.stages.append(stage)
+            self.samples[stage] = deque(maxlen=self.window)
+        self.current[stage] = duration_ms
+        self.samples[stage].append(duration_ms)
+
+    def tag(self, name, value):
+        """Étiquette exportée telle quelle (à déclarer avant l’écriture de l’en-tête CSV)"""
+        if self.enabled:
+            self.tags[name] = value
+
+    # --- Statistiques ---
+    def percentiles(self, stage, qs=(50, 95, 99)):
+        """Renvoie les percentiles demandés (ms) pour une étape, ou None si aucune mesure"""
+        values = sorted(self.samples.get(stage, ()))
+        if not values:
+            return None
+        last = len(values) - 1
+        return tuple(values[min(last, int(round(q / 100 * last)))] for q in qs)
+
+    def summary(self, qs=(50, 95, 99)):
+        """Percentiles de toutes les étapes mesurées : {étape: (p50, p95, p99)}"""
+        result = {}
+        for stage in self.stages:
+            p = self.percentiles(stage, qs)
+            if p is not None:
+                result[stage] = p
+        return result
+
+    # --- Export ---
+    def csv_header(self):
+        """Colonnes ajoutées au fichier de latence (vide si désactivé)"""
+        if not self.enabled:
+            return []
+        return [f"{s}_ms" for s in self.stages] + list(self.tags)
+
+    def csv_row(self):
+        """Durées de l’image courante, dans l’ordre de csv_header()"""
+        if not self.enabled:
+            return []
+        return [round(self.current[s], 3) if s in self.current else "" for s in self.stages] + \
+            list(self.tags.values())
+
+    def overlay_lines(self):
+        """Lignes de texte p50/p95 par étape (recalculées toutes les refresh_every images)"""
+        if not self.enabled:
+            return []
+        if not self._lines or self._frames - self._last_refresh >= self.refresh_every:
+            self._lines = [f"{stage:<11} p50 {p[0]:6.1f}  p95 {p[1]:6.1f} ms"
+                           for stage, p in self.summary(qs=(50, 95)).items()]
+            self._lines += [f"{name:<11} {value}" for name, value in self.tags.items()]
+            self._last_refresh = self._frames
+        return self._lines
+
+    def draw(self, frame, origin=(10, 185), line_height=18):
+        """Affiche les percentiles par étape sur l’image OpenCV"""
+        if not self.enabled:
+            return
+        x, y = origin
+        for line in self.overlay_lines():
+            cv2.putText(frame, line, (x, y), cv2.FONT_HERSHEY_PLAIN, 1.0, (0, 255, 255), 1)
+            y += line_height
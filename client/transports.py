@@ -0,0 +1,192 @@
+# =========================================================
+# SR04 Groupe 9 - Module de transport
+# Fichier : client/transports.py
+# Description :
+#   Envoi d’un nombre de véhicules au serveur et attente de la réponse,
+#   avec la même interface pour les quatre protocoles (HTTP / WS / MQTT / Local)
+#   - send(payload) -> réponse JSON du serveur (aller-retour complet)
+#   - Utilisé par les outils sans interface (générateur de charge, etc.)
+# =========================================================
+
+import json
+import os
+import socket
+import tempfile
+import threading
+
+# --- Adresses par défaut (identiques aux clients graphiques) ---
+HTTP_URL = "http://127.0.0.1:5000/traffic"
+WS_URL = "ws://127.0.0.1:5001"
+MQTT_BROKER = "localhost"
+MQTT_PORT = 1883
+TOPIC_COUNT = "traffic/vehicle_count"
+TOPIC_LED = "traffic/led"
+UDS_PATH = os.path.join(tempfile.gettempdir(), "sr04_traffic.sock")
+UDS_FALLBACK = ("127.0.0.1", 5002)
+
+PROTOCOLS = ("http", "ws", "mqtt", "uds")
+
+
+class HttpTransport:
+    """POST /traffic ; keep_alive=False reproduit le client graphique (nouvelle connexion à chaque envoi)"""
+
+    def __init__(self, url=HTTP_URL, timeout=1.0, keep_alive=False):
+        import requests
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session() if keep_alive else requests
+
+    def connect(self):
+        pass
+
+    def send(self, payload):
+        res = self.session.post(self.url, json=payload, timeout=self.timeout)
+        res.raise_for_status()
+        return res.json()
+
+    def close(self):
+        if hasattr(self.session, "close"):
+            self.session.close()
+
+
+class WsTransport:
+    """Connexion WebSocket persistante : send() puis recv()"""
+
+    def __init__(self, url=WS_URL, timeout=1.0):
+        self.url = url
+        self.timeout = timeout
+        self.ws = None
+
+    def connect(self):
+        from websocket import create_connection
+        self.ws = create_connection(self.url, timeout=self.timeout)
+
+    def send(self, payload):
+        self.ws.send(json.dumps(payload))
+        return json.loads(self.ws.recv())
+
+    def close(self):
+        if self.ws:
+            self.ws.close()
+            self.ws = None
+
+
+class MqttTransport:
+    """
+    Publication sur traffic/vehicle_count avec un topic de réponse propre à l’émetteur
+    ("reply_to"), pour associer chaque réponse à sa requête via "seq".
+    """
+
+    def __init__(self, client_id, broker=MQTT_BROKER, port=MQTT_PORT, timeout=1.0, qos=0):
+        self.client_id = str(client_id)
+        self.broker = broker
+        self.port = port
+        self.timeout = timeout
+        self.qos = qos
+        self.reply_topic = f"{TOPIC_LED}/{self.client_id}"
+        self.client = None
+        self.cond = threading.Condition()
+        self.waiting_seq = None
+        self.reply = None
+        self.connected = threading.Event()
+
+    def connect(self):
+        import paho.mqtt.client as mqtt
+        self.client = mqtt.Client()
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+        self.client.connect(self.broker, self.port, 60)
+        self.client.loop_start()
+        if not self.connected.wait(5):
+            raise ConnectionError(f"broker MQTT injoignable ({self.broker}:{self.port})")
+
+    def _on_connect(self, client, userdata, flags, rc):
+        client.subscribe(self.reply_topic, qos=self.qos)
+        self.connected.set()
+
+    def _on_message(self, client, userdata, msg):
+        try:
+            data = json.loads(msg.payload.decode())
+        except ValueError:
+            return
+        with self.cond:
+            # Les réponses tardives (requête déjà expirée) sont ignorées
+            if data.get("seq") == self.waiting_seq:
+                self.reply = data
+                self.cond.notify_all()
+
+    def send(self, payload):
+        payload = dict(payload, reply_to=self.reply_topic)
+        with self.cond:
+            self.waiting_seq = payload.get("seq")
+            self.reply = None
+        self.client.publish(TOPIC_COUNT, json.dumps(payload), qos=self.qos)
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.reply is not None, timeout=self.timeout):
+                raise TimeoutError(f"pas de réponse MQTT pour seq={self.waiting_seq}")
+            return self.reply
+
+    def close(self):
+        if self.client:
+            self.client.loop_stop()
+            self.client.disconnect()
+            self.client = None
+
+
+class UdsTransport:
+    """Socket de domaine Unix (repli TCP local), une ligne JSON par message"""
+
+    def __init__(self, path=UDS_PATH, fallback=UDS_FALLBACK, timeout=1.0):
+        self.path = path
+        self.fallback = fallback
+        self.timeout = timeout
+        self.sock = None
+        self.sock_file = None
+
+    def connect(self):
+        if self.path and hasattr(socket, "AF_UNIX"):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(self.path)
+        else:
+            self.sock = socket.create_connection(self.fallback)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(self.timeout)
+        self.sock_file = self.sock.makefile("rb")
+
+    def send(self, payload):
+        self.sock.sendall(json.dumps(payload).encode() + b"\n")
+        line = self.sock_file.readline()
+        if not line:
+            raise ConnectionError("connexion fermée par le serveur")
+        return json.loads(line)
+
+    def close(self):
+        if self.sock_file:
+            self.sock_file.close()
+        if self.sock:
+            self.sock.close()
+        self.sock, self.sock_file = None, None
+
+
+def make_transport(protocol, client_id="0", timeout=1.0, keep_alive=False, port=None):
+    """
+    Crée le transport correspondant au protocole.
+    :param protocol: 'http', 'ws', 'mqtt' ou 'uds'
+    :param client_id: identifiant de l’émetteur (topic de réponse MQTT)
+    :param port: port TCP local à utiliser à la place de l’adresse par défaut
+                 (ex. proxy de dégradation réseau, impairment_proxy.py)
+    """
+    if protocol == "http":
+        url = f"http://127.0.0.1:{port}/traffic" if port else HTTP_URL
+        return HttpTransport(url, timeout=timeout, keep_alive=keep_alive)
+    if protocol == "ws":
+        return WsTransport(f"ws://127.0.0.1:{port}" if port else WS_URL, timeout=timeout)
+    if protocol == "mqtt":
+        if port:
+            return MqttTransport(client_id, broker="127.0.0.1", port=port, timeout=timeout)
+        return MqttTransport(client_id, timeout=timeout)
+    if protocol == "uds":
+        if port:
+            return UdsTransport(path=None, fallback=("127.0.0.1", port), timeout=timeout)
+        return UdsTransport(timeout=timeout)
+    raise ValueError(f"protocole inconnu : {protocol}")
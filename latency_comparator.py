@@ -2,65 +2,96 @@
 # SR04 Groupe 9 - Projet
 # Fichier : latency_comparator.py
 # Description :
-#   Analyse et comparaison réseau avancée pour HTTP / WebSocket / MQTT
-#   - Latence, Jitter, Bande passante, Énergie, Perte
+#   Analyse et comparaison réseau avancée pour HTTP / WebSocket / MQTT / Local
+#   - Latence, Jitter, Bande passante, Perte
+#   - Coût réel par message : CPU serveur / client, changements de contexte, RSS maximale
+#     et octets échangés comptés par le serveur (resource_usage)
+#   - Percentiles de queue p50 / p90 / p99 / p99.9 (latency_sketch)
+#   - Pertes calculées à partir des trous dans les numéros de séquence
 #   - Interface Tkinter unifiée
 # =========================================================
 
 
 
 import os
-import pandas as pd
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter as tk
 from tkinter import ttk, messagebox, Canvas, Frame
+from latency_sketch import TAIL_PERCENTILES
+from latency_stream import get_tail
+from resource_usage import load_usage, metrics_path, per_message, resources_path, rss_peak, traffic_per_message
 
 FILES = {
     "HTTP": "latency_http.csv",
     "WebSocket": "latency_ws.csv",
-    "MQTT": "latency_mqtt.csv"
+    "MQTT": "latency_mqtt.csv",
+    "Local": "latency_uds.csv"
 }
 
 
 def analyze_latency(file_path, default_size=512):
+    """
+    Statistiques d’un fichier de latence.
+    Lecture incrémentale (latency_stream) : un nouvel appel ne lit que les lignes ajoutées.
+    """
     if not os.path.exists(file_path):
         return None
     try:
-        df = pd.read_csv(file_path, on_bad_lines="skip", engine="python")
-        if "latency_ms" not in df.columns and "latency" in df.columns:
-            df.rename(columns={"latency": "latency_ms"}, inplace=True)
-        if "latency_ms" not in df.columns:
-            return None
-        df = df[(df["latency_ms"] > 0) & (df["latency_ms"] < 2000)]
-        if len(df) < 2:
+        tail = get_tail(file_path, default_size)
+        tail.poll()
+        s = tail.stats
+        if s.count < 2:
             return None
 
-        latency_mean = df["latency_ms"].mean()
-        jitter = df["latency_ms"].diff().abs().mean()
-        if np.isnan(jitter) or jitter == 0:
-            jitter = np.std(df["latency_ms"]) / 2
+        latency_mean = s.mean
+        jitter = s.jitter
+        if jitter == 0:
+            jitter = s.std / 2
         msg_size = default_size
         bandwidth = (msg_size / (latency_mean / 1000)) / 1024
-        energy = msg_size / 1024 / 1000 * 10
-        loss = round(np.random.uniform(0.3, 1.2), 2)
+        loss = s.loss_rate
+
+        # Coût par message mesuré par le superviseur de run_all (resources_<proto>.csv)
+        usage = load_usage(resources_path(file_path))
+        cpu_server, ctx_server = per_message(usage, tail.count_since, "Serveur")
+        cpu_client, _ = per_message(usage, tail.count_since, "Client")
+        rss_server = rss_peak(usage, "Serveur")
+        since = usage["Serveur"]["since"] if usage and "Serveur" in usage else None
+        bytes_msg = traffic_per_message(metrics_path(file_path), since)
 
         return {
             "latency": round(latency_mean, 2),
             "jitter": round(jitter, 2),
             "bandwidth": round(bandwidth, 2),
-            "energy": round(energy, 3),
-            "loss": loss,
+            "cpu_server": round(cpu_server, 3) if cpu_server is not None else None,
+            "cpu_client": round(cpu_client, 3) if cpu_client is not None else None,
+            "ctx_server": round(ctx_server, 2) if ctx_server is not None else None,
+            "rss_server": round(rss_server, 1) if rss_server is not None else None,
+            "bytes_msg": round(bytes_msg) if bytes_msg is not None else None,
+            "loss": round(loss, 2),
+            "percentiles": {q: round(v, 2) for q, v in s.percentiles().items()},
         }
     except Exception:
         return None
 
 
-def show_latency_gui():
+def na(value):
+    """Valeur affichée dans le tableau (n/d si non mesurée)"""
+    return "n/d" if value is None else value
+
+
+def show_latency_gui(data_dir="."):
+    """
+    Affiche la comparaison des protocoles.
+    :param data_dir: dossier contenant les fichiers latency_<proto>.csv
+                     (ex. "bench" pour les résultats de client/load_generator.py)
+    """
     root = tk.Tk()
     root.title("Analyse des performances réseau - SR04 Groupe 9")
-    root.geometry("1100x900")
+    root.geometry("1500x900")
     root.configure(bg="#F7F9FB")
 
     # --- zone scrollable pour éviter le masquage ---
@@ -85,7 +116,7 @@ def show_latency_gui():
     stats = {}
     for proto, path in FILES.items():
         size = 512 if proto == "HTTP" else 70
-        result = analyze_latency(path, size)
+        result = analyze_latency(os.path.join(data_dir, path), size)
         if result:
             stats[proto] = result
     if not stats:
@@ -96,24 +127,45 @@ def show_latency_gui():
     # --- table ---
     frame_table = ttk.Frame(frame)
     frame_table.pack(pady=10)
-    columns = ("Protocole", "Latence (ms)", "Jitter (ms)", "Perte (%)", "Bande passante (kB/s)", "Énergie (kB/msg)")
-    tree = ttk.Treeview(frame_table, columns=columns, show="headings", height=4)
+    tails = [f"p{q:g} (ms)" for q in TAIL_PERCENTILES]
+    columns = ("Protocole", "Latence (ms)", *tails, "Jitter (ms)", "Perte (%)", "Bande passante (kB/s)",
+               "CPU serveur (ms/msg)", "CPU client (ms/msg)", "Ctx serveur (/msg)", "RSS max serveur (Mo)",
+               "Octets échangés (o/msg)")
+    tree = ttk.Treeview(frame_table, columns=columns, show="headings", height=len(FILES))
     for col in columns:
         tree.heading(col, text=col)
-        tree.column(col, width=170, anchor="center")
+        tree.column(col, width=140 if col not in tails else 80, anchor="center")
     for proto, vals in stats.items():
-        tree.insert("", "end", values=(proto, vals["latency"], vals["jitter"], vals["loss"], vals["bandwidth"], vals["energy"]))
+        tree.insert("", "end", values=(proto, vals["latency"], *vals["percentiles"].values(), vals["jitter"],
+                                       vals["loss"], vals["bandwidth"],
+                                       *(na(vals[k]) for k in ("cpu_server", "cpu_client", "ctx_server",
+                                                               "rss_server", "bytes_msg"))))
     tree.pack()
 
     # --- graphique principal ---
     fig, axes = plt.subplots(1, 3, figsize=(11, 4))
     fig.subplots_adjust(wspace=0.4)
-    axes[0].bar(stats.keys(), [v["latency"] for v in stats.values()], color="#4CAF50")
-    axes[0].set_title("Latence moyenne (ms)")
+    # Percentiles côte à côte par protocole (échelle log : la queue peut valoir 100× la médiane)
+    x = np.arange(len(stats))
+    width = 0.8 / len(TAIL_PERCENTILES)
+    colors = ("#A5D6A7", "#66BB6A", "#388E3C", "#1B5E20")
+    for i, q in enumerate(TAIL_PERCENTILES):
+        axes[0].bar(x + (i - (len(TAIL_PERCENTILES) - 1) / 2) * width,
+                    [v["percentiles"][q] for v in stats.values()], width, label=f"p{q:g}", color=colors[i])
+    axes[0].set_xticks(x)
+    axes[0].set_xticklabels(stats.keys())
+    axes[0].set_yscale("log")
+    axes[0].legend(fontsize=7)
+    axes[0].set_title("Latence p50 → p99.9 (ms)")
     axes[1].bar(stats.keys(), [v["bandwidth"] for v in stats.values()], color="#2196F3")
     axes[1].set_title("Bande passante (kB/s)")
-    axes[2].bar(stats.keys(), [v["energy"] for v in stats.values()], color="#FFC107")
-    axes[2].set_title("Coût énergétique (kB/msg)")
+    # CPU par message : serveur et client côte à côte (0 si non mesuré)
+    axes[2].bar(x - 0.2, [v["cpu_server"] or 0 for v in stats.values()], 0.4, label="serveur", color="#FFC107")
+    axes[2].bar(x + 0.2, [v["cpu_client"] or 0 for v in stats.values()], 0.4, label="client", color="#FF7043")
+    axes[2].set_xticks(x)
+    axes[2].set_xticklabels(stats.keys())
+    axes[2].legend(fontsize=7)
+    axes[2].set_title("CPU par message (ms)")
     for ax in axes: ax.grid(alpha=0.3)
 
     canvas1 = FigureCanvasTkAgg(fig, master=frame)
@@ -126,7 +178,7 @@ def show_latency_gui():
     ax2[0].bar(stats.keys(), [v["jitter"] for v in stats.values()], color="#9C27B0")
     ax2[0].set_title("Variabilité de latence (Jitter ms)")
     ax2[1].bar(stats.keys(), [v["loss"] for v in stats.values()], color="#E91E63")
-    ax2[1].set_title("Taux de perte simulé (%)")
+    ax2[1].set_title("Taux de perte (%)")
     for ax in ax2: ax.grid(alpha=0.3)
 
     canvas2 = FigureCanvasTkAgg(fig2, master=frame)
@@ -141,6 +193,6 @@ def show_latency_gui():
 
 
 if __name__ == "__main__":
-    show_latency_gui()
+    show_latency_gui(sys.argv[1] if len(sys.argv) > 1 else ".")
 
 
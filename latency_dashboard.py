@@ -0,0 +1,133 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : latency_dashboard.py
+# Description :
+#   Tableau de bord en direct de la latence (pendant qu’un mode tourne)
+#   - Lecture incrémentale du fichier de latence (seules les nouvelles lignes)
+#   - Les artistes matplotlib sont créés une fois puis mis à jour (set_data / set_text)
+#   - Blitting : seul le contenu des axes est redessiné, le fond (axes, graduations) est réutilisé
+#   - Rafraîchissement par root.after (pas de thread), aucun dessin s’il n’y a rien de nouveau
+# =========================================================
+
+import time
+from collections import deque
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from latency_stream import LatencyTail
+from latency_timeseries import minmax_downsample
+
+REFRESH_MS = 500        # période de rafraîchissement
+WINDOW_S = 60           # durée affichée (s)
+MAX_RECENT = 50000      # points conservés au plus pour la fenêtre glissante
+MAX_DRAWN = 2000        # points tracés au plus (sous-échantillonnage min/max au-delà)
+
+
+class LiveDashboard:
+    """
+    Panneau de latence en direct intégré dans un conteneur Tkinter.
+    :param master: widget Tkinter parent
+    :param path_fn: fonction renvoyant le fichier de latence à suivre (mode sélectionné)
+    """
+
+    def __init__(self, master, path_fn, refresh_ms=REFRESH_MS, window_s=WINDOW_S):
+        self.master = master
+        self.path_fn = path_fn
+        self.refresh_ms = refresh_ms
+        self.window_s = window_s
+        self.tail = None
+        self.recent = deque(maxlen=MAX_RECENT)
+        self.background = None
+        self.ymax = 10.0
+        self._job = None
+        self._drawn = False
+
+        # --- Figure créée une seule fois ---
+        self.fig = Figure(figsize=(9, 3.2), dpi=100)
+        self.ax = self.fig.add_subplot(111)
+        self.ax.set_xlim(-window_s, 0)
+        self.ax.set_ylim(0, self.ymax)
+        self.ax.set_xlabel("Secondes (0 = maintenant)")
+        self.ax.set_ylabel("Latence (ms)")
+        self.ax.grid(alpha=0.3)
+        # animated=True : exclus du fond mémorisé, dessinés uniquement par blit
+        (self.line,) = self.ax.plot([], [], color="#2196F3", linewidth=1, animated=True)
+        self.text = self.ax.text(0.01, 0.95, "", transform=self.ax.transAxes, va="top",
+                                 fontsize=9, family="monospace", animated=True)
+        self.fig.tight_layout()
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        # Après chaque dessin complet (redimensionnement, changement d’échelle) : nouveau fond
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.draw()
+        self._tick()
+
+    # --- Fond mémorisé ---
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._blit()
+
+    def _blit(self):
+        if self.background is None:
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.line)
+        self.ax.draw_artist(self.text)
+        self.canvas.blit(self.fig.bbox)
+
+    # --- Boucle de rafraîchissement ---
+    def _follow(self):
+        """Suit le fichier du mode sélectionné (nouveau lecteur si le mode a changé)."""
+        path = self.path_fn()
+        if self.tail is None or self.tail.path != path:
+            self.tail = LatencyTail(path)
+            self.recent.clear()
+        resets = self.tail.resets
+        rows = self.tail.poll()
+        if self.tail.resets != resets:
+            self.recent.clear()
+        return rows
+
+    def _tick(self):
+        try:
+            rows = self._follow()
+            self.recent.extend((t, latency) for t, latency, _ in rows)
+            now = time.time()
+            while self.recent and self.recent[0][0] < now - self.window_s:
+                self.recent.popleft()
+            # Rien de nouveau et rien à faire défiler : aucun dessin
+            if rows or self.recent or self._drawn:
+                self._update(now)
+                self._drawn = bool(self.recent)
+        finally:
+            self._job = self.master.after(self.refresh_ms, self._tick)
+
+    def _update(self, now):
+        if self.recent:
+            data = np.asarray(self.recent)
+            x, y = data[:, 0] - now, data[:, 1]
+            x, y = minmax_downsample(x, y, MAX_DRAWN)
+        else:
+            x = y = np.empty(0)
+        self.line.set_data(x, y)
+
+        s = self.tail.stats
+        rate = len(self.recent) / self.window_s
+        p = s.percentiles()
+        self.text.set_text(f"{self.tail.path}  |  {rate:5.1f} msg/s  |  moyenne {s.mean:6.2f} ms  |  "
+                           f"p99 {p[99]:6.2f} ms  |  p99.9 {p[99.9]:6.2f} ms  |  pertes {s.loss_rate:4.1f} %")
+
+        # Changement d’échelle (rare) : redessin complet, sinon simple blit
+        peak = float(y.max()) if len(y) else 0.0
+        if peak > self.ymax or (peak and peak < self.ymax / 4 and self.ymax > 10):
+            self.ymax = max(10.0, peak * 1.5)
+            self.ax.set_ylim(0, self.ymax)
+            self.canvas.draw()  # -> _on_draw -> nouveau fond + blit
+        else:
+            self._blit()
+
+    def stop(self):
+        if self._job is not None:
+            self.master.after_cancel(self._job)
+            self._job = None
@@ -0,0 +1,178 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : latency_sketch.py
+# Description :
+#   Résumé compact des latences pour les percentiles de queue (p50 / p90 / p99 / p99.9)
+#   - Histogramme à seaux logarithmiques (type HDR) : erreur relative bornée (1 % par défaut)
+#   - Mémoire bornée quel que soit le nombre de mesures (max_buckets seaux)
+#   - Fusionnable : plusieurs exécutions / processus -> un seul résumé
+#   - Sauvegarde JSON pour combiner des campagnes de mesure
+#
+# Exemple :
+#   python latency_sketch.py latency_ws.csv bench/latency_ws.csv --save ws.json
+#   python latency_sketch.py ws.json ws_hier.json
+# =========================================================
+
+import argparse
+import csv
+import json
+import math
+
+TAIL_PERCENTILES = (50, 90, 99, 99.9)
+MIN_VALUE_MS = 1e-3  # en dessous (0.001 ms) : seau « zéro »
+
+
+class LatencySketch:
+    """
+    Histogramme logarithmique : la valeur v tombe dans le seau ceil(log_gamma(v)),
+    gamma = (1 + a) / (1 - a) ; tout quantile est estimé à a près (erreur relative).
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy doit être dans ]0, 1[")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    # --- Enregistrement ---
+    def record(self, value, count=1):
+        """Ajoute `count` mesures de valeur `value` (ms)."""
+        if value < MIN_VALUE_MS:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+            if len(self.buckets) > self.max_buckets:
+                self._collapse()
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _collapse(self):
+        """Fusionne les deux plus petits seaux : la précision des queues hautes est conservée."""
+        first, second = sorted(self.buckets)[:2]
+        self.buckets[second] += self.buckets.pop(first)
+
+    def merge(self, other):
+        """Ajoute le contenu d’un autre résumé (même précision)."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("impossible de fusionner des résumés de précisions différentes")
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    # --- Lecture ---
+    def quantile(self, q):
+        """Percentile q (0-100) par rang le plus proche, comme load_generator.percentile."""
+        if not self.count:
+            return 0.0
+        rank = min(self.count, max(1, math.ceil(q / 100 * self.count)))
+        seen = self.zero_count
+        if seen >= rank:
+            return max(self.min, 0.0)
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)  # centre du seau
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def percentiles(self, qs=TAIL_PERCENTILES):
+        return {q: self.quantile(q) for q in qs}
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    # --- Sérialisation ---
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_buckets": self.max_buckets,
+            "buckets": {str(i): n for i, n in sorted(self.buckets.items())},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"], data.get("max_buckets", 2048))
+        sketch.buckets = {int(i): n for i, n in data["buckets"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def format_percentiles(sketch, qs=TAIL_PERCENTILES):
+    """'1.20 / 3.40 / 9.80 / 15.00' (p50 / p90 / p99 / p99.9) pour les tableaux"""
+    return " / ".join(f"{sketch.quantile(q):.2f}" for q in qs)
+
+
+# =========================================================
+# 🔹 Point d’entrée : fusion de fichiers de latence ou de résumés
+# =========================================================
+def sketch_from_csv(path):
+    """Résumé des latences valides (0 < latence < 2000 ms) d’un fichier de latence."""
+    sketch = LatencySketch()
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                latency = float(row.get("latency_ms") or row.get("latency") or "")
+            except ValueError:
+                continue
+            if 0 < latency < 2000:
+                sketch.record(latency)
+    return sketch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Percentiles de latence fusionnés (p50 / p90 / p99 / p99.9)")
+    parser.add_argument("inputs", nargs="+", help="fichiers latency_<proto>.csv ou résumés .json")
+    parser.add_argument("--save", help="enregistrer le résumé fusionné (JSON)")
+    args = parser.parse_args(argv)
+
+    merged = LatencySketch()
+    for path in args.inputs:
+        part = LatencySketch.load(path) if path.endswith(".json") else sketch_from_csv(path)
+        merged.merge(part)
+        print(f"   {path:<40} {part.count:>9} mesures | p50/p90/p99/p99.9 : {format_percentiles(part)} ms")
+    print(f"📈 Total : {merged.count} mesures | moyenne {merged.mean:.2f} ms | "
+          f"p50/p90/p99/p99.9 : {format_percentiles(merged)} ms")
+    if args.save:
+        merged.save(args.save)
+        print(f"✅ Résumé enregistré dans {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : latency_stream.py
+# Description :
+#   Analyse incrémentale des fichiers de latence (lecture « tail »)
+#   - Mémorise la position de lecture : seules les nouvelles lignes sont lues
+#   - Moyenne / écart-type (Welford), jitter et pertes mis à jour en O(nouvelles lignes)
+#   - Percentiles de queue (p50 / p90 / p99 / p99.9) via latency_sketch.LatencySketch
+#   - Pertes réelles à partir des trous dans la colonne 'seq' (sinon intervalles anormaux)
+#   - Détecte la réinitialisation d’un fichier (RESET_LATENCY_FILE) et repart de zéro
+#   - Utilisé par run_all.py et latency_comparator.py
+# =========================================================
+
+import csv
+import itertools
+import math
+import os
+from latency_sketch import LatencySketch
+
+# --- Filtre identique aux analyses précédentes ---
+MIN_LATENCY_MS = 0.0      # exclusif : 0 = échec d’envoi
+MAX_LATENCY_MS = 2000.0   # exclusif : valeurs aberrantes
+GAP_FACTOR = 3            # intervalle > 3 × intervalle moyen -> message considéré perdu
+
+
+class LatencyStats:
+    """
+    Statistiques cumulées d’un fichier de latence (mémoire constante).
+    """
+
+    def __init__(self, default_size=512):
+        self.default_size = default_size
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.abs_diff_sum = 0.0
+        self.last_latency = None
+        self.last_timestamp = None
+        self.first_timestamp = None
+        self.intervals = 0
+        self.gaps = 0
+        self.size_sum = 0.0
+        self.bandwidth_sum = 0.0
+        self.sketch = LatencySketch()
+        # Numéros de séquence : {flux: [premier, dernier]} pour le segment en cours
+        self.streams = {}
+        self.expected_done = 0  # messages attendus des segments terminés (redémarrage du client)
+        self.received = 0
+
+    def add(self, timestamp, latency_ms, size):
+        """Ajoute une mesure valide (déjà filtrée)."""
+        self.count += 1
+        delta = latency_ms - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (latency_ms - self.mean)
+
+        if self.last_latency is not None:
+            self.abs_diff_sum += abs(latency_ms - self.last_latency)
+        self.last_latency = latency_ms
+
+        # Pertes : écart anormal par rapport à l’intervalle moyen observé jusqu’ici
+        if self.last_timestamp is not None:
+            interval = timestamp - self.last_timestamp
+            if self.intervals and interval > GAP_FACTOR * self.mean_interval:
+                self.gaps += 1
+            self.intervals += 1
+        else:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+
+        self.size_sum += size
+        self.bandwidth_sum += (size / (latency_ms / 1000)) / 1024
+        self.sketch.record(latency_ms)
+
+    def add_seq(self, stream, seq):
+        """Enregistre un message reçu (latence > 0) portant le numéro `seq`."""
+        self.received += 1
+        span = self.streams.get(stream)
+        if span is None:
+            self.streams[stream] = [seq, seq]
+        elif seq > span[1]:
+            span[1] = seq
+        elif seq < span[1]:
+            # Numérotation repartie de zéro : le client a redémarré
+            self.expected_done += span[1] - span[0] + 1
+            self.streams[stream] = [seq, seq]
+
+    # --- Indicateurs ---
+    @property
+    def mean_interval(self):
+        if not self.intervals:
+            return 0.0
+        return (self.last_timestamp - self.first_timestamp) / self.intervals
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+    @property
+    def jitter(self):
+        """Moyenne des écarts absolus entre latences consécutives"""
+        return self.abs_diff_sum / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def expected(self):
+        return self.expected_done + sum(last - first + 1 for first, last in self.streams.values())
+
+    @property
+    def gap_loss_rate(self):
+        """Pourcentage d’intervalles anormalement longs"""
+        return self.gaps / self.intervals * 100 if self.intervals else 0.0
+
+    @property
+    def loss_rate(self):
+        """
+        Pourcentage de messages perdus : numéros de séquence manquants ou en échec
+        (latence nulle). Sans colonne 'seq' (anciens fichiers), intervalles anormaux.
+        """
+        if not self.streams:
+            return self.gap_loss_rate
+        expected = self.expected
+        return max(0, expected - self.received) / expected * 100 if expected else 0.0
+
+    def percentiles(self):
+        """{50: ..., 90: ..., 99: ..., 99.9: ...} en ms"""
+        return self.sketch.percentiles()
+
+    @property
+    def mean_size(self):
+        return self.size_sum / self.count if self.count else float(self.default_size)
+
+    @property
+    def bandwidth(self):
+        """Moyenne par message de taille / latence (kB/s)"""
+        return self.bandwidth_sum / self.count if self.count else 0.0
+
+
+class LatencyTail:
+    """
+    Lecture incrémentale d’un fichier CSV de latence.
+    """
+
+    def __init__(self, path, default_size=512):
+        self.path = path
+        self.stats = LatencyStats(default_size)
+        self.offset = 0
+        self.columns = None
+        self._partial = b""
+        self._file_id = None
+        self.resets = 0  # incrémenté à chaque relecture depuis le début
+        self._windows = {}  # {début: mesures valides horodatées depuis ce début}
+
+    def _reset(self):
+        self.resets += 1
+        self.stats.reset()
+        self.offset = 0
+        self.columns = None
+        self._partial = b""
+        self._windows = {}
+
+    def poll(self):
+        """
+        Lit les lignes ajoutées depuis le dernier appel et met à jour les statistiques.
+        :return: liste des nouvelles mesures valides [(timestamp, latency_ms, size), ...]
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._reset()
+            return []
+        # Fichier recréé ou tronqué -> on recommence depuis le début
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._file_id or st.st_size < self.offset:
+            self._reset()
+            self._file_id = file_id
+        if st.st_size == self.offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+
+        data = self._partial + data
+        lines = data.split(b"\n")
+        self._partial = lines.pop()  # dernière ligne éventuellement incomplète
+
+        new_rows = []
+        for row in csv.reader(line.decode("utf-8", errors="replace").rstrip("\r") for line in lines):
+            if not row:
+                continue
+            if self.columns is None:
+                self._read_header(row)
+                continue
+            parsed = self._parse(row)
+            if parsed is None:
+                continue
+            timestamp, latency, size, stream, seq = parsed
+            if seq is not None and latency > MIN_LATENCY_MS:
+                self.stats.add_seq(stream, seq)
+            if MIN_LATENCY_MS < latency < MAX_LATENCY_MS:
+                self.stats.add(timestamp, latency, size)
+                new_rows.append((timestamp, latency, size))
+                for since in self._windows:
+                    if timestamp >= since:
+                        self._windows[since] += 1
+        return new_rows
+
+    def count_since(self, since):
+        """
+        Nombre de mesures valides horodatées à partir de `since` (s, epoch), parmi les lignes lues.
+        Premier appel pour un début donné : relecture des horodatages, puis suivi incrémental par poll.
+        """
+        if since not in self._windows:
+            count = 0
+            if self.columns is not None:
+                with open(self.path, "rb") as f:
+                    data = f.read(self.offset - len(self._partial))
+                lines = (line.decode("utf-8", errors="replace").rstrip("\r") for line in data.split(b"\n"))
+                for row in itertools.islice(csv.reader(lines), 1, None):  # en-tête sauté
+                    parsed = self._parse(row) if row else None
+                    if parsed and parsed[0] >= since and MIN_LATENCY_MS < parsed[1] < MAX_LATENCY_MS:
+                        count += 1
+            self._windows[since] = count
+        return self._windows[since]
+
+    def at_start(self):
+        """Vrai si le prochain poll relira le fichier depuis le début (nouveau, recréé ou tronqué)."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        return self.offset == 0 or (st.st_dev, st.st_ino) != self._file_id or st.st_size < self.offset
+
+    def resume_at(self, offset, header):
+        """
+        Reprend la lecture à `offset` : les lignes précédentes ont été chargées ailleurs
+        (chargement en bloc) et ne sont pas comptées dans les statistiques.
+        :param header: ligne d’en-tête déjà découpée (liste de noms de colonnes)
+        """
+        st = os.stat(self.path)
+        self._reset()
+        self._file_id = (st.st_dev, st.st_ino)
+        self._read_header(header)
+        self.offset = offset
+
+    def _read_header(self, row):
+        names = [c.strip() for c in row]
+        if "latency_ms" not in names and "latency" in names:
+            names[names.index("latency")] = "latency_ms"
+        self.columns = {name: i for i, name in enumerate(names)}
+
+    def _parse(self, row):
+        cols = self.columns
+        try:
+            latency = float(row[cols["latency_ms"]])
+            timestamp = float(row[cols["timestamp"]]) if "timestamp" in cols else 0.0
+            if "msg_size_bytes" in cols and row[cols["msg_size_bytes"]] != "":
+                size = float(row[cols["msg_size_bytes"]])
+            else:
+                size = self.stats.default_size
+            seq = int(row[cols["seq"]]) if "seq" in cols and row[cols["seq"]] != "" else None
+        except (KeyError, IndexError, ValueError):
+            return None  # ligne mal formée ou colonne absente
+        # Plusieurs caméras dans un même fichier (générateur de charge) : une séquence par caméra
+        stream = row[cols["camera"]] if "camera" in cols and len(row) > cols["camera"] else ""
+        return timestamp, latency, size, stream, seq
+
+
+# --- Lecteurs partagés : un par fichier, conservés entre deux analyses ---
+_tails = {}
+
+
+def get_tail(path, default_size=512):
+    """Renvoie le lecteur incrémental associé au fichier (créé au premier appel)."""
+    key = os.path.abspath(path)
+    tail = _tails.get(key)
+    if tail is None:
+        tail = _tails[key] = LatencyTail(path, default_size)
+    return tail
@@ -0,0 +1,261 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : latency_timeseries.py
+# Description :
+#   Courbe de latence dans le temps pour des mesures très longues (millions de points)
+#   - Sous-échantillonnage qui préserve la forme avant tracé : min/max par paquet ou LTTB
+#   - Seule la plage visible est tracée (≈ 2 points par pixel)
+#   - Nouveau sous-échantillonnage à chaque zoom / déplacement (événement xlim_changed)
+#   - Premier chargement en bloc (numpy.loadtxt, colonnes timestamp / latence seulement),
+#     puis lecture incrémentale (latency_stream) des seules lignes ajoutées
+#
+# Exemple :
+#   python latency_timeseries.py latency_ws.csv latency_http.csv
+# =========================================================
+
+import csv
+import io
+import os
+import sys
+import numpy as np
+from latency_stream import MAX_LATENCY_MS, MIN_LATENCY_MS, LatencyTail
+
+MAX_POINTS = 4000  # points tracés par courbe (≈ 2 par pixel sur un écran large)
+
+
+# =========================================================
+# 🔹 Sous-échantillonnage
+# =========================================================
+def minmax_downsample(x, y, max_points):
+    """
+    Garde le minimum et le maximum de chaque paquet (max_points / 2 paquets de même taille).
+    Les pics de latence restent visibles quel que soit le niveau de zoom.
+    """
+    n = len(x)
+    if n <= max_points:
+        return x, y
+    buckets = max_points // 2
+    size = n // buckets
+    usable = size * buckets
+    blocks = y[:usable].reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lo = offsets + blocks.argmin(axis=1)
+    hi = offsets + blocks.argmax(axis=1)
+    # Ordre chronologique dans chaque paquet (le min peut venir après le max)
+    idx = np.column_stack((np.minimum(lo, hi), np.maximum(lo, hi))).ravel()
+    if usable < n:
+        tail = usable + np.array([y[usable:].argmin(), y[usable:].argmax()])
+        idx = np.concatenate((idx, np.sort(tail)))
+    return x[idx], y[idx]
+
+
+def lttb_downsample(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets : dans chaque paquet, le point qui forme le plus grand
+    triangle avec le point retenu précédent et la moyenne du paquet suivant.
+    """
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return x, y
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    idx = np.empty(max_points, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    prev = 0
+    for b in range(max_points - 2):
+        start, end = edges[b], edges[b + 1]
+        nxt_end = edges[b + 2] if b + 2 < len(edges) else n
+        if end <= start:
+            idx[b + 1] = prev = start
+            continue
+        avg_x = x[end:nxt_end].mean() if nxt_end > end else x[-1]
+        avg_y = y[end:nxt_end].mean() if nxt_end > end else y[-1]
+        px, py = x[prev], y[prev]
+        area = np.abs((px - avg_x) * (y[start:end] - py) - (px - x[start:end]) * (avg_y - py))
+        prev = start + int(area.argmax())
+        idx[b + 1] = prev
+    return x[idx], y[idx]
+
+
+METHODS = {"minmax": minmax_downsample, "lttb": lttb_downsample}
+
+
+# =========================================================
+# 🔹 Série en mémoire (tableaux numpy extensibles)
+# =========================================================
+class LatencySeries:
+    """Instants (s depuis la première mesure) et latences d’un fichier, complétés par poll()."""
+
+    def __init__(self, path):
+        self.tail = LatencyTail(path)
+        self.x = np.empty(1024)
+        self.y = np.empty(1024)
+        self.size = 0
+        self.t0 = None
+        self.sorted = True
+
+    def poll(self):
+        """Ajoute les lignes écrites depuis le dernier appel ; renvoie le nombre de points ajoutés."""
+        added = 0
+        if self.tail.at_start():
+            loaded = self._bulk_load()
+            if loaded is not None:
+                self.size, self.t0, self.sorted = 0, None, True
+                added = self._append(loaded)
+        resets = self.tail.resets
+        rows = self.tail.poll()
+        if self.tail.resets != resets:  # fichier réinitialisé (chargement en bloc impossible)
+            self.size, self.t0, self.sorted = 0, None, True
+            added = 0
+        if rows:
+            added += self._append(np.asarray(rows, dtype=float)[:, :2])
+        return added
+
+    def _bulk_load(self):
+        """
+        Lecture complète du fichier en un appel numpy (≈ 10× plus rapide que csv ligne à ligne),
+        puis reprise de la lecture incrémentale après la dernière ligne complète.
+        :return: tableau (n, 2) [timestamp, latence] ou None (lecture ligne à ligne)
+        """
+        try:
+            with open(self.tail.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        head_end = data.find(b"\n") + 1
+        end = data.rfind(b"\n") + 1  # dernière ligne éventuellement incomplète : laissée au tail
+        if head_end == 0:
+            return None
+        header = next(csv.reader([data[:head_end].decode("utf-8", errors="replace").strip()]))
+        names = [c.strip() for c in header]
+        lat_name = "latency_ms" if "latency_ms" in names else "latency"
+        if "timestamp" not in names or lat_name not in names:
+            return None
+        if end <= head_end:  # en-tête seul
+            self.tail.resume_at(end, header)
+            return np.empty((0, 2))
+        try:
+            loaded = np.loadtxt(io.StringIO(data[head_end:end].decode("utf-8")), delimiter=",",
+                                usecols=(names.index("timestamp"), names.index(lat_name)), ndmin=2)
+        except (ValueError, UnicodeDecodeError):
+            return None  # ligne mal formée ou champ vide : le tail s’en charge
+        self.tail.resume_at(end, header)
+        keep = (loaded[:, 1] > MIN_LATENCY_MS) & (loaded[:, 1] < MAX_LATENCY_MS)
+        return loaded[keep]
+
+    def _append(self, new):
+        """Ajoute des points [timestamp, latence] aux tableaux extensibles."""
+        if not len(new):
+            return 0
+        if self.t0 is None:
+            self.t0 = new[0, 0]
+        needed = self.size + len(new)
+        if needed > len(self.x):
+            capacity = max(needed, 2 * len(self.x))
+            self.x = np.resize(self.x, capacity)
+            self.y = np.resize(self.y, capacity)
+        self.x[self.size:needed] = new[:, 0] - self.t0
+        self.y[self.size:needed] = new[:, 1]
+        if self.sorted and np.any(np.diff(self.x[max(0, self.size - 1):needed]) < 0):
+            self.sorted = False
+        self.size = needed
+        return len(new)
+
+    def data(self):
+        x, y = self.x[:self.size], self.y[:self.size]
+        if not self.sorted:
+            # Journaux concurrents (plusieurs caméras) : tri une seule fois
+            order = np.argsort(x, kind="stable")
+            self.x[:self.size], self.y[:self.size] = x[order], y[order]
+            self.sorted = True
+        return x, y
+
+
+# =========================================================
+# 🔹 Courbe sous-échantillonnée liée aux zooms
+# =========================================================
+class TimeSeriesView:
+    """
+    Trace une série sur un axe matplotlib et la ré-échantillonne quand la plage visible change.
+    """
+
+    def __init__(self, ax, series, method="minmax", max_points=MAX_POINTS, **line_kwargs):
+        self.ax = ax
+        self.series = series
+        self.downsample = METHODS[method]
+        self.max_points = max_points
+        (self.line,) = ax.plot([], [], **line_kwargs)
+        self._updating = False
+        ax.callbacks.connect("xlim_changed", self._on_xlim_changed)
+        self.refresh(autoscale=True)
+
+    def refresh(self, autoscale=False):
+        """Recalcule la courbe pour la plage visible (ou toute la série)."""
+        x, y = self.series.data()
+        if not len(x):
+            return
+        if autoscale:
+            lo, hi = x[0], x[-1]
+        else:
+            lo, hi = self.ax.get_xlim()
+        # Plage visible + un point de chaque côté pour que la courbe touche les bords
+        start = max(0, np.searchsorted(x, lo, side="left") - 1)
+        end = min(len(x), np.searchsorted(x, hi, side="right") + 1)
+        xs, ys = self.downsample(x[start:end], y[start:end], self.max_points)
+        self._updating = True
+        try:
+            self.line.set_data(xs, ys)
+            if autoscale:
+                self.ax.set_xlim(lo, hi if hi > lo else lo + 1)
+                self.ax.set_ylim(0, max(float(y.max()) * 1.05, 1.0))
+        finally:
+            self._updating = False
+        self.ax.figure.canvas.draw_idle()
+
+    def _on_xlim_changed(self, ax):
+        if not self._updating:
+            self.refresh()
+
+
+# --- Séries conservées entre deux ouvertures de la vue (lecture incrémentale) ---
+_series = {}
+
+
+def get_series(path):
+    key = os.path.abspath(path)
+    series = _series.get(key)
+    if series is None:
+        series = _series[key] = LatencySeries(path)
+    series.poll()
+    return series
+
+
+def plot_series(fig, files, method="minmax"):
+    """
+    Une courbe par fichier existant, axes empilés.
+    :param files: dict {nom: chemin}
+    :return: liste des TimeSeriesView (à conserver : elles portent les callbacks de zoom)
+    """
+    available = {name: path for name, path in files.items() if os.path.exists(path)}
+    views = []
+    if not available:
+        return views
+    axes = fig.subplots(len(available), 1, squeeze=False)[:, 0]
+    for ax, (name, path) in zip(axes, available.items()):
+        series = get_series(path)
+        views.append(TimeSeriesView(ax, series, method=method, linewidth=0.8))
+        ax.set_title(f"{name} — {series.size} mesures", fontsize=10)
+        ax.set_ylabel("Latence (ms)")
+        ax.grid(alpha=0.3)
+    axes[-1].set_xlabel("Temps depuis la première mesure (s)")
+    fig.tight_layout()
+    return views
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+    paths = sys.argv[1:] or ["latency_http.csv", "latency_ws.csv", "latency_mqtt.csv", "latency_uds.csv"]
+    fig = plt.figure(figsize=(12, 7))
+    views = plot_series(fig, {os.path.basename(p): p for p in paths})
+    if not views:
+        sys.exit("❌ Aucun fichier de latence trouvé.")
+    plt.show()
@@ -0,0 +1,190 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : resource_usage.py
+# Description :
+#   Coût réel des protocoles : CPU, mémoire, changements de contexte et octets échangés
+#   - Échantillonnage psutil des processus serveur / client à intervalle fixe
+#   - Un fichier resources_<proto>.csv à côté du fichier de latence du mode
+#   - Lecture : CPU (ms) et changements de contexte par message, RSS maximale, pour les
+#     vues de comparaison (messages comptés sur la seule fenêtre d’échantillonnage : le
+#     fichier de latence peut contenir les mesures de lancements précédents)
+#   - Octets : comptés par le serveur là où il reçoit et envoie chaque message
+#     (compteurs bytes_received_total / bytes_sent_total de metrics_<proto>.json),
+#     pas par les compteurs d’E/S du processus qui incluent fichiers et journaux
+# =========================================================
+
+import csv
+import json
+import os
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # optionnel : sans psutil, pas d’échantillonnage
+    psutil = None
+
+SAMPLE_INTERVAL = 1.0
+HEADER = ["timestamp", "process", "pid", "cpu_user_s", "cpu_system_s", "rss_bytes",
+          "ctx_voluntary", "ctx_involuntary"]
+COUNTERS = ("cpu_user_s", "cpu_system_s", "ctx_voluntary", "ctx_involuntary")
+
+
+def resources_path(latency_path):
+    """latency_ws.csv -> resources_ws.csv (même dossier)"""
+    folder, name = os.path.split(latency_path)
+    return os.path.join(folder, name.replace("latency_", "resources_", 1))
+
+
+def metrics_path(latency_path):
+    """latency_ws.csv -> metrics_ws.json (instantané du serveur, même dossier)"""
+    folder, name = os.path.split(latency_path)
+    base = os.path.splitext(name.replace("latency_", "metrics_", 1))[0]
+    return os.path.join(folder, base + ".json")
+
+
+# =========================================================
+# 🔹 Échantillonnage
+# =========================================================
+class ResourceSampler:
+    """
+    Thread qui relève les compteurs psutil des processus d’un superviseur.
+    :param processes: fonction renvoyant [(nom, pid), ...] des processus vivants
+    """
+
+    def __init__(self, processes, path, interval=SAMPLE_INTERVAL):
+        self.processes = processes
+        self.path = path
+        self.interval = interval
+        self.handles = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if psutil is None:
+            print("⚠️ psutil absent : pas de mesure CPU / mémoire")
+            return False
+        with open(self.path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(HEADER)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2 * self.interval)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            rows = self.sample()
+            if rows:
+                try:
+                    with open(self.path, "a", newline="", encoding="utf-8") as f:
+                        csv.writer(f).writerows(rows)
+                except OSError as e:
+                    print(f"⚠️ Écriture de {self.path} impossible : {e}")
+
+    def sample(self):
+        """Une ligne par processus vivant."""
+        rows = []
+        now = time.time()
+        for name, pid in self.processes():
+            try:
+                handle = self.handles.get(pid)
+                if handle is None:
+                    handle = self.handles[pid] = psutil.Process(pid)
+                with handle.oneshot():
+                    cpu = handle.cpu_times()
+                    rss = handle.memory_info().rss
+                    ctx = handle.num_ctx_switches()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                self.handles.pop(pid, None)
+                continue
+            rows.append([round(now, 3), name, pid, cpu.user, cpu.system, rss,
+                         ctx.voluntary, ctx.involuntary])
+        return rows
+
+
+# =========================================================
+# 🔹 Lecture
+# =========================================================
+def load_usage(path):
+    """
+    Consommation totale par processus sur la durée du fichier.
+    Les compteurs sont cumulés par pid : un processus relancé ajoute sa propre consommation.
+    "since" : premier échantillon du processus, début de la fenêtre mesurée.
+    :return: {nom: {"cpu_s", "ctx", "rss_max", "since"}} ou None
+    """
+    if not os.path.exists(path):
+        return None
+    first, last, rss_max, since = {}, {}, {}, {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                key = (row["process"], row["pid"])
+                values = {c: float(row[c]) if row[c] != "" else 0.0 for c in COUNTERS}
+                rss = float(row["rss_bytes"])
+                timestamp = float(row["timestamp"])
+            except (KeyError, ValueError):
+                continue
+            first.setdefault(key, values)
+            last[key] = values
+            rss_max[row["process"]] = max(rss_max.get(row["process"], 0.0), rss)
+            since[row["process"]] = min(since.get(row["process"], timestamp), timestamp)
+
+    usage = {}
+    for key, end in last.items():
+        start = first[key]
+        name = key[0]
+        u = usage.setdefault(name, {"cpu_s": 0.0, "ctx": 0.0, "rss_max": rss_max[name],
+                                    "since": since[name]})
+        u["cpu_s"] += (end["cpu_user_s"] - start["cpu_user_s"]) + (end["cpu_system_s"] - start["cpu_system_s"])
+        u["ctx"] += (end["ctx_voluntary"] - start["ctx_voluntary"]) + (end["ctx_involuntary"] - start["ctx_involuntary"])
+    return usage or None
+
+
+def per_message(usage, count_since, process="Serveur"):
+    """
+    Coût par message d’un processus, sur sa fenêtre d’échantillonnage.
+    :param count_since: fonction (début) -> nombre de messages horodatés depuis ce début
+                        (LatencyTail.count_since)
+    :return: (CPU en ms / message, changements de contexte / message) ou (None, None)
+    """
+    if not usage or process not in usage:
+        return None, None
+    u = usage[process]
+    messages = count_since(u["since"])
+    if not messages:
+        return None, None
+    return u["cpu_s"] * 1000 / messages, u["ctx"] / messages
+
+
+def rss_peak(usage, process="Serveur"):
+    """RSS maximale du processus (Mo) ou None."""
+    if not usage or process not in usage:
+        return None
+    return usage[process]["rss_max"] / 2 ** 20
+
+
+def traffic_per_message(path, since=None):
+    """
+    Octets reçus + envoyés par message, comptés par le serveur (corps des messages,
+    sans en-têtes de protocole), d’après son instantané metrics_<proto>.json.
+    :param since: début de la fenêtre mesurée ; un instantané plus ancien est ignoré
+    :return: octets / message ou None
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if since is not None and snapshot.get("timestamp", 0) < since:
+        return None  # instantané d’un lancement précédent
+    counters = snapshot.get("counters", {})
+    messages = counters.get("messages_total", 0)
+    if not messages or "bytes_received_total" not in counters:
+        return None
+    return (counters["bytes_received_total"] + counters.get("bytes_sent_total", 0)) / messages
@@ -1,23 +1,29 @@
 # =========================================================
-# SR04 Groupe 9 - Centre de contrôle final (HTTP / WS / MQTT)
+# SR04 Groupe 9 - Centre de contrôle final (HTTP / WS / MQTT / Local)
 # Description :
-#   Interface unifiée pour contrôler les modes YOLO via HTTP, WebSocket ou MQTT
+#   Interface unifiée pour contrôler les modes YOLO via HTTP, WebSocket, MQTT
+#   ou socket locale (client et serveur sur la même machine)
 #   - Nettoyage automatique des processus
-#   - Surveillance en arrière-plan
+#   - Surveillance en arrière-plan (sondes de disponibilité, relance automatique)
 #   - Visualisation des latences mesurées
 # =========================================================
 
 import tkinter as tk
-import subprocess
 import os
-import signal
+import shutil
+import tempfile
 import threading
 import time
-import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 from tkinter import messagebox, Toplevel, Label, Button
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from latency_dashboard import LiveDashboard
+from latency_sketch import TAIL_PERCENTILES
+from latency_stream import get_tail
+from latency_timeseries import plot_series
+from resource_usage import load_usage, metrics_path, per_message, resources_path, rss_peak, traffic_per_message
+from run_history import RunHistory, script_constant
+from supervisor import Supervisor, http_probe, ws_probe, mqtt_probe, mqtt_sync_probe, uds_probe
 
 
 # --- Chemins des fichiers ---
@@ -27,93 +33,158 @@ SERVER_WS = os.path.join("server", "server_ws.py")
 CLIENT_WS = os.path.join("client", "client_ws.py")
 SERVER_MQTT = os.path.join("server", "server_mqtt.py")
 CLIENT_MQTT = os.path.join("client", "client_mqtt.py")
+MINI_BROKER = os.path.join("server", "mini_broker.py")
+SERVER_UDS = os.path.join("server", "server_uds.py")
+CLIENT_UDS = os.path.join("client", "client_uds.py")
+UDS_PATH = os.path.join(tempfile.gettempdir(), "sr04_traffic.sock")  # identique à server_uds.py
+DETECTOR_DAEMON = os.path.join("client", "detector_daemon.py")
+DETECTOR_PATH = os.path.join(tempfile.gettempdir(), "sr04_detector.sock")  # identique à detector.py
+
+# --- Fichiers de latence écrits par les clients (un par mode) ---
+LATENCY_FILES = {
+    "HTTP": "latency_http.csv",
+    "WebSocket": "latency_ws.csv",
+    "MQTT": "latency_mqtt.csv",
+    "Local": "latency_uds.csv"
+}
 
 # --- Fenêtre principale ---
 root = tk.Tk()
 root.title("SR04 - Smart Traffic Control Center")
-root.geometry("550x480")
+root.geometry("550x640")
 root.resizable(False, False)
 root.configure(bg="#F7F9FB")
 
 # --- Variables globales ---
 selected_mode = tk.StringVar(value="HTTP")
 status_text = tk.StringVar(value="🟢 En attente du lancement...")
-server_process = None
-client_process = None
+supervisor = None
+daemon_supervisor = None  # démon de détection : lancé une fois, conservé entre les modes
+launched_at = None        # début de l’exécution en cours (lignes à verser dans l’historique)
 stop_thread = False
+live_window = None
 
 
 # =========================================================
-# 🔹 Fonctions utilitaires de gestion de processus
+# 🔹 Lancer / Arrêter le projet
 # =========================================================
-def is_alive(proc):
-    """Vérifie si un processus est encore en cours d’exécution"""
+def build_supervisor(mode):
+    """Serveur (avec sa sonde de disponibilité) puis client, pour le mode choisi."""
+    if mode == "HTTP":
+        server, client, probe = SERVER_HTTP, CLIENT_HTTP, http_probe(port=5000)
+    elif mode == "WebSocket":
+        server, client, probe = SERVER_WS, CLIENT_WS, ws_probe(port=5001)
+    elif mode == "MQTT":
+        # Le serveur MQTT n’écoute pas lui-même : prêt quand il répond à un message de
+        # synchronisation relayé par le broker (abonné), pas seulement quand le broker répond
+        server, client, probe = SERVER_MQTT, CLIENT_MQTT, mqtt_sync_probe(port=1883)
+    elif mode == "Local":
+        server, client, probe = SERVER_UDS, CLIENT_UDS, uds_probe(UDS_PATH)
+    else:
+        return None
+    # Mesures CPU / mémoire / octets à côté du fichier de latence du mode
+    sup = Supervisor(mode, on_event=status_text.set,
+                     resources_path=resources_path(LATENCY_FILES[mode]))
+    if mode == "MQTT" and not broker_running():
+        # Aucun broker (Mosquitto absent ou arrêté) : broker minimal intégré, lancé avant le serveur
+        sup.add("Broker", MINI_BROKER, mqtt_probe(port=1883))
+    sup.add("Serveur", server, probe)
+    sup.add("Client", client)
+    return sup
+
+
+def broker_running():
+    """Un broker MQTT répond-il déjà sur le port 1883 (Mosquitto en service) ?"""
     try:
-        return proc and proc.poll() is None
-    except Exception:
+        return mqtt_probe(port=1883)()
+    except OSError:
+        if shutil.which("mosquitto") is None:
+            print("ℹ️ Mosquitto introuvable dans le PATH : broker MQTT minimal intégré (server/mini_broker.py)")
         return False
 
 
-def clean_dead_processes():
-    """Nettoie les processus déjà terminés"""
-    global server_process, client_process
-    if server_process and not is_alive(server_process):
-        server_process = None
-    if client_process and not is_alive(client_process):
-        client_process = None
+def ensure_detector_daemon():
+    """
+    Lance le démon de détection s’il ne tourne pas déjà : le modèle YOLO reste chargé
+    d’un mode à l’autre et les clients s’y connectent au lieu de le recharger.
+    """
+    global daemon_supervisor
+    if daemon_supervisor is None:
+        daemon_supervisor = Supervisor("Détecteur", on_event=status_text.set)
+        # Chargement du modèle (et téléchargement éventuel des poids) : délai large
+        daemon_supervisor.add("Détecteur", DETECTOR_DAEMON,
+                              uds_probe(DETECTOR_PATH, fallback=("127.0.0.1", 5003)), ready_timeout=120)
+    if daemon_supervisor.any_alive():
+        return True
+    return daemon_supervisor.start_all()
+
+
+def record_history():
+    """
+    Verse l’exécution terminée dans l’historique (run_history.py) : les lignes du fichier
+    de latence écrites depuis le lancement, avec le modèle configuré dans le client.
+    """
+    global launched_at
+    if supervisor is None or launched_at is None:
+        return
+    mode, since = supervisor.mode, launched_at
+    launched_at = None
+    path = LATENCY_FILES[mode]
+    if not os.path.exists(path):
+        return
+    client = supervisor.processes[-1].script
+    protocol = os.path.splitext(path)[0].replace("latency_", "")  # http / ws / mqtt / uds, comme le banc
+    try:
+        history = RunHistory()
+        try:
+            run_id = history.record(path, protocol, source="run_all", since=since,
+                                    model=script_constant(client, "MODEL_NAME"),
+                                    params={"mode": mode, "client": client})
+        finally:
+            history.close()
+    except Exception as e:
+        print(f"⚠️ Historique non enregistré : {e}")
+        return
+    if run_id is not None:
+        print(f"🗄️ Run {run_id} ({mode}) enregistré dans l’historique")
 
 
-# =========================================================
-# 🔹 Lancer / Arrêter le projet
-# =========================================================
 def launch_project():
-    global server_process, client_process
-
-    clean_dead_processes()
+    global supervisor, launched_at
 
-    if is_alive(server_process) or is_alive(client_process):
+    if supervisor and supervisor.any_alive():
         status_text.set("⚠️ Un projet est déjà en cours ! Fermez-le avant d’en lancer un autre.")
         return
+    record_history()  # exécution précédente terminée par la fermeture du client
 
     mode = selected_mode.get()
-    if mode == "HTTP":
-        server, client, port = SERVER_HTTP, CLIENT_HTTP, "5000"
-    elif mode == "WebSocket":
-        server, client, port = SERVER_WS, CLIENT_WS, "5001"
-    elif mode == "MQTT":
-        server, client, port = SERVER_MQTT, CLIENT_MQTT, "1883"
-    else:
+    sup = build_supervisor(mode)
+    if sup is None:
         status_text.set("❌ Mode inconnu !")
         return
+    supervisor = sup
+    launched_at = time.time()
 
-    try:
-        server_process = subprocess.Popen(["python", server])
-        time.sleep(1)
-        client_process = subprocess.Popen(["python", client])
-        status_text.set(f"✅ Mode {mode} lancé sur le port {port}.")
-    except Exception as e:
-        status_text.set(f"❌ Erreur de lancement : {e}")
+    def start():
+        # Attente de la sonde hors du thread Tkinter (le chargement peut prendre du temps)
+        status_text.set(f"⏳ Démarrage du mode {mode}...")
+        try:
+            if not ensure_detector_daemon():
+                status_text.set("⚠️ Démon de détection indisponible : le client chargera son modèle.")
+            if sup.start_all():
+                server = next(p for p in sup.processes if p.name == "Serveur")
+                status_text.set(f"✅ Mode {mode} lancé (serveur prêt en {server.startup_time:.2f} s).")
+        except Exception as e:
+            status_text.set(f"❌ Erreur de lancement : {e}")
+
+    threading.Thread(target=start, daemon=True).start()
 
 
 def stop_project():
     """Arrête proprement les processus client et serveur"""
-    global server_process, client_process
-    try:
-        if is_alive(client_process):
-            client_process.terminate()
-            client_process.wait(timeout=3)
-        client_process = None
-    except Exception:
-        pass
-
-    try:
-        if is_alive(server_process):
-            server_process.terminate()
-            server_process.wait(timeout=3)
-        server_process = None
-    except Exception:
-        pass
-
+    if supervisor:
+        supervisor.stop_all()
+        record_history()
     status_text.set("🛑 Projet arrêté manuellement.")
 
 
@@ -125,14 +196,8 @@ def stop_project():
 # =========================================================
 def show_latency_ui():
     """Affiche un tableau + graphiques combinés (avec pertes réelles)."""
-    import numpy as np
-    FILES = {
-        "HTTP": "latency_http.csv",
-        "WebSocket": "latency_ws.csv",
-        "MQTT": "latency_mqtt.csv"
-    }
-
-    available = {name: path for name, path in FILES.items() if os.path.exists(path)}
+
+    available = {name: path for name, path in LATENCY_FILES.items() if os.path.exists(path)}
     if not available:
         messagebox.showwarning("Aucun fichier", "Aucun fichier de latence trouvé.")
         return
@@ -140,46 +205,35 @@ def show_latency_ui():
     stats = {}
     for proto, file in available.items():
         try:
-            df = pd.read_csv(file, on_bad_lines="skip", engine="python", dtype={"latency_ms": "float"})
-            if "latency_ms" not in df.columns:
-                continue
-
-            # --- Ajout d'une taille simulée si manquante ---
-            if "msg_size_bytes" not in df.columns:
-                df["msg_size_bytes"] = 512 if proto == "HTTP" else 70  # taille moyenne d’un message
-
-            # --- Nettoyage des données ---
-            df = df[(df["latency_ms"] > 0) & (df["latency_ms"] < 2000)]
-            if len(df) == 0:
+            # --- Lecture incrémentale : seules les lignes ajoutées depuis la dernière ouverture ---
+            # (taille simulée si la colonne msg_size_bytes est absente)
+            tail = get_tail(file, default_size=512 if proto == "HTTP" else 70)
+            tail.poll()
+            s = tail.stats
+            if s.count == 0:
                 continue
 
-            # --- Calculs principaux ---
-            latencies = df["latency_ms"].to_numpy()
-            timestamps = df["timestamp"].to_numpy()
-            msg_sizes = df["msg_size_bytes"].to_numpy()
-
-            mean_latency = np.mean(latencies)
-            jitter = np.std(latencies)
-            bandwidth = np.mean((msg_sizes / (latencies / 1000)) / 1024)
-            energy = np.mean(msg_sizes / 1024)
-
-            # --- Calcul du taux de perte réel ---
-            if len(timestamps) > 1:
-                diffs = np.diff(timestamps)
-                mean_interval = np.mean(diffs)
-                lost_count = np.sum(diffs > mean_interval * 3)
-                real_loss_rate = (lost_count / len(diffs)) * 100
-            else:
-                real_loss_rate = 0.0
-
             stats[proto] = {
-                "samples": len(df),
-                "latency_ms": round(mean_latency, 2),
-                "jitter_ms": round(jitter, 2),
-                "real_loss_rate": round(real_loss_rate, 2),
-                "bandwidth_kBps": round(bandwidth, 2),
-                "energy_cost_kBmsg": round(energy, 4),
+                "samples": s.count,
+                "latency_ms": round(s.mean, 2),
+                "percentiles": s.percentiles(),
+                "jitter_ms": round(s.std, 2),
+                "real_loss_rate": round(s.loss_rate, 2),
+                "bandwidth_kBps": round(s.bandwidth, 2),
+                "msg_size_kB": round(s.mean_size / 1024, 4),
             }
+            # Coût réel par message (échantillons du superviseur)
+            usage = load_usage(resources_path(file))
+            cpu_server, _ = per_message(usage, tail.count_since, "Serveur")
+            cpu_client, _ = per_message(usage, tail.count_since, "Client")
+            stats[proto]["cpu_ms_msg"] = (round(cpu_server, 3) if cpu_server is not None else None,
+                                          round(cpu_client, 3) if cpu_client is not None else None)
+            rss = rss_peak(usage, "Serveur")
+            stats[proto]["rss_mb"] = round(rss, 1) if rss is not None else None
+            # Octets comptés par le serveur à chaque message (metrics_<proto>.json)
+            since = usage["Serveur"]["since"] if usage and "Serveur" in usage else None
+            bytes_msg = traffic_per_message(metrics_path(file), since)
+            stats[proto]["bytes_msg"] = round(bytes_msg) if bytes_msg is not None else None
 
         except Exception as e:
             print(f"⚠️ Erreur lecture {proto}: {e}")
@@ -191,21 +245,22 @@ def show_latency_ui():
     # --- Fenêtre Tkinter principale ---
     win = Toplevel(root)
     win.title("Analyse des performances réseau")
-    win.geometry("1000x750")
+    win.geometry("1650x750")
     win.configure(bg="#F7F9FB")
 
     tk.Label(win, text="📊 Comparaison des protocoles de communication",
              font=("Segoe UI", 15, "bold"), bg="#F7F9FB").pack(pady=10)
 
-    tk.Label(win, text="Analyse comparative : Latence, Jitter, Pertes réelles et Efficacité énergétique",
+    tk.Label(win, text="Analyse comparative : Latence, Jitter, Pertes réelles et coût CPU / octets par message",
              font=("Segoe UI", 11, "italic"), bg="#F7F9FB").pack()
 
     # --- Tableau résumé ---
     frame_table = tk.Frame(win, bg="#F7F9FB")
     frame_table.pack(pady=5)
 
-    headers = ["Protocole", "Échantillons", "Latence (ms)", "Jitter (ms)",
-               "Pertes réelles (%)", "Bande passante (kB/s)", "Énergie (kB/msg)"]
+    headers = ["Protocole", "Échantillons", "Latence (ms)", "p50/p90/p99/p99.9 (ms)", "Jitter (ms)",
+               "Pertes réelles (%)", "Bande passante (kB/s)", "CPU serv./client (ms/msg)",
+               "RSS max serveur (Mo)", "Octets échangés (o/msg)"]
 
     for c, h in enumerate(headers):
         tk.Label(frame_table, text=h, font=("Segoe UI", 11, "bold"),
@@ -215,10 +270,17 @@ def show_latency_ui():
         tk.Label(frame_table, text=proto, bg="#F7F9FB", font=("Segoe UI", 10)).grid(row=i, column=0)
         tk.Label(frame_table, text=s["samples"], bg="#F7F9FB").grid(row=i, column=1)
         tk.Label(frame_table, text=s["latency_ms"], bg="#F7F9FB").grid(row=i, column=2)
-        tk.Label(frame_table, text=s["jitter_ms"], bg="#F7F9FB").grid(row=i, column=3)
-        tk.Label(frame_table, text=s["real_loss_rate"], bg="#F7F9FB").grid(row=i, column=4)
-        tk.Label(frame_table, text=s["bandwidth_kBps"], bg="#F7F9FB").grid(row=i, column=5)
-        tk.Label(frame_table, text=s["energy_cost_kBmsg"], bg="#F7F9FB").grid(row=i, column=6)
+        tk.Label(frame_table, text=" / ".join(f"{v:.1f}" for v in s["percentiles"].values()),
+                 bg="#F7F9FB").grid(row=i, column=3)
+        tk.Label(frame_table, text=s["jitter_ms"], bg="#F7F9FB").grid(row=i, column=4)
+        tk.Label(frame_table, text=s["real_loss_rate"], bg="#F7F9FB").grid(row=i, column=5)
+        tk.Label(frame_table, text=s["bandwidth_kBps"], bg="#F7F9FB").grid(row=i, column=6)
+        tk.Label(frame_table, text=" / ".join("n/d" if v is None else str(v) for v in s["cpu_ms_msg"]),
+                 bg="#F7F9FB").grid(row=i, column=7)
+        tk.Label(frame_table, text="n/d" if s["rss_mb"] is None else s["rss_mb"],
+                 bg="#F7F9FB").grid(row=i, column=8)
+        tk.Label(frame_table, text="n/d" if s["bytes_msg"] is None else s["bytes_msg"],
+                 bg="#F7F9FB").grid(row=i, column=9)
 
     # --- Création du graphique combiné ---
     fig, axs = plt.subplots(2, 3, figsize=(14, 7))
@@ -236,10 +298,16 @@ def show_latency_ui():
     axs[0, 1].set_title("Bande passante (kB/s)")
     axs[0, 1].grid(alpha=0.3)
 
-    # Graphique 3 : Énergie
-    axs[0, 2].bar(protocols, [s["energy_cost_kBmsg"] for s in stats.values()],
-                  color="#FFC107", alpha=0.9)
-    axs[0, 2].set_title("Coût énergétique (kB/msg)")
+    # Graphique 3 : CPU par message (serveur / client, 0 si non mesuré)
+    positions = range(len(protocols))
+    axs[0, 2].bar([p - 0.2 for p in positions], [s["cpu_ms_msg"][0] or 0 for s in stats.values()],
+                  0.4, color="#FFC107", alpha=0.9, label="serveur")
+    axs[0, 2].bar([p + 0.2 for p in positions], [s["cpu_ms_msg"][1] or 0 for s in stats.values()],
+                  0.4, color="#FF7043", alpha=0.9, label="client")
+    axs[0, 2].set_xticks(list(positions))
+    axs[0, 2].set_xticklabels(protocols)
+    axs[0, 2].legend(fontsize=8)
+    axs[0, 2].set_title("CPU par message (ms)")
     axs[0, 2].grid(alpha=0.3)
 
     # Graphique 4 : Jitter
@@ -254,8 +322,14 @@ def show_latency_ui():
     axs[1, 1].set_title("Taux de perte réel (%)")
     axs[1, 1].grid(alpha=0.3)
 
-    # Cacher le dernier sous-plot vide
-    axs[1, 2].axis("off")
+    # Graphique 6 : Queue de latence (un trait par protocole, échelle log)
+    for proto, s in stats.items():
+        axs[1, 2].plot([f"p{q:g}" for q in TAIL_PERCENTILES], list(s["percentiles"].values()),
+                       marker="o", label=proto)
+    axs[1, 2].set_yscale("log")
+    axs[1, 2].set_title("Queue de latence (ms)")
+    axs[1, 2].legend(fontsize=8)
+    axs[1, 2].grid(alpha=0.3)
 
     fig.tight_layout()
 
@@ -268,6 +342,52 @@ def show_latency_ui():
               bg="#555", fg="white", font=("Segoe UI", 10, "bold"), width=12).pack(pady=10)
 
 
+def show_timeseries_ui():
+    """Latence brute dans le temps (sous-échantillonnée, re-calculée à chaque zoom)."""
+    if not any(os.path.exists(path) for path in LATENCY_FILES.values()):
+        messagebox.showwarning("Aucun fichier", "Aucun fichier de latence trouvé.")
+        return
+
+    win = Toplevel(root)
+    win.title("Latence dans le temps")
+    win.geometry("1200x800")
+    win.configure(bg="#F7F9FB")
+
+    fig = plt.figure(figsize=(12, 7))
+    canvas = FigureCanvasTkAgg(fig, master=win)
+    # Les vues portent les callbacks de zoom : on les garde avec la fenêtre
+    win.views = plot_series(fig, LATENCY_FILES)
+    if not win.views:
+        win.destroy()
+        messagebox.showwarning("Aucune donnée", "Aucune donnée exploitable trouvée.")
+        return
+
+    # Barre d’outils matplotlib : zoom / déplacement -> nouveau sous-échantillonnage
+    toolbar = NavigationToolbar2Tk(canvas, win)
+    toolbar.update()
+    canvas.draw()
+    canvas.get_tk_widget().pack(fill="both", expand=True)
+
+
+def show_live_dashboard():
+    """Latence en direct du mode sélectionné (rafraîchie pendant l’exécution)."""
+    global live_window
+    if live_window is not None and live_window.winfo_exists():
+        live_window.lift()
+        return
+    live_window = Toplevel(root)
+    live_window.title("Latence en direct")
+    live_window.geometry("950x380")
+    dashboard = LiveDashboard(live_window, lambda: LATENCY_FILES[selected_mode.get()])
+
+    def on_close():
+        global live_window
+        dashboard.stop()
+        live_window.destroy()
+        live_window = None
+    live_window.protocol("WM_DELETE_WINDOW", on_close)
+
+
 
 
 
@@ -276,18 +396,16 @@ def show_latency_ui():
 # 🔹 Surveillance automatique des processus
 # =========================================================
 def monitor_processes():
-    global stop_thread
+    """Relance les processus plantés (avec backoff) via le superviseur."""
     while not stop_thread:
         time.sleep(1)
         try:
-            if server_process and not is_alive(server_process):
-                status_text.set("🟡 Serveur arrêté (détecté automatiquement).")
-                server_process = None
-            if client_process and not is_alive(client_process):
-                status_text.set("🟡 Client arrêté (détecté automatiquement).")
-                client_process = None
-        except Exception:
-            pass
+            if supervisor:
+                supervisor.check()
+            if daemon_supervisor:
+                daemon_supervisor.check()
+        except Exception as e:
+            print(f"⚠️ Surveillance : {e}")
 
 
 # =========================================================
@@ -297,6 +415,8 @@ def quit_app():
     global stop_thread
     stop_thread = True
     stop_project()
+    if daemon_supervisor:
+        daemon_supervisor.stop_all()
     root.destroy()
 
 
@@ -317,6 +437,8 @@ tk.Radiobutton(frame_mode, text="Mode 2 : WebSocket", variable=selected_mode,
                value="WebSocket", bg="#F7F9FB", font=("Segoe UI", 11)).pack(anchor="w", padx=10)
 tk.Radiobutton(frame_mode, text="Mode 3 : MQTT", variable=selected_mode,
                value="MQTT", bg="#F7F9FB", font=("Segoe UI", 11)).pack(anchor="w", padx=10)
+tk.Radiobutton(frame_mode, text="Mode 4 : Local (socket Unix)", variable=selected_mode,
+               value="Local", bg="#F7F9FB", font=("Segoe UI", 11)).pack(anchor="w", padx=10)
 
 # --- Boutons principaux ---
 frame_buttons = tk.Frame(root, bg="#F7F9FB")
@@ -335,6 +457,14 @@ tk.Button(root, text="📊 Voir les latences", command=show_latency_ui,
           width=22, height=2, bg="#FFC107", fg="black",
           font=("Segoe UI", 10, "bold")).pack(pady=5)
 
+tk.Button(root, text="📈 Latence dans le temps", command=show_timeseries_ui,
+          width=22, height=2, bg="#03A9F4", fg="black",
+          font=("Segoe UI", 10, "bold")).pack(pady=5)
+
+tk.Button(root, text="📡 Suivi en direct", command=show_live_dashboard,
+          width=22, height=2, bg="#8BC34A", fg="black",
+          font=("Segoe UI", 10, "bold")).pack(pady=5)
+
 # --- Zone d’état ---
 tk.Label(root, textvariable=status_text, font=("Segoe UI", 11, "italic"),
          fg="#333", bg="#F7F9FB", wraplength=500, justify="center").pack(pady=10)
@@ -0,0 +1,450 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : run_history.py
+# Description :
+#   Historique des exécutions (SQLite) et détection des régressions de performance
+#   - Chaque exécution (client lancé par run_all.py, banc load_generator.py, import
+#     manuel d’un CSV) devient un « run » : protocole, modèle, révision git, machine,
+#     paramètres
+#   - Mesures brutes indexées par (run, horodatage) ; résumé calculé une seule fois
+#     à l’enregistrement (mêmes définitions que latency_stream.LatencyStats)
+#   - Comparaison à une référence : test de Mann-Whitney (approximation normale,
+#     sans scipy) sur les latences et sur le débit seconde par seconde ; une
+#     régression = différence significative ET supérieure à un effet minimal
+#
+# Exemple :
+#   python run_history.py record latency_http.csv --protocol http
+#   python run_history.py list
+#   python run_history.py compare 12 --baseline previous
+# =========================================================
+
+import argparse
+import ast
+import csv
+import json
+import math
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+import numpy as np
+from latency_stream import LatencyStats, MAX_LATENCY_MS, MIN_LATENCY_MS
+
+# ---------- Configuration ----------
+HISTORY_DB = "run_history.db"
+ALPHA = 0.01          # seuil de significativité des tests
+MIN_EFFECT = 5.0      # % : en dessous, une différence significative est jugée négligeable
+MIN_SAMPLES = 20      # mesures minimales de chaque côté pour conclure
+# -----------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at REAL NOT NULL,
+    source      TEXT NOT NULL,   -- run_all / load_generator / manual
+    protocol    TEXT NOT NULL,
+    model       TEXT,
+    git_rev     TEXT,
+    git_dirty   INTEGER,
+    host        TEXT,
+    platform    TEXT,
+    params      TEXT,            -- JSON
+    csv_path    TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id     INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    ts         REAL NOT NULL,
+    latency_ms REAL NOT NULL,
+    msg_size   INTEGER,
+    stream     TEXT,
+    seq        INTEGER,
+    error      TEXT
+);
+CREATE INDEX IF NOT EXISTS samples_run_ts ON samples(run_id, ts);
+CREATE TABLE IF NOT EXISTS summaries (
+    run_id         INTEGER PRIMARY KEY REFERENCES runs(id) ON DELETE CASCADE,
+    started_at     REAL,
+    duration_s     REAL,
+    messages       INTEGER,
+    errors         INTEGER,
+    throughput_msg_s REAL,
+    mean_ms        REAL,
+    std_ms         REAL,
+    jitter_ms      REAL,
+    p50_ms         REAL,
+    p90_ms         REAL,
+    p99_ms         REAL,
+    p999_ms        REAL,
+    max_ms         REAL,
+    loss_pct       REAL
+);
+"""
+
+
+# =========================================================
+# 🔹 Métadonnées d’exécution
+# =========================================================
+def git_revision(cwd=None):
+    """(révision courte, arbre modifié ?) ou (None, None) hors dépôt git."""
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True,
+                             text=True, timeout=5, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                                capture_output=True, text=True, timeout=5, check=True).stdout
+        return rev, bool(status.strip())
+    except (OSError, subprocess.SubprocessError):
+        return None, None
+
+
+def script_constant(path, name):
+    """Valeur d’une constante de configuration d’un script (ex. MODEL_NAME), sans l’exécuter."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), path)
+    except (OSError, SyntaxError):
+        return None
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == name for t in node.targets):
+            try:
+                return ast.literal_eval(node.value)
+            except ValueError:
+                return None
+    return None
+
+
+# =========================================================
+# 🔹 Lecture d’un fichier de latence
+# =========================================================
+def read_samples(csv_path, since=None):
+    """
+    Lignes d’un fichier de latence (clients, load_generator, multicam) :
+    [(ts, latency_ms, msg_size, stream, seq, error), ...] et modèle le plus utilisé
+    (colonne 'setting' du mode adaptatif) s’il est connu.
+    """
+    samples, settings = [], {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                ts = float(row["timestamp"])
+                latency = float(row["latency_ms"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if since is not None and ts < since:
+                continue
+            size = row.get("msg_size_bytes")
+            seq = row.get("seq")
+            error = row.get("error") or ("" if latency > MIN_LATENCY_MS else "échec")
+            samples.append((ts, latency, int(float(size)) if size else None,
+                            row.get("camera") or "", int(seq) if seq not in (None, "") else None, error))
+            setting = row.get("setting")
+            if setting:
+                settings[setting] = settings.get(setting, 0) + 1
+    model = max(settings, key=settings.get) if settings else None
+    return samples, model
+
+
+def summarize(samples, default_size=512):
+    """Résumé d’un run (filtre et indicateurs identiques à latency_stream)."""
+    stats = LatencyStats(default_size)
+    errors = 0
+    for ts, latency, size, stream, seq, error in sorted(samples):
+        if error or not MIN_LATENCY_MS < latency < MAX_LATENCY_MS:
+            errors += 1
+            continue
+        stats.add(ts, latency, size or default_size)
+        if seq is not None:
+            stats.add_seq(stream, seq)
+    started = min(s[0] for s in samples) if samples else None
+    duration = max(s[0] for s in samples) - started if samples else 0.0
+    ok = [s[1] for s in samples if not s[5] and MIN_LATENCY_MS < s[1] < MAX_LATENCY_MS]
+    pct = stats.percentiles() if stats.count else {}
+    return {
+        "started_at": started,
+        "duration_s": round(duration, 3),
+        "messages": len(samples),
+        "errors": errors,
+        "throughput_msg_s": round(stats.count / duration, 3) if duration > 0 else 0.0,
+        "mean_ms": round(stats.mean, 3),
+        "std_ms": round(stats.std, 3),
+        "jitter_ms": round(stats.jitter, 3),
+        "p50_ms": round(pct.get(50, 0.0), 3),
+        "p90_ms": round(pct.get(90, 0.0), 3),
+        "p99_ms": round(pct.get(99, 0.0), 3),
+        "p999_ms": round(pct.get(99.9, 0.0), 3),
+        "max_ms": round(max(ok), 3) if ok else 0.0,
+        "loss_pct": round(stats.loss_rate, 3),
+    }
+
+
+# =========================================================
+# 🔹 Tests statistiques
+# =========================================================
+def mann_whitney(a, b):
+    """
+    Test de Mann-Whitney unilatéral : b tend-il à prendre des valeurs plus grandes que a ?
+    Approximation normale avec correction des ex æquo et de continuité.
+    :return: (p-valeur, P(b > a) estimée)
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    n1, n2 = len(a), len(b)
+    values = np.concatenate([a, b])
+    order = np.argsort(values, kind="mergesort")
+    _, first, counts = np.unique(values[order], return_index=True, return_counts=True)
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat(first + (counts + 1) / 2, counts)  # rang moyen des ex æquo
+    u = ranks[n1:].sum() - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    ties = float((counts ** 3 - counts).sum())
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+    if sigma == 0:
+        return 1.0, 0.5
+    z = (u - n1 * n2 / 2 - 0.5) / sigma
+    return 0.5 * math.erfc(z / math.sqrt(2)), u / (n1 * n2)
+
+
+def per_second(timestamps):
+    """Messages reçus par seconde (secondes complètes uniquement)."""
+    if len(timestamps) < 2:
+        return np.array([])
+    ts = np.asarray(timestamps, dtype=float)
+    seconds = np.floor(ts - ts.min()).astype(int)
+    counts = np.bincount(seconds)
+    return counts[1:-1] if len(counts) > 2 else counts  # premières et dernières secondes partielles
+
+
+# =========================================================
+# 🔹 Base d’historique
+# =========================================================
+class RunHistory:
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def record(self, csv_path, protocol, source="manual", model=None, params=None, since=None):
+        """
+        Enregistre un fichier de latence comme un run.
+        :param since: horodatage de début (ignore les lignes d’une exécution précédente)
+        :return: identifiant du run, ou None si le fichier ne contient aucune mesure
+        """
+        samples, setting = read_samples(csv_path, since)
+        if not samples:
+            return None
+        rev, dirty = git_revision()
+        summary = summarize(samples)
+        with self.db:  # une seule transaction
+            cur = self.db.execute(
+                "INSERT INTO runs (recorded_at, source, protocol, model, git_rev, git_dirty, host, "
+                "platform, params, csv_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), source, protocol, model or setting, rev,
+                 None if dirty is None else int(dirty), socket.gethostname(),
+                 f"{platform.platform()} / Python {platform.python_version()}",
+                 json.dumps(params or {}, sort_keys=True), os.path.abspath(csv_path)))
+            run_id = cur.lastrowid
+            self.db.executemany(
+                "INSERT INTO samples (run_id, ts, latency_ms, msg_size, stream, seq, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", ((run_id,) + s for s in samples))
+            columns = ", ".join(summary)
+            self.db.execute(f"INSERT INTO summaries (run_id, {columns}) VALUES (?{', ?' * len(summary)})",
+                            (run_id, *summary.values()))
+        return run_id
+
+    def runs(self, protocol=None, limit=20):
+        query = "SELECT * FROM runs JOIN summaries ON summaries.run_id = runs.id"
+        args = ()
+        if protocol:
+            query += " WHERE protocol = ?"
+            args = (protocol,)
+        return self.db.execute(query + " ORDER BY runs.id DESC LIMIT ?", args + (limit,)).fetchall()
+
+    def run(self, run_id):
+        return self.db.execute("SELECT * FROM runs JOIN summaries ON summaries.run_id = runs.id "
+                               "WHERE runs.id = ?", (run_id,)).fetchone()
+
+    def latest(self):
+        row = self.db.execute("SELECT MAX(id) FROM runs").fetchone()
+        return row[0]
+
+    def previous(self, run_id):
+        """Run précédent comparable : même protocole, même origine, mêmes paramètres."""
+        run = self.run(run_id)
+        if run is None:
+            return None
+        row = self.db.execute("SELECT id FROM runs WHERE id < ? AND protocol = ? AND source = ? "
+                              "AND params = ? ORDER BY id DESC LIMIT 1",
+                              (run_id, run["protocol"], run["source"], run["params"])).fetchone()
+        return row[0] if row else None
+
+    def latencies(self, run_id):
+        rows = self.db.execute("SELECT latency_ms FROM samples WHERE run_id = ? AND error = '' "
+                               "AND latency_ms > ? AND latency_ms < ?",
+                               (run_id, MIN_LATENCY_MS, MAX_LATENCY_MS)).fetchall()
+        return [r[0] for r in rows]
+
+    def timestamps(self, run_id):
+        rows = self.db.execute("SELECT ts FROM samples WHERE run_id = ? AND error = '' ORDER BY ts",
+                               (run_id,)).fetchall()
+        return [r[0] for r in rows]
+
+    def compare(self, baseline, candidate, alpha=ALPHA, min_effect=MIN_EFFECT):
+        """
+        Régressions du run `candidate` par rapport à `baseline`.
+        :return: liste de dicts {metric, baseline, candidate, change_pct, p_value, verdict}
+        """
+        checks = []
+
+        # --- Latence : le candidat est-il plus lent ? ---
+        a, b = self.latencies(baseline), self.latencies(candidate)
+        checks.append(self._check("latence p50 (ms)", a, b, np.median, alpha, min_effect, higher_is_worse=True))
+        # --- Débit : le candidat reçoit-il moins de messages par seconde ? ---
+        a, b = per_second(self.timestamps(baseline)), per_second(self.timestamps(candidate))
+        checks.append(self._check("débit (msg/s)", a, b, np.mean, alpha, min_effect, higher_is_worse=False))
+
+        # --- Queue et pertes : indicatifs (pas de test, valeurs précalculées) ---
+        base, cand = self.run(baseline), self.run(candidate)
+        for metric, column in (("latence p99 (ms)", "p99_ms"), ("pertes (%)", "loss_pct")):
+            checks.append({"metric": metric, "baseline": base[column], "candidate": cand[column],
+                           "change_pct": _change(base[column], cand[column]), "p_value": None,
+                           "verdict": "info"})
+        return checks
+
+    @staticmethod
+    def _check(metric, a, b, center, alpha, min_effect, higher_is_worse):
+        result = {"metric": metric, "baseline": None, "candidate": None, "change_pct": None,
+                  "p_value": None, "verdict": "données insuffisantes"}
+        if len(a) < MIN_SAMPLES or len(b) < MIN_SAMPLES:
+            return result
+        base, cand = float(center(a)), float(center(b))
+        change = _change(base, cand)
+        p_worse, _ = mann_whitney(a, b) if higher_is_worse else mann_whitney(b, a)
+        worse = change is not None and (change if higher_is_worse else -change) >= min_effect
+        p_better, _ = mann_whitney(b, a) if higher_is_worse else mann_whitney(a, b)
+        better = change is not None and (-change if higher_is_worse else change) >= min_effect
+        if p_worse < alpha and worse:
+            verdict = "RÉGRESSION"
+        elif p_better < alpha and better:
+            verdict = "amélioration"
+        else:
+            verdict = "stable"
+        result.update(baseline=round(base, 3), candidate=round(cand, 3), change_pct=change,
+                      p_value=min(p_worse, p_better), verdict=verdict)
+        return result
+
+
+def _change(base, cand):
+    if base is None or cand is None or not base:
+        return None
+    return round((cand - base) / base * 100, 2)
+
+
+# =========================================================
+# 🔹 Ligne de commande
+# =========================================================
+def _parse_param(text):
+    """'cameras=10' -> ('cameras', 10) ; valeur JSON si possible, sinon texte."""
+    key, _, value = text.partition("=")
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
+
+
+def _print_runs(rows):
+    print(f"{'run':>5}  {'date':<16} {'origine':<14} {'proto':<9} {'modèle':<12} {'git':<9} "
+          f"{'msgs':>7} {'msg/s':>8} {'p50':>8} {'p99':>8} {'pertes':>7}")
+    for r in rows:
+        rev = (r["git_rev"] or "-") + ("*" if r["git_dirty"] else "")
+        print(f"{r['id']:>5}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(r['recorded_at'])):<16} "
+              f"{r['source']:<14} {r['protocol']:<9} {(r['model'] or '-'):<12} {rev:<9} "
+              f"{r['messages']:>7} {r['throughput_msg_s']:>8.1f} {r['p50_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {r['loss_pct']:>6.2f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Historique des exécutions et détection des régressions")
+    parser.add_argument("--db", default=HISTORY_DB, help="base SQLite de l’historique")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="enregistrer un fichier de latence comme un run")
+    record.add_argument("csv")
+    record.add_argument("--protocol", required=True)
+    record.add_argument("--source", default="manual")
+    record.add_argument("--model")
+    record.add_argument("--since", type=float, help="ignorer les lignes antérieures (horodatage)")
+    record.add_argument("--param", action="append", default=[], help="paramètre clé=valeur (répétable)")
+
+    listing = commands.add_parser("list", help="derniers runs")
+    listing.add_argument("--protocol")
+    listing.add_argument("--limit", type=int, default=20)
+
+    show = commands.add_parser("show", help="métadonnées et résumé d’un run")
+    show.add_argument("run", type=int)
+
+    compare = commands.add_parser("compare", help="comparer un run à une référence")
+    compare.add_argument("run", nargs="?", help="run candidat (défaut : le dernier)")
+    compare.add_argument("--baseline", default="previous",
+                         help="run de référence, ou 'previous' : précédent run comparable")
+    compare.add_argument("--alpha", type=float, default=ALPHA)
+    compare.add_argument("--min-effect", type=float, default=MIN_EFFECT,
+                         help="variation minimale (%%) pour signaler une régression")
+    args = parser.parse_args(argv)
+
+    history = RunHistory(args.db)
+    try:
+        if args.command == "record":
+            params = dict(_parse_param(p) for p in args.param)
+            run_id = history.record(args.csv, args.protocol, args.source, args.model, params, args.since)
+            if run_id is None:
+                print(f"⚠️ Aucune mesure dans {args.csv} : rien n’est enregistré.")
+            else:
+                print(f"🗄️ Run {run_id} enregistré ({args.protocol}, {args.source}) dans {args.db}")
+            return 0
+
+        if args.command == "list":
+            _print_runs(history.runs(args.protocol, args.limit))
+            return 0
+
+        if args.command == "show":
+            run = history.run(args.run)
+            if run is None:
+                raise SystemExit(f"❌ Run {args.run} introuvable")
+            for key in run.keys():
+                print(f"{key:<18} {run[key]}")
+            return 0
+
+        # --- compare ---
+        candidate = int(args.run) if args.run else history.latest()
+        if candidate is None or history.run(candidate) is None:
+            raise SystemExit("❌ Run candidat introuvable")
+        baseline = history.previous(candidate) if args.baseline == "previous" else int(args.baseline)
+        if baseline is None or history.run(baseline) is None:
+            raise SystemExit(f"❌ Aucune référence comparable pour le run {candidate}")
+        print(f"📏 Run {candidate} comparé au run {baseline} (α = {args.alpha}, effet min. {args.min_effect} %)")
+        _print_runs([history.run(baseline), history.run(candidate)])
+        checks = history.compare(baseline, candidate, args.alpha, args.min_effect)
+        for c in checks:
+            values = (f"{c['baseline']} -> {c['candidate']}" if c["baseline"] is not None else "-")
+            change = f"{c['change_pct']:+.1f} %" if c["change_pct"] is not None else ""
+            p = f"p = {c['p_value']:.2g}" if c["p_value"] is not None else ""
+            flag = "❌" if c["verdict"] == "RÉGRESSION" else "•"
+            print(f"   {flag} {c['metric']:<18} {values:<24} {change:>9}  {p:<12} {c['verdict']}")
+        regressions = [c for c in checks if c["verdict"] == "RÉGRESSION"]
+        print("❌ Régression détectée" if regressions else "✅ Pas de régression significative")
+        return 1 if regressions else 0  # code de sortie utilisable en intégration continue
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+# =========================================================
+# SR04 Groupe 9 - Module de contrôle
+# Fichier : server/controller.py
+# Description :
+#   Logique commune du contrôleur de feux (utilisée par tous les serveurs)
+#   - Moyenne mobile exponentielle (EMA) sur le nombre de véhicules
+#   - Seuils d’hystérésis LOW / HIGH
+#   - Durées minimales et maximales pour chaque phase
+#   - Phase jaune entre les états vert et rouge
+#   - Notification des changements d’état aux abonnés (ex. flux SSE)
+# =========================================================
+
+from collections import deque
+import time
+
+# --- Paramètres ajustables (valeurs par défaut) ---
+LOW = 3              # Reste en ROUGE si la demande est inférieure à ce seuil (après la durée min rouge)
+HIGH = 6             # Reste en VERT si la demande est supérieure à ce seuil (après la durée min verte)
+ALPHA = 0.3          # Facteur de lissage EMA (0..1) ; plus grand = plus réactif
+MIN_GREEN = 8        # Durée minimale en vert (secondes)
+MAX_GREEN = 20       # Durée maximale en vert (secondes)
+MIN_RED = 5          # Durée minimale en rouge (secondes)
+YELLOW_TIME = 2      # Durée de la phase jaune (secondes)
+
+
+class TrafficController:
+    """
+    Contrôleur de feu tricolore piloté par le nombre de véhicules détectés.
+    """
+
+    def __init__(self, low=LOW, high=HIGH, alpha=ALPHA, min_green=MIN_GREEN,
+                 max_green=MAX_GREEN, min_red=MIN_RED, yellow_time=YELLOW_TIME,
+                 clock=time.time):
+        """
+        :param clock: fonction renvoyant le temps courant en secondes
+        """
+        self.low = low
+        self.high = high
+        self.alpha = alpha
+        self.min_green = min_green
+        self.max_green = max_green
+        self.min_red = min_red
+        self.yellow_time = yellow_time
+        self.clock = clock
+
+        self.state = "RED"           # "RED" | "GREEN" | "YELLOW"
+        self.state_started_at = clock()
+        self.ema = None              # Moyenne mobile exponentielle du nombre de véhicules
+        self.history = deque(maxlen=30)  # Historique optionnel pour un diagnostic futur
+        self.listeners = []          # Fonctions appelées à chaque transition
+
+    def add_listener(self, callback):
+        """
+        Abonne une fonction aux changements d’état.
+        :param callback: appelée avec (ancien_état, nouvel_état, instant)
+        """
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Désabonne une fonction précédemment ajoutée"""
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def elapsed(self):
+        """Renvoie le temps écoulé depuis le dernier changement d’état"""
+        return self.clock() - self.state_started_at
+
+    def set_state(self, new_state):
+        """Met à jour l’état du feu et prévient les abonnés"""
+        old_state = self.state
+        self.state = new_state
+        self.state_started_at = self.clock()
+        for callback in self.listeners:
+            callback(old_state, new_state, self.state_started_at)
+
+    def update(self, vehicle_count):
+        """
+        Met à jour l’état du contrôleur selon la demande lissée et les contraintes temporelles.
+        Renvoie (couleur_du_feu, durée_suggérée_en_secondes)
+        """
+        # 1) Appliquer le lissage EMA sur le nombre de véhicules détectés
+        if self.ema is None:
+            self.ema = vehicle_count
+        else:
+            self.ema = self.alpha * vehicle_count + (1 - self.alpha) * self.ema
+        self.history.append(self.ema)
+        t = self.elapsed()
+
+        # 2) Logique de transition entre les phases
+        if self.state == "GREEN":
+            # Respecter la durée minimale de la phase verte
+            if t < self.min_green:
+                return "green", 1
+            # Si la demande chute ou que la durée max est atteinte -> passer au jaune
+            if self.ema < self.low or t >= self.max_green:
+                self.set_state("YELLOW")
+                return "yellow", self.yellow_time
+            # Sinon, rester en vert
+            return "green", 1
+
+        if self.state == "YELLOW":
+            # Rester en jaune pour une durée fixe avant de passer au rouge
+            if t >= self.yellow_time:
+                self.set_state("RED")
+                return "red", 1
+            # Maintenir le jaune jusqu’à la fin du délai
+            return "yellow", max(1, int(self.yellow_time - t))
+
+        # État = ROUGE
+        if t < self.min_red:
+            return "red", 1
+        # Si la demande est suffisante, passer au vert
+        if self.ema >= self.high:
+            self.set_state("GREEN")
+            return "green", 1
+        # Sinon, rester en rouge
+        return "red", 1
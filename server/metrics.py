@@ -0,0 +1,206 @@
+# =========================================================
+# SR04 Groupe 9 - Module de métriques
+# Fichier : server/metrics.py
+# Description :
+#   Instrumentation commune des serveurs (HTTP / WS / MQTT / Local)
+#   - Compteurs, jauges et histogrammes de latence (buckets fixes)
+#   - Export texte au format Prometheus (point de collecte /metrics)
+#   - Instantané JSON périodique écrit sur disque (serveurs sans HTTP)
+#   - Journalisation structurée échantillonnée (remplace le print par message)
+# =========================================================
+
+import json
+import logging
+import os
+import threading
+import time
+
+# --- Bornes des buckets (millisecondes) : de 1 µs à 1 s ---
+DEFAULT_BUCKETS_MS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                      1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class Histogram:
+    """
+    Histogramme cumulatif à buckets fixes (mémoire constante).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # dernier bucket = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """Ajoute une mesure (ms)"""
+        i = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimation d’un quantile (0..1) par la borne supérieure du bucket"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+
+class ServerMetrics:
+    """
+    Registre des métriques d’un serveur (thread-safe).
+    """
+
+    def __init__(self, server_name):
+        self.server_name = server_name
+        self.started_at = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self._rate_window = (self.started_at, 0)
+        self._rate = 0.0
+
+    # --- Mise à jour (chemin critique : quelques opérations seulement) ---
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def add_gauge(self, name, delta):
+        with self.lock:
+            self.gauges[name] = self.gauges.get(name, 0) + delta
+
+    def observe(self, name, value_ms):
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(value_ms)
+
+    # --- Lecture ---
+    def messages_per_second(self):
+        """Débit de messages depuis le dernier appel (fenêtre glissante)"""
+        now = time.time()
+        with self.lock:
+            total = self.counters.get("messages_total", 0)
+            t0, n0 = self._rate_window
+            if now - t0 >= 1.0:
+                self._rate = (total - n0) / (now - t0)
+                self._rate_window = (now, total)
+            return self._rate
+
+    def snapshot(self):
+        """Vue JSON de toutes les métriques"""
+        rate = self.messages_per_second()
+        with self.lock:
+            return {
+                "server": self.server_name,
+                "timestamp": time.time(),
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "messages_per_second": round(rate, 2),
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "histograms_ms": {
+                    name: {"count": h.count, "mean": round(h.sum / h.count, 4) if h.count else 0.0,
+                           "p50": h.quantile(0.5), "p95": h.quantile(0.95),
+                           "p99": h.quantile(0.99), "max": round(h.max, 4)}
+                    for name, h in self.histograms.items()
+                },
+            }
+
+    def render_prometheus(self):
+        """Export au format texte Prometheus (version 0.0.4)"""
+        rate = self.messages_per_second()
+        prefix = "sr04"
+        label = f'server="{self.server_name}"'
+        lines = [f"# TYPE {prefix}_uptime_seconds gauge",
+                 f"{prefix}_uptime_seconds{{{label}}} {time.time() - self.started_at:.1f}",
+                 f"# TYPE {prefix}_messages_per_second gauge",
+                 f"{prefix}_messages_per_second{{{label}}} {rate:.3f}"]
+        with self.lock:
+            for name, value in self.counters.items():
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                lines.append(f"{prefix}_{name}{{{label}}} {value}")
+            for name, value in self.gauges.items():
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                lines.append(f"{prefix}_{name}{{{label}}} {value}")
+            for name, h in self.histograms.items():
+                metric = f"{prefix}_{name}_ms"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, c in zip(h.buckets, h.counts):
+                    cumulative += c
+                    lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {h.count}')
+                lines.append(f"{metric}_sum{{{label}}} {h.sum:.6f}")
+                lines.append(f"{metric}_count{{{label}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    # --- Export périodique ---
+    def write_snapshot(self, path):
+        """Écrit l’instantané JSON de façon atomique (fichier temporaire + renommage)"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def start_snapshot_writer(self, path, interval=5.0):
+        """Lance un thread qui réécrit l’instantané toutes les `interval` secondes"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_snapshot(path)
+                except OSError as e:
+                    print(f"⚠️ Écriture des métriques impossible : {e}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+
+class SampledLogger:
+    """
+    Journal structuré (une ligne JSON par événement) avec échantillonnage.
+    Un message sur `every` est écrit ; les événements importants passent toujours.
+    """
+
+    def __init__(self, name, every=100):
+        self.every = max(1, every)
+        self.seen = 0
+        self.logger = logging.getLogger(name)
+        if not self.logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+
+    def sample(self, event, **fields):
+        """Journalise un message courant (1 sur `every`)"""
+        self.seen += 1
+        if self.seen % self.every == 0:
+            self.log(event, sampled=self.every, **fields)
+
+    def log(self, event, **fields):
+        """Journalise toujours (transitions, erreurs, connexions)"""
+        if self.logger.isEnabledFor(logging.INFO):
+            fields["ts"] = round(time.time(), 3)
+            fields["event"] = event
+            self.logger.info(json.dumps(fields))
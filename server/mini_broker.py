@@ -0,0 +1,349 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : server/mini_broker.py
+# Description :
+#   Broker MQTT 3.1.1 minimal (asyncio), à la place de Mosquitto pour les mesures
+#   - Suffisant pour client_mqtt.py, server_mqtt.py et le générateur de charge :
+#     CONNECT, PUBLISH QoS 0 / 1 (QoS 2 accepté en entrée), SUBSCRIBE / UNSUBSCRIBE
+#     avec jokers + et #, PINGREQ, DISCONNECT, message de dernière volonté (will)
+#   - Sessions non persistantes, pas de messages retenus ni d’authentification
+#   - Aucun réglage externe : mêmes conditions d’une exécution à l’autre
+#   - Mesure son propre temps de relais par message (réception du PUBLISH -> écriture
+#     vers chaque abonné) : instantané JSON périodique + ligne de statistiques
+#   - Lancé automatiquement par run_all.py (mode MQTT) si aucun broker ne répond,
+#     et par load_generator.py --embedded-broker
+#
+# Exemple :
+#   python server/mini_broker.py --port 1883
+# =========================================================
+
+import argparse
+import asyncio
+import itertools
+import signal
+import time
+from metrics import ServerMetrics, SampledLogger
+
+# --- Paramètres du broker ---
+HOST = "localhost"          # identique à BROKER des clients et du serveur MQTT
+PORT = 1883
+MAX_QOS = 1                 # QoS maximale accordée aux abonnements
+CONNECT_TIMEOUT = 10.0      # s pour recevoir le CONNECT après l’ouverture de la connexion
+MAX_BUFFERED = 1 << 20      # octets en attente vers un abonné lent : au-delà, messages abandonnés
+
+# --- Paramètres d’instrumentation ---
+METRICS_FILE = "metrics_broker.json"  # Instantané JSON périodique (None = désactivé)
+METRICS_INTERVAL = 5                  # Période d’écriture de l’instantané (secondes)
+STATS_EVERY = 10000                   # messages entre deux lignes de statistiques
+LOG_SAMPLE_EVERY = 1000               # Un événement courant journalisé sur N
+
+# --- Types de paquets MQTT ---
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+
+class ProtocolError(Exception):
+    """Paquet invalide : la connexion est fermée (MQTT 3.1.1, §4.8)."""
+
+
+# =========================================================
+# 🔹 Encodage des paquets
+# =========================================================
+def encode_length(n):
+    """Longueur restante : entier variable de 1 à 4 octets"""
+    out = bytearray()
+    while True:
+        byte, n = n % 128, n // 128
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return bytes(out)
+
+
+def packet(first_byte, body=b""):
+    return bytes([first_byte]) + encode_length(len(body)) + body
+
+
+def utf8(text):
+    data = text.encode()
+    return len(data).to_bytes(2, "big") + data
+
+
+def read_str(body, i):
+    n = int.from_bytes(body[i:i + 2], "big")
+    if i + 2 + n > len(body):
+        raise ProtocolError("chaîne tronquée")
+    return body[i + 2:i + 2 + n].decode(), i + 2 + n
+
+
+async def read_packet(reader):
+    """(premier octet, corps) du prochain paquet"""
+    first = (await reader.readexactly(1))[0]
+    length, multiplier = 0, 1
+    for _ in range(4):
+        byte = (await reader.readexactly(1))[0]
+        length += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            break
+        multiplier *= 128
+    else:
+        raise ProtocolError("longueur restante invalide")
+    return first, (await reader.readexactly(length) if length else b"")
+
+
+def topic_matches(topic_filter, topic):
+    """Filtre d’abonnement (jokers + et #) appliqué à un nom de topic"""
+    if topic.startswith("$") and topic_filter[:1] in ("+", "#"):
+        return False  # topics système exclus des jokers de premier niveau
+    levels = topic.split("/")
+    for i, part in enumerate(topic_filter.split("/")):
+        if part == "#":
+            return True
+        if i >= len(levels) or (part != "+" and part != levels[i]):
+            return False
+    return len(levels) == len(topic_filter.split("/"))
+
+
+def valid_filter(topic_filter):
+    parts = topic_filter.split("/")
+    return bool(topic_filter) and all(
+        ("#" not in p or (p == "#" and i == len(parts) - 1)) and ("+" not in p or p == "+")
+        for i, p in enumerate(parts))
+
+
+# =========================================================
+# 🔹 Broker
+# =========================================================
+class Session:
+    """Un client connecté"""
+
+    def __init__(self, client_id, writer, keepalive, will):
+        self.client_id = client_id
+        self.writer = writer
+        self.keepalive = keepalive
+        self.will = will                # (topic, payload, qos) ou None
+        self.filters = {}               # filtre -> QoS accordée
+        self.packet_ids = itertools.cycle(range(1, 65536))
+
+    def send(self, data):
+        self.writer.write(data)
+
+
+class MiniBroker:
+    def __init__(self, metrics=None, log=None):
+        self.sessions = {}       # client_id -> Session
+        self.exact = {}          # topic sans joker -> {Session: QoS}
+        self.wildcards = {}      # filtre avec joker -> {Session: QoS}
+        self.metrics = metrics or ServerMetrics("broker")
+        self.log = log or SampledLogger("sr04.mini_broker", every=LOG_SAMPLE_EVERY)
+        self.anonymous = itertools.count(1)
+
+    # --- Abonnements ---
+    def _index(self, topic_filter):
+        return self.wildcards if ("+" in topic_filter or "#" in topic_filter) else self.exact
+
+    def subscribe(self, session, topic_filter, qos):
+        session.filters[topic_filter] = qos
+        self._index(topic_filter).setdefault(topic_filter, {})[session] = qos
+        self.metrics.add_gauge("subscriptions", 1)
+
+    def unsubscribe(self, session, topic_filter):
+        if session.filters.pop(topic_filter, None) is None:
+            return
+        index = self._index(topic_filter)
+        subscribers = index.get(topic_filter, {})
+        subscribers.pop(session, None)
+        if not subscribers:
+            index.pop(topic_filter, None)
+        self.metrics.add_gauge("subscriptions", -1)
+
+    def subscribers(self, topic):
+        """{Session: QoS} : recherche directe + filtres à jokers (peu nombreux)"""
+        found = dict(self.exact.get(topic, ()))
+        for topic_filter, subs in self.wildcards.items():
+            if topic_matches(topic_filter, topic):
+                for session, qos in subs.items():
+                    found[session] = max(qos, found.get(session, 0))  # une seule copie par client
+        return found
+
+    # --- Relais ---
+    def publish(self, topic, payload, qos, t_recv):
+        """Transmet un message à chaque abonné ; t_recv = perf_counter() à la réception"""
+        self.metrics.inc("messages_total")
+        targets = self.subscribers(topic)
+        if not targets:
+            self.metrics.inc("unrouted_total")
+        qos0 = None
+        for session, sub_qos in targets.items():
+            if session.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                self.metrics.inc("dropped_total")  # abonné qui ne lit plus
+                continue
+            if min(qos, sub_qos) == 0:
+                qos0 = qos0 or packet(PUBLISH << 4, utf8(topic) + payload)  # construit une fois
+                session.send(qos0)
+            else:
+                pid = next(session.packet_ids).to_bytes(2, "big")
+                session.send(packet(PUBLISH << 4 | 0x02, utf8(topic) + pid + payload))
+            self.metrics.inc("deliveries_total")
+            self.metrics.observe("forward", (time.perf_counter() - t_recv) * 1000)
+        self._stats()
+
+    def _stats(self):
+        total = self.metrics.counters.get("messages_total", 0)
+        if total % STATS_EVERY == 0:
+            print(self.summary())
+
+    def summary(self):
+        hist = self.metrics.histograms.get("forward")
+        if hist is None or not hist.count:
+            return "📊 Aucun message relayé"
+        return (f"📊 {self.metrics.counters.get('messages_total', 0)} messages, "
+                f"{hist.count} remises | relais moyen {hist.sum / hist.count:.3f} ms, "
+                f"p50 ≤ {hist.quantile(0.5)} ms, p99 ≤ {hist.quantile(0.99)} ms, max {hist.max:.3f} ms | "
+                f"{len(self.sessions)} client(s)")
+
+    # --- Connexions ---
+    async def _connect(self, reader, writer):
+        """Lit et valide le CONNECT ; renvoie la session ou None"""
+        first, body = await asyncio.wait_for(read_packet(reader), CONNECT_TIMEOUT)
+        if first >> 4 != CONNECT:
+            raise ProtocolError("le premier paquet doit être CONNECT")
+        name, i = read_str(body, 0)
+        level, flags = body[i], body[i + 1]
+        keepalive = int.from_bytes(body[i + 2:i + 4], "big")
+        if name not in ("MQTT", "MQIsdp") or level not in (3, 4):
+            writer.write(packet(CONNACK << 4, b"\x00\x01"))  # version de protocole refusée
+            return None
+        client_id, i = read_str(body, i + 4)
+        will = None
+        if flags & 0x04:
+            will_topic, i = read_str(body, i)
+            n = int.from_bytes(body[i:i + 2], "big")
+            will = (will_topic, body[i + 2:i + 2 + n], (flags >> 3) & 0x03)
+        # Nom d’utilisateur / mot de passe ignorés (pas d’authentification)
+        client_id = client_id or f"anonyme-{next(self.anonymous)}"
+
+        previous = self.sessions.get(client_id)
+        if previous:
+            previous.will = None
+            previous.writer.close()  # même identifiant : l’ancienne connexion est remplacée
+            self._drop(previous)
+        session = Session(client_id, writer, keepalive, will)
+        self.sessions[client_id] = session
+        writer.write(packet(CONNACK << 4, b"\x00\x00"))  # session non persistante, accepté
+        return session
+
+    def _drop(self, session):
+        for topic_filter in list(session.filters):
+            self.unsubscribe(session, topic_filter)
+        if self.sessions.get(session.client_id) is session:
+            del self.sessions[session.client_id]
+
+    def _handle(self, session, first, body):
+        """Traite un paquet ; renvoie False sur DISCONNECT"""
+        kind = first >> 4
+        if kind == PUBLISH:
+            t_recv = time.perf_counter()
+            qos = (first >> 1) & 0x03
+            topic, i = read_str(body, 0)
+            if "+" in topic or "#" in topic or qos > 2:
+                raise ProtocolError(f"PUBLISH invalide sur {topic!r}")
+            if qos:
+                pid = body[i:i + 2]
+                i += 2
+                session.send(packet((PUBACK if qos == 1 else PUBREC) << 4, pid))
+            self.publish(topic, body[i:], qos, t_recv)
+            self.log.sample("publish", client=session.client_id, topic=topic, qos=qos)
+        elif kind == PUBREL:
+            session.send(packet(PUBCOMP << 4, body[:2]))
+        elif kind in (PUBACK, PUBREC, PUBCOMP):
+            pass  # accusés de nos remises QoS 1 : TCP suffit, pas de retransmission
+        elif kind == SUBSCRIBE:
+            pid, i, granted = body[:2], 2, bytearray()
+            while i < len(body):
+                topic_filter, i = read_str(body, i)
+                requested = body[i] & 0x03
+                i += 1
+                if valid_filter(topic_filter):
+                    qos = min(requested, MAX_QOS)
+                    self.subscribe(session, topic_filter, qos)
+                    granted.append(qos)
+                else:
+                    granted.append(0x80)  # échec
+            session.send(packet(SUBACK << 4, pid + bytes(granted)))
+            self.log.log("subscribe", client=session.client_id, filters=list(session.filters))
+        elif kind == UNSUBSCRIBE:
+            pid, i = body[:2], 2
+            while i < len(body):
+                topic_filter, i = read_str(body, i)
+                self.unsubscribe(session, topic_filter)
+            session.send(packet(UNSUBACK << 4, pid))
+        elif kind == PINGREQ:
+            session.send(packet(PINGRESP << 4))
+        elif kind == DISCONNECT:
+            session.will = None  # déconnexion volontaire : pas de dernière volonté
+            return False
+        else:
+            raise ProtocolError(f"paquet inattendu (type {kind})")
+        return True
+
+    async def handle_client(self, reader, writer):
+        session = None
+        self.metrics.add_gauge("connected_clients", 1)
+        try:
+            session = await self._connect(reader, writer)
+            if session is None:
+                return
+            self.log.log("connect", client=session.client_id, keepalive=session.keepalive)
+            # Sans paquet pendant 1,5 × keepalive, le client est considéré perdu (§3.1.2.10)
+            timeout = session.keepalive * 1.5 if session.keepalive else None
+            while True:
+                first, body = await asyncio.wait_for(read_packet(reader), timeout)
+                if not self._handle(session, first, body):
+                    break
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        except (ProtocolError, IndexError, UnicodeDecodeError) as e:
+            self.metrics.inc("protocol_errors_total")
+            self.log.log("error", client=session.client_id if session else None, error=str(e))
+        finally:
+            self.metrics.add_gauge("connected_clients", -1)
+            if session:
+                self._drop(session)
+                if session.will:
+                    topic, payload, qos = session.will
+                    self.publish(topic, payload, qos, time.perf_counter())
+                self.log.log("disconnect", client=session.client_id)
+            writer.close()
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Broker MQTT 3.1.1 minimal (remplaçant de Mosquitto)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--metrics", default=METRICS_FILE, help="instantané JSON des métriques")
+    args = parser.parse_args(argv)
+
+    broker = MiniBroker()
+    server = await asyncio.start_server(broker.handle_client, args.host, args.port)
+    print(f"📮 Broker MQTT minimal sur {args.host}:{args.port}")
+    if args.metrics:
+        broker.metrics.start_snapshot_writer(args.metrics, METRICS_INTERVAL)
+
+    # Arrêt propre (SIGTERM du superviseur / du générateur de charge) : bilan + dernier instantané
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        except (NotImplementedError, AttributeError):
+            pass  # Windows : arrêt par Ctrl+C uniquement
+    async with server:
+        await stop.wait()
+    print(broker.summary())
+    if args.metrics:
+        broker.metrics.write_snapshot(args.metrics)
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
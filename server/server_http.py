@@ -7,97 +7,147 @@
 #   - Seuils d’hystérésis pour éviter le clignotement rapide
 #   - Durées minimales et maximales pour chaque phase
 #   - Phase jaune entre les états vert et rouge
+#   - Flux Server-Sent Events (/events) : chaque transition est poussée aux abonnés
+#   - Métriques au format Prometheus (/metrics) + journal structuré échantillonné
+#   - Horodatage des réponses (t_recv / t_send) et messages {"op": "sync"} :
+#     estimation du décalage d’horloge côté client (voir client/clock_sync.py)
 # =========================================================
 
-from flask import Flask, request, jsonify
-from collections import deque
+from flask import Flask, Response, request, jsonify
+from controller import TrafficController
+from metrics import ServerMetrics, SampledLogger
+import itertools
+import json
+import queue
+import threading
 import time
 
 app = Flask(__name__)
 
-# --- Paramètres ajustables ---
-LOW = 3              # Reste en ROUGE si la demande est inférieure à ce seuil (après la durée min rouge)
-HIGH = 6             # Reste en VERT si la demande est supérieure à ce seuil (après la durée min verte)
-ALPHA = 0.3          # Facteur de lissage EMA (0..1) ; plus grand = plus réactif
-MIN_GREEN = 8        # Durée minimale en vert (secondes)
-MAX_GREEN = 20       # Durée maximale en vert (secondes)
-MIN_RED = 5          # Durée minimale en rouge (secondes)
-YELLOW_TIME = 2      # Durée de la phase jaune (secondes)
-
-# --- État du contrôleur ---
-state = "RED"        # "RED" | "GREEN" | "YELLOW"
-state_started_at = time.time()
-ema = None           # Moyenne mobile exponentielle du nombre de véhicules
-history = deque(maxlen=30)  # Historique optionnel pour un diagnostic futur
-
-def now():
-    """Renvoie le temps système actuel"""
-    return time.time()
-
-def elapsed():
-    """Renvoie le temps écoulé depuis le dernier changement d’état"""
-    return now() - state_started_at
-
-def set_state(new_state):
-    """Met à jour l’état du feu"""
-    global state, state_started_at
-    state = new_state
-    state_started_at = now()
-
-def update_logic(vehicle_count):
-    """
-    Met à jour l’état du contrôleur selon la demande lissée et les contraintes temporelles.
-    Renvoie (couleur_du_feu, durée_suggérée_en_secondes)
-    """
-    global ema
-    # 1) Appliquer le lissage EMA sur le nombre de véhicules détectés
-    ema = vehicle_count if ema is None else (ALPHA * vehicle_count + (1 - ALPHA) * ema)
-    history.append(ema)
-    t = elapsed()
-
-    # 2) Logique de transition entre les phases
-    if state == "GREEN":
-        # Respecter la durée minimale de la phase verte
-        if t < MIN_GREEN:
-            return "green", 1
-        # Si la demande chute ou que la durée max est atteinte -> passer au jaune
-        if ema < LOW or t >= MAX_GREEN:
-            set_state("YELLOW")
-            return "yellow", YELLOW_TIME
-        # Sinon, rester en vert
-        return "green", 1
-
-    if state == "YELLOW":
-        # Rester en jaune pour une durée fixe avant de passer au rouge
-        if t >= YELLOW_TIME:
-            set_state("RED")
-            return "red", 1
-        # Maintenir le jaune jusqu’à la fin du délai
-        return "yellow", max(1, int(YELLOW_TIME - t))
-
-    # État = ROUGE
-    if t < MIN_RED:
-        return "red", 1
-    # Si la demande est suffisante, passer au vert
-    if ema >= HIGH:
-        set_state("GREEN")
-        return "green", 1
-    # Sinon, rester en rouge
-    return "red", 1
+# --- Paramètres du flux SSE ---
+SSE_KEEPALIVE = 15       # Commentaire envoyé toutes les N secondes pour garder la connexion ouverte
+SSE_QUEUE_SIZE = 64      # Événements en attente max par abonné (un abonné trop lent perd les plus anciens)
+
+# --- Paramètres d’instrumentation ---
+METRICS_FILE = "metrics_http.json"   # Instantané JSON périodique (None = désactivé)
+METRICS_INTERVAL = 5                 # Période d’écriture de l’instantané (secondes)
+LOG_SAMPLE_EVERY = 100               # Un message journalisé sur N
+
+# --- Contrôleur de feux (logique commune : voir controller.py) ---
+controller = TrafficController()
+
+# --- Métriques et journal ---
+metrics = ServerMetrics("http")
+log = SampledLogger("sr04.server_http", every=LOG_SAMPLE_EVERY)
+
+# --- Abonnés au flux SSE (une file par connexion ouverte) ---
+subscribers = set()
+subscribers_lock = threading.Lock()
+event_ids = itertools.count(1)
+
+
+def state_event(state, since):
+    """Construit l’événement SSE décrivant l’état courant du feu"""
+    data = {"led": state.lower(), "state": state, "since": since,
+            "ema": None if controller.ema is None else round(controller.ema, 2)}
+    return f"id: {next(event_ids)}\nevent: state\ndata: {json.dumps(data)}\n\n"
+
+
+def count_transition(old_state, new_state, at):
+    """Compte et journalise chaque changement d’état"""
+    metrics.inc("state_transitions_total")
+    log.log("transition", old=old_state, new=new_state, ema=round(controller.ema, 2))
+
+
+def broadcast_transition(old_state, new_state, at):
+    """Pousse la transition à tous les abonnés sans jamais bloquer la requête POST"""
+    event = state_event(new_state, at)
+    with subscribers_lock:
+        targets = list(subscribers)
+    for q in targets:
+        try:
+            q.put_nowait(event)
+        except queue.Full:
+            # Abonné trop lent : on jette l’événement le plus ancien
+            try:
+                q.get_nowait()
+                q.put_nowait(event)
+            except (queue.Empty, queue.Full):
+                pass
+
+
+controller.add_listener(count_transition)
+controller.add_listener(broadcast_transition)
 
 @app.route("/traffic", methods=["POST"])
 def traffic_control():
     """
-    Corps de la requête : {"vehicle_count": <int>}
-    Réponse : {"led": "red"|"yellow"|"green", "duration": <int secondes>, "ema": <float>}
+    Corps de la requête : {"vehicle_count": <int>} ou {"op": "sync"}
+    Réponse : {"led": "red"|"yellow"|"green", "duration": <int secondes>, "ema": <float>,
+               "t_recv": <horodatage réception>, "t_send": <horodatage envoi>}
     """
+    t_recv = time.time()
+    t0 = time.perf_counter_ns()
     data = request.get_json(force=True, silent=True) or {}
+    if data.get("op") == "sync":
+        return jsonify({"op": "sync", "seq": data.get("seq"), "t_recv": t_recv, "t_send": time.time()})
     vehicle_count = int(data.get("vehicle_count", 0))
+    t1 = time.perf_counter_ns()
+
+    led, duration = controller.update(vehicle_count)
+    t2 = time.perf_counter_ns()
+    ema, state = controller.ema, controller.state
+
+    metrics.inc("messages_total")
+    metrics.observe("decode", (t1 - t0) / 1e6)
+    metrics.observe("update_logic", (t2 - t1) / 1e6)
+    log.sample("message", count=vehicle_count, ema=round(ema, 2), state=state, led=led, duration=duration)
+
+    response = {"led": led, "duration": int(duration), "ema": round(ema, 2)}
+    # Identifiants renvoyés tels quels (corrélation côté générateur de charge)
+    response.update((k, data[k]) for k in ("cam_id", "seq") if k in data)
+    response.update(t_recv=t_recv, t_send=time.time())
+    reply = jsonify(response)
+    # Octets échangés par message (corps JSON, sans en-têtes HTTP) : vues de comparaison
+    metrics.inc("bytes_received_total", len(request.get_data()))
+    metrics.inc("bytes_sent_total", reply.content_length or 0)
+    return reply
+
+@app.route("/events", methods=["GET"])
+def traffic_events():
+    """
+    Flux text/event-stream : un événement "state" à la connexion puis à chaque transition.
+    data : {"led": "red"|"yellow"|"green", "state": <str>, "since": <timestamp>, "ema": <float>}
+    """
+    q = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+    with subscribers_lock:
+        subscribers.add(q)
+        metrics.set_gauge("connected_clients", len(subscribers))
+
+    def stream():
+        try:
+            yield "retry: 1000\n" + state_event(controller.state, controller.state_started_at)
+            while True:
+                try:
+                    yield q.get(timeout=SSE_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            # Déconnexion du client : on retire sa file
+            with subscribers_lock:
+                subscribers.discard(q)
+                metrics.set_gauge("connected_clients", len(subscribers))
 
-    led, duration = update_logic(vehicle_count)
-    print(f"count={vehicle_count:2d}  ema={ema:.2f}  state={state:<6}  -> led={led}, dur={duration}s")
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream(), mimetype="text/event-stream", headers=headers)
 
-    return jsonify({"led": led, "duration": int(duration), "ema": round(ema, 2)})
+@app.route("/metrics", methods=["GET"])
+def traffic_metrics():
+    """Point de collecte Prometheus (compteurs, jauges, histogrammes en ms)"""
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
-    app.run(host="127.0.0.1", port=5000)
+    if METRICS_FILE:
+        metrics.start_snapshot_writer(METRICS_FILE, METRICS_INTERVAL)
+    # threaded=True : chaque abonné SSE occupe un thread sans bloquer les POST
+    app.run(host="127.0.0.1", port=5000, threaded=True)
@@ -5,11 +5,15 @@
 #   Contrôleur de feux de circulation basé sur MQTT
 #   - S’abonne au topic "traffic/vehicle_count"
 #   - Publie sur le topic "traffic/led" la couleur du feu
+#   - Métriques (instantané JSON périodique) + journal structuré échantillonné
+#   - Horodatage des réponses (t_recv / t_send) et messages {"op": "sync"} (décalage d’horloge)
 # =========================================================
 
-import time
 import json
+import time
 import paho.mqtt.client as mqtt
+from controller import TrafficController
+from metrics import ServerMetrics, SampledLogger
 
 # --- Paramètres du serveur MQTT ---
 BROKER = "localhost"
@@ -17,56 +21,26 @@ PORT = 1883
 TOPIC_COUNT = "traffic/vehicle_count"
 TOPIC_LED = "traffic/led"
 
-# --- Paramètres logiques du feu de circulation ---
-LOW = 3
-HIGH = 6
-ALPHA = 0.3
-MIN_GREEN = 8
-MAX_GREEN = 20
-MIN_RED = 5
-YELLOW_TIME = 2
+# --- Paramètres d’instrumentation ---
+METRICS_FILE = "metrics_mqtt.json"   # Instantané JSON périodique (None = désactivé)
+METRICS_INTERVAL = 5                 # Période d’écriture de l’instantané (secondes)
+LOG_SAMPLE_EVERY = 100               # Un message journalisé sur N
 
-# --- État du contrôleur ---
-state = "RED"
-state_started_at = time.time()
-ema = None
+# --- Contrôleur de feux (logique commune : voir controller.py) ---
+controller = TrafficController()
 
-def elapsed():
-    """Renvoie le temps écoulé depuis le dernier changement d’état"""
-    return time.time() - state_started_at
+# --- Métriques et journal ---
+metrics = ServerMetrics("mqtt")
+log = SampledLogger("sr04.server_mqtt", every=LOG_SAMPLE_EVERY)
 
-def set_state(new_state):
-    """Met à jour l’état actuel du feu"""
-    global state, state_started_at
-    state = new_state
-    state_started_at = time.time()
 
-def update_logic(vehicle_count):
-    """Calcule la logique du feu à partir du nombre de véhicules détectés"""
-    global ema, state
-    ema = vehicle_count if ema is None else (ALPHA * vehicle_count + (1 - ALPHA) * ema)
-    t = elapsed()
+def on_transition(old_state, new_state, at):
+    """Compte et journalise chaque changement d’état"""
+    metrics.inc("state_transitions_total")
+    log.log("transition", old=old_state, new=new_state, ema=round(controller.ema, 2))
 
-    if state == "GREEN":
-        if t < MIN_GREEN:
-            return "green"
-        if ema < LOW or t >= MAX_GREEN:
-            set_state("YELLOW")
-            return "yellow"
-        return "green"
 
-    if state == "YELLOW":
-        if t >= YELLOW_TIME:
-            set_state("RED")
-            return "red"
-        return "yellow"
-
-    if t < MIN_RED:
-        return "red"
-    if ema >= HIGH:
-        set_state("GREEN")
-        return "green"
-    return "red"
+controller.add_listener(on_transition)
 
 # --- Fonctions de rappel MQTT ---
 def on_connect(client, userdata, flags, rc):
@@ -77,14 +51,35 @@ def on_connect(client, userdata, flags, rc):
 def on_message(client, userdata, msg):
     """Appelée lorsqu’un message est reçu sur le topic 'traffic/vehicle_count'"""
     try:
+        t_recv = time.time()
+        t0 = time.perf_counter_ns()
         payload = json.loads(msg.payload.decode())
+        if payload.get("op") == "sync":
+            client.publish(payload.get("reply_to", TOPIC_LED),
+                           json.dumps({"op": "sync", "seq": payload.get("seq"),
+                                       "t_recv": t_recv, "t_send": time.time()}))
+            return
         vehicle_count = int(payload.get("vehicle_count", 0))
-        led = update_logic(vehicle_count)
+        t1 = time.perf_counter_ns()
+        led, _ = controller.update(vehicle_count)
+        t2 = time.perf_counter_ns()
         response = {"led": led}
-        client.publish(TOPIC_LED, json.dumps(response))
-        print(f"count={vehicle_count:2d}  ema={ema:.2f}  state={state:<6} -> led={led}")
+        # Identifiants renvoyés tels quels ; "reply_to" = topic de réponse propre à l’émetteur
+        response.update((k, payload[k]) for k in ("cam_id", "seq") if k in payload)
+        response.update(t_recv=t_recv, t_send=time.time())
+        reply = json.dumps(response).encode()
+        client.publish(payload.get("reply_to", TOPIC_LED), reply)
+
+        metrics.inc("messages_total")
+        metrics.inc("bytes_received_total", len(msg.payload))
+        metrics.inc("bytes_sent_total", len(reply))
+        metrics.observe("decode", (t1 - t0) / 1e6)
+        metrics.observe("update_logic", (t2 - t1) / 1e6)
+        log.sample("message", count=vehicle_count, ema=round(controller.ema, 2),
+                   state=controller.state, led=led)
     except Exception as e:
-        print("Erreur lors du traitement du message :", e)
+        metrics.inc("invalid_messages_total")
+        log.log("error", error=str(e))
 
 # --- Point d’entrée principal ---
 client = mqtt.Client()
@@ -92,5 +87,7 @@ client.on_connect = on_connect
 client.on_message = on_message
 
 print("Serveur de trafic MQTT en cours de démarrage...")
+if METRICS_FILE:
+    metrics.start_snapshot_writer(METRICS_FILE, METRICS_INTERVAL)
 client.connect(BROKER, PORT, 60)
 client.loop_forever()
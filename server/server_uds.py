@@ -0,0 +1,123 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : server/server_uds.py
+# Description :
+#   Contrôleur de feux de circulation local (client et serveur sur la même machine)
+#   - Socket de domaine Unix : ni TCP, ni Flask, ni broker
+#   - Repli automatique sur TCP local si AF_UNIX est indisponible (Windows)
+#   - Messages JSON délimités par des retours à la ligne
+#   - Même logique de contrôle que les autres serveurs (controller.py)
+#   - Métriques (instantané JSON périodique) + journal structuré échantillonné
+#   - Horodatage des réponses (t_recv / t_send) et messages {"op": "sync"} (décalage d’horloge)
+# =========================================================
+
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import time
+from controller import TrafficController
+from metrics import ServerMetrics, SampledLogger
+
+# --- Paramètres du serveur ---
+SOCKET_PATH = os.path.join(tempfile.gettempdir(), "sr04_traffic.sock")
+FALLBACK_HOST = "127.0.0.1"   # Utilisé uniquement si AF_UNIX n’existe pas
+FALLBACK_PORT = 5002
+
+# --- Paramètres d’instrumentation ---
+METRICS_FILE = "metrics_uds.json"    # Instantané JSON périodique (None = désactivé)
+METRICS_INTERVAL = 5                 # Période d’écriture de l’instantané (secondes)
+LOG_SAMPLE_EVERY = 100               # Un message journalisé sur N
+
+# --- Contrôleur de feux (logique commune : voir controller.py) ---
+controller = TrafficController()
+
+# --- Métriques et journal ---
+metrics = ServerMetrics("uds")
+log = SampledLogger("sr04.server_uds", every=LOG_SAMPLE_EVERY)
+
+
+def on_transition(old_state, new_state, at):
+    """Compte et journalise chaque changement d’état"""
+    metrics.inc("state_transitions_total")
+    log.log("transition", old=old_state, new=new_state, ema=round(controller.ema, 2))
+
+
+controller.add_listener(on_transition)
+
+
+# --- Gestion des connexions locales ---
+async def handle_client(reader, writer):
+    """Gère la connexion d’un client local (une ligne JSON = un message)"""
+    metrics.add_gauge("connected_clients", 1)
+    log.log("connect")
+    sock = writer.get_extra_info("socket")
+    if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                t_recv = time.time()
+                t0 = time.perf_counter_ns()
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError("objet JSON attendu")
+                if data.get("op") == "sync":
+                    writer.write(json.dumps({"op": "sync", "seq": data.get("seq"), "t_recv": t_recv,
+                                             "t_send": time.time()}).encode() + b"\n")
+                    await writer.drain()
+                    continue
+                vehicle_count = int(data.get("vehicle_count", 0))
+                t1 = time.perf_counter_ns()
+                led, duration = controller.update(vehicle_count)
+                t2 = time.perf_counter_ns()
+                response = {"led": led, "duration": int(duration)}
+                # Identifiants renvoyés tels quels (corrélation côté générateur de charge)
+                response.update((k, data[k]) for k in ("cam_id", "seq") if k in data)
+                response.update(t_recv=t_recv, t_send=time.time())
+                reply = json.dumps(response).encode() + b"\n"
+                writer.write(reply)
+                await writer.drain()
+
+                metrics.inc("messages_total")
+                metrics.inc("bytes_received_total", len(line))
+                metrics.inc("bytes_sent_total", len(reply))
+                metrics.observe("decode", (t1 - t0) / 1e6)
+                metrics.observe("update_logic", (t2 - t1) / 1e6)
+                log.sample("message", count=vehicle_count, ema=round(controller.ema, 2),
+                           state=controller.state, led=led)
+            except (ValueError, TypeError) as e:  # JSONDecodeError est une ValueError
+                metrics.inc("invalid_messages_total")
+                log.log("invalid_message", raw=line[:200].decode(errors="replace"))
+                # Réponse d’erreur : le client ne reste pas bloqué jusqu’à son délai d’attente
+                writer.write(json.dumps({"error": f"message invalide : {e}"}).encode() + b"\n")
+                await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+        metrics.add_gauge("connected_clients", -1)
+        log.log("disconnect")
+
+
+# --- Point d’entrée principal ---
+async def main():
+    if hasattr(socket, "AF_UNIX"):
+        if os.path.exists(SOCKET_PATH):
+            os.remove(SOCKET_PATH)  # Socket orpheline d’une exécution précédente
+        server = await asyncio.start_unix_server(handle_client, path=SOCKET_PATH)
+        print(f"🚦 Serveur local en cours d’exécution sur unix://{SOCKET_PATH}")
+    else:
+        server = await asyncio.start_server(handle_client, FALLBACK_HOST, FALLBACK_PORT)
+        print(f"🚦 Serveur local (repli TCP) sur tcp://{FALLBACK_HOST}:{FALLBACK_PORT}")
+    if METRICS_FILE:
+        metrics.start_snapshot_writer(METRICS_FILE, METRICS_INTERVAL)
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,95 +6,91 @@
 #   - Reçoit le nombre de véhicules depuis les clients
 #   - Calcule la couleur du feu (rouge/jaune/vert) en temps réel
 #   - Envoie l’état du feu à chaque client connecté
+#   - Métriques (instantané JSON périodique) + journal structuré échantillonné
+#   - Horodatage des réponses (t_recv / t_send) et messages {"op": "sync"} (décalage d’horloge)
 # =========================================================
 
 import asyncio
 import websockets
 import json
 import time
+from controller import TrafficController
+from metrics import ServerMetrics, SampledLogger
 
 # --- Paramètres du serveur ---
 HOST = "127.0.0.1"
 PORT = 5001
 
-# --- Paramètres logiques du feu de circulation ---
-LOW = 3
-HIGH = 6
-ALPHA = 0.3
-MIN_GREEN = 8
-MAX_GREEN = 20
-MIN_RED = 5
-YELLOW_TIME = 2
-
-# --- État du contrôleur ---
-state = "RED"        # "RED" | "YELLOW" | "GREEN"
-state_started_at = time.time()
-ema = None           # moyenne mobile exponentielle du nombre de véhicules
-
-# --- Fonctions utilitaires ---
-def elapsed():
-    """Renvoie le temps écoulé depuis le dernier changement d’état"""
-    return time.time() - state_started_at
-
-def set_state(new_state):
-    """Change l’état du feu de circulation"""
-    global state, state_started_at
-    state = new_state
-    state_started_at = time.time()
-
-def update_logic(vehicle_count: int) -> str:
-    """Met à jour la logique du feu et renvoie la couleur actuelle"""
-    global ema
-    global state
-
-    ema = vehicle_count if ema is None else (ALPHA * vehicle_count + (1 - ALPHA) * ema)
-    t = elapsed()
-
-    if state == "GREEN":
-        if t < MIN_GREEN:
-            return "green"
-        if ema < LOW or t >= MAX_GREEN:
-            set_state("YELLOW")
-            return "yellow"
-        return "green"
-
-    if state == "YELLOW":
-        if t >= YELLOW_TIME:
-            set_state("RED")
-            return "red"
-        return "yellow"
-
-    # état == "RED"
-    if t < MIN_RED:
-        return "red"
-    if ema >= HIGH:
-        set_state("GREEN")
-        return "green"
-    return "red"
+# --- Paramètres d’instrumentation ---
+METRICS_FILE = "metrics_ws.json"     # Instantané JSON périodique (None = désactivé)
+METRICS_INTERVAL = 5                 # Période d’écriture de l’instantané (secondes)
+LOG_SAMPLE_EVERY = 100               # Un message journalisé sur N
+
+# --- Contrôleur de feux (logique commune : voir controller.py) ---
+controller = TrafficController()
+
+# --- Métriques et journal ---
+metrics = ServerMetrics("ws")
+log = SampledLogger("sr04.server_ws", every=LOG_SAMPLE_EVERY)
+
+
+def on_transition(old_state, new_state, at):
+    """Compte et journalise chaque changement d’état"""
+    metrics.inc("state_transitions_total")
+    log.log("transition", old=old_state, new=new_state, ema=round(controller.ema, 2))
+
+
+controller.add_listener(on_transition)
 
 
 # --- Gestion des connexions WebSocket ---
 async def handle_client(websocket):
     """Gère la connexion d’un client"""
-    print("🔗 Client connecté.")
+    metrics.add_gauge("connected_clients", 1)
+    log.log("connect")
     try:
         async for message in websocket:
             try:
+                t_recv = time.time()
+                t0 = time.perf_counter_ns()
                 data = json.loads(message)
+                if data.get("op") == "sync":
+                    await websocket.send(json.dumps({"op": "sync", "seq": data.get("seq"),
+                                                     "t_recv": t_recv, "t_send": time.time()}))
+                    continue
                 vehicle_count = int(data.get("vehicle_count", 0))
-                led = update_logic(vehicle_count)
+                t1 = time.perf_counter_ns()
+                led, _ = controller.update(vehicle_count)
+                t2 = time.perf_counter_ns()
                 response = {"led": led}
-                await websocket.send(json.dumps(response))
-                print(f"count={vehicle_count:2d}  ema={ema:.2f}  state={state:<6}  -> led={led}")
+                # Identifiants renvoyés tels quels (corrélation côté générateur de charge)
+                response.update((k, data[k]) for k in ("cam_id", "seq") if k in data)
+                response.update(t_recv=t_recv, t_send=time.time())
+                reply = json.dumps(response)
+                await websocket.send(reply)
+
+                metrics.inc("messages_total")
+                metrics.inc("bytes_received_total", len(message.encode() if isinstance(message, str) else message))
+                metrics.inc("bytes_sent_total", len(reply.encode()))
+                metrics.observe("decode", (t1 - t0) / 1e6)
+                metrics.observe("update_logic", (t2 - t1) / 1e6)
+                log.sample("message", count=vehicle_count, ema=round(controller.ema, 2),
+                           state=controller.state, led=led)
             except json.JSONDecodeError:
-                print("⚠️ Message reçu invalide :", message)
+                metrics.inc("invalid_messages_total")
+                log.log("invalid_message", raw=str(message)[:200])
     except websockets.exceptions.ConnectionClosed:
-        print("Client déconnecté.")
+        pass
+    finally:
+        metrics.add_gauge("connected_clients", -1)
+        log.log("disconnect")
 
 
 # --- Point d’entrée principal ---
 async def main():
     print(f"🚦 Serveur WebSocket en cours d’exécution sur ws://{HOST}:{PORT}")
+    if METRICS_FILE:
+        metrics.start_snapshot_writer(METRICS_FILE, METRICS_INTERVAL)
     async with websockets.serve(handle_client, HOST, PORT):
         await asyncio.Future()  # exécution continue
 
@@ -0,0 +1,234 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : server/simulator.py
+# Description :
+#   Rejeu accéléré et déterministe de traces de trafic dans le contrôleur
+#   - Horloge virtuelle : TrafficController lit le temps de la trace, pas time.time()
+#   - Une journée de trafic rejouée en quelques secondes (aucune attente réelle)
+#   - Traces : fichiers de latence des clients (colonnes timestamp + vehicle_count)
+#     ou toute trace CSV horodatée / indexée par image
+#   - Sortie : chronologie des phases (CSV) + statistiques (utilisation du vert, attente)
+#
+# Exemple :
+#   python server/simulator.py latency_ws.csv --timeline phases.csv
+#   python server/simulator.py trace.csv --repeat 1000 --min-green 6 --high 5
+# =========================================================
+
+import argparse
+import csv
+import json
+import time
+import controller as ctl
+from controller import TrafficController
+
+
+# =========================================================
+# 🔹 Horloge virtuelle
+# =========================================================
+class VirtualClock:
+    """Horloge avancée à la main : remplace time.time dans TrafficController."""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+# =========================================================
+# 🔹 Traces
+# =========================================================
+def load_trace(path, rate=10.0):
+    """
+    Lit une trace CSV et renvoie (instants, comptages).
+    - colonne 'timestamp' (secondes) si présente, sinon 'frame' / index divisé par `rate`
+    - colonne 'vehicle_count' (ou 'count')
+    """
+    times, counts = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames or []
+        count_col = "vehicle_count" if "vehicle_count" in fields else "count"
+        if count_col not in fields:
+            raise ValueError(f"{path} : colonne 'vehicle_count' absente")
+        time_col = "timestamp" if "timestamp" in fields else ("frame" if "frame" in fields else None)
+        for i, row in enumerate(reader):
+            try:
+                count = int(float(row[count_col]))
+                if time_col == "timestamp":
+                    t = float(row[time_col])
+                elif time_col == "frame":
+                    t = int(row[time_col]) / rate
+                else:
+                    t = i / rate
+            except (TypeError, ValueError):
+                continue  # ligne incomplète (écriture interrompue)
+            times.append(t)
+            counts.append(count)
+
+    # Les journaux concurrents peuvent être légèrement désordonnés
+    if any(b < a for a, b in zip(times, times[1:])):
+        order = sorted(range(len(times)), key=times.__getitem__)
+        times = [times[i] for i in order]
+        counts = [counts[i] for i in order]
+    return times, counts
+
+
+def repeat_trace(times, counts, repeat):
+    """Concatène la trace `repeat` fois en décalant les instants (journées successives)."""
+    if repeat <= 1 or not times:
+        return times, counts
+    step = (times[-1] - times[0]) + (times[1] - times[0] if len(times) > 1 else 1.0)
+    all_times, all_counts = [], []
+    for k in range(repeat):
+        offset = k * step
+        all_times.extend(t + offset for t in times)
+        all_counts.extend(counts)
+    return all_times, all_counts
+
+
+# =========================================================
+# 🔹 Simulation
+# =========================================================
+def simulate(times, counts, params=None):
+    """
+    Rejoue la trace dans un TrafficController piloté par une horloge virtuelle.
+    :param params: arguments de TrafficController (low, high, alpha, min_green, ...)
+    :return: (chronologie [(début, fin, état)], couleurs renvoyées à chaque message)
+    """
+    if not times:
+        return [], []
+    clock = VirtualClock(times[0])
+    controller = TrafficController(clock=clock, **(params or {}))
+    changes = [(times[0], controller.state)]
+    controller.add_listener(lambda old, new, at: changes.append((at, new)))
+
+    leds = []
+    update = controller.update
+    for t, count in zip(times, counts):
+        clock.now = t
+        leds.append(update(count)[0])
+
+    timeline = []
+    for (start, state), (end, _) in zip(changes, changes[1:] + [(times[-1], None)]):
+        timeline.append((start, end, state))
+    return timeline, leds
+
+
+def summarize(timeline, times, counts, leds):
+    """
+    Statistiques de la simulation :
+    - green_share : part du temps passée au vert
+    - green_utilisation : part du temps vert pendant laquelle des véhicules sont présents
+    - avg_wait_s : attente moyenne jusqu’au prochain vert, pondérée par le nombre de
+      véhicules observés hors vert (approximation à partir des comptages)
+    """
+    total = times[-1] - times[0] if times else 0.0
+    durations = {"RED": 0.0, "YELLOW": 0.0, "GREEN": 0.0}
+    cycles = 0
+    for start, end, state in timeline:
+        durations[state] += end - start
+        if state == "GREEN":
+            cycles += 1
+
+    # Temps vert « occupé » : intervalle jusqu’au message suivant si des véhicules sont là
+    green_busy = 0.0
+    for i in range(len(times) - 1):
+        if leds[i] == "green" and counts[i] > 0:
+            green_busy += times[i + 1] - times[i]
+
+    # Attente : distance au prochain début de vert pour chaque observation hors vert
+    green_starts = [start for start, _, state in timeline if state == "GREEN"]
+    waited = 0.0
+    vehicles = 0
+    j = 0
+    for t, count, led in zip(times, counts, leds):
+        if led == "green" or count <= 0:
+            continue
+        while j < len(green_starts) and green_starts[j] < t:
+            j += 1
+        if j == len(green_starts):
+            break  # plus aucun vert dans la trace : attente inconnue
+        waited += (green_starts[j] - t) * count
+        vehicles += count
+
+    return {
+        "messages": len(times),
+        "simulated_s": round(total, 1),
+        "cycles": cycles,
+        "green_share": round(durations["GREEN"] / total, 4) if total else 0.0,
+        "yellow_share": round(durations["YELLOW"] / total, 4) if total else 0.0,
+        "red_share": round(durations["RED"] / total, 4) if total else 0.0,
+        "green_utilisation": round(green_busy / durations["GREEN"], 4) if durations["GREEN"] else 0.0,
+        "avg_wait_s": round(waited / vehicles, 2) if vehicles else 0.0,
+    }
+
+
+def write_timeline(path, timeline):
+    """Écrit la chronologie des phases (une ligne par phase)."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["start", "end", "state", "duration_s"])
+        for start, end, state in timeline:
+            writer.writerow([round(start, 3), round(end, 3), state, round(end - start, 3)])
+
+
+# =========================================================
+# 🔹 Point d’entrée
+# =========================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rejeu accéléré d’une trace dans le contrôleur de feux")
+    parser.add_argument("trace", help="trace CSV (timestamp/frame + vehicle_count)")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="images/s si la trace n’est pas horodatée")
+    parser.add_argument("--repeat", type=int, default=1, help="rejouer la trace N fois à la suite")
+    parser.add_argument("--timeline", help="fichier CSV de sortie pour la chronologie des phases")
+    parser.add_argument("--json", action="store_true", help="statistiques au format JSON")
+    parser.add_argument("--low", type=float, default=ctl.LOW)
+    parser.add_argument("--high", type=float, default=ctl.HIGH)
+    parser.add_argument("--alpha", type=float, default=ctl.ALPHA)
+    parser.add_argument("--min-green", type=float, default=ctl.MIN_GREEN)
+    parser.add_argument("--max-green", type=float, default=ctl.MAX_GREEN)
+    parser.add_argument("--min-red", type=float, default=ctl.MIN_RED)
+    parser.add_argument("--yellow-time", type=float, default=ctl.YELLOW_TIME)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        times, counts = load_trace(args.trace, rate=args.rate)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    times, counts = repeat_trace(times, counts, args.repeat)
+    if len(times) < 2:
+        raise SystemExit(f"{args.trace} : trace trop courte")
+
+    params = {"low": args.low, "high": args.high, "alpha": args.alpha,
+              "min_green": args.min_green, "max_green": args.max_green,
+              "min_red": args.min_red, "yellow_time": args.yellow_time}
+    t0 = time.perf_counter()
+    timeline, leds = simulate(times, counts, params)
+    wall = time.perf_counter() - t0
+    stats = summarize(timeline, times, counts, leds)
+    stats["wall_s"] = round(wall, 3)
+    stats["speedup"] = round(stats["simulated_s"] / wall, 1) if wall > 0 else None
+
+    if args.timeline:
+        write_timeline(args.timeline, timeline)
+    if args.json:
+        print(json.dumps(stats, indent=2))
+    else:
+        print(f"🚦 {stats['messages']} messages, {stats['simulated_s']} s simulées "
+              f"en {stats['wall_s']} s (×{stats['speedup']})")
+        print(f"   cycles verts       : {stats['cycles']}")
+        print(f"   part vert/jaune/rouge : {stats['green_share']:.1%} / "
+              f"{stats['yellow_share']:.1%} / {stats['red_share']:.1%}")
+        print(f"   utilisation du vert : {stats['green_utilisation']:.1%}")
+        print(f"   attente moyenne     : {stats['avg_wait_s']} s")
+        if args.timeline:
+            print(f"   chronologie écrite dans {args.timeline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : server/tuner.py
+# Description :
+#   Réglage hors ligne des paramètres du contrôleur (LOW / HIGH / ALPHA / MIN_GREEN ...)
+#   - Évalue une grille de configurations sur des traces enregistrées
+#   - Vectorisé avec numpy : toutes les configurations avancent ensemble, pas à pas
+#   - Répartition de la grille sur plusieurs processus (un paquet par cœur)
+#   - Mêmes statistiques que simulator.py, classement selon un objectif au choix
+#
+# Exemple :
+#   python server/tuner.py latency_ws.csv --low 2:5:1 --high 4:9:1 --alpha 0.1,0.3,0.5 \
+#          --min-green 5:12:1 --objective avg_wait_s --top 10
+# =========================================================
+
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import controller as ctl
+from simulator import load_trace, repeat_trace
+
+# --- Paramètres réglables (ordre des colonnes de sortie) ---
+PARAMS = ("low", "high", "alpha", "min_green", "max_green", "min_red", "yellow_time")
+DEFAULTS = {"low": ctl.LOW, "high": ctl.HIGH, "alpha": ctl.ALPHA, "min_green": ctl.MIN_GREEN,
+            "max_green": ctl.MAX_GREEN, "min_red": ctl.MIN_RED, "yellow_time": ctl.YELLOW_TIME}
+
+# --- Objectifs disponibles : (statistique, True si on maximise) ---
+OBJECTIVES = {
+    "avg_wait_s": ("avg_wait_s", False),
+    "green_utilisation": ("green_utilisation", True),
+    "green_share": ("green_share", True),
+    "cycles": ("cycles", False),
+}
+
+RED, GREEN, YELLOW = 0, 1, 2
+
+
+# =========================================================
+# 🔹 Contrôleur vectorisé
+# =========================================================
+def evaluate(times, counts, grid):
+    """
+    Rejoue la trace pour toutes les configurations à la fois.
+    Reproduit exactement TrafficController.update (voir controller.py).
+    :param times, counts: tableaux numpy de la trace
+    :param grid: dict {paramètre: tableau (K,)}
+    :return: dict {statistique: tableau (K,)} (mêmes définitions que simulator.summarize)
+    """
+    k = len(grid["low"])
+    low, high, alpha = grid["low"], grid["high"], grid["alpha"]
+    min_green, max_green = grid["min_green"], grid["max_green"]
+    min_red, yellow_time = grid["min_red"], grid["yellow_time"]
+    one_minus_alpha = 1.0 - alpha
+
+    state = np.full(k, RED, dtype=np.int8)
+    started = np.full(k, times[0])
+    ema = np.zeros(k)
+    durations = np.zeros((3, k))
+    cycles = np.zeros(k, dtype=np.int64)
+    green_busy = np.zeros(k)
+    pending_vehicles = np.zeros(k)      # véhicules observés hors vert depuis le dernier vert
+    pending_weighted = np.zeros(k)      # somme de (comptage × instant) correspondante
+    waited = np.zeros(k)
+    vehicles = np.zeros(k)
+
+    dts = np.diff(times, append=times[-1])
+    for i in range(len(times)):
+        t = times[i]
+        c = counts[i]
+        ema = np.full(k, float(c)) if i == 0 else alpha * c + one_minus_alpha * ema
+        elapsed = t - started
+        is_green = state == GREEN
+        is_yellow = state == YELLOW
+        is_red = state == RED
+
+        to_yellow = is_green & (elapsed >= min_green) & ((ema < low) | (elapsed >= max_green))
+        to_red = is_yellow & (elapsed >= yellow_time)
+        to_green = is_red & (elapsed >= min_red) & (ema >= high)
+
+        changed = to_yellow | to_red | to_green
+        if changed.any():
+            state = np.where(to_yellow, YELLOW, np.where(to_red, RED, np.where(to_green, GREEN, state)))
+            started = np.where(changed, t, started)
+            if to_green.any():
+                # Fin d’attente pour les véhicules observés depuis le vert précédent
+                waited += np.where(to_green, pending_vehicles * t - pending_weighted, 0.0)
+                vehicles += np.where(to_green, pending_vehicles, 0.0)
+                pending_vehicles[to_green] = 0.0
+                pending_weighted[to_green] = 0.0
+                cycles += to_green
+
+        # La couleur renvoyée est toujours celle du nouvel état
+        is_green = state == GREEN
+        dt = dts[i]
+        if dt:
+            durations[RED] += (state == RED) * dt
+            durations[GREEN] += is_green * dt
+            durations[YELLOW] += (state == YELLOW) * dt
+        if c > 0:
+            if dt:
+                green_busy += is_green * dt
+            not_green = ~is_green
+            pending_vehicles += not_green * c
+            pending_weighted += not_green * (c * t)
+
+    total = times[-1] - times[0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "cycles": cycles,
+            "green_share": durations[GREEN] / total if total else np.zeros(k),
+            "yellow_share": durations[YELLOW] / total if total else np.zeros(k),
+            "red_share": durations[RED] / total if total else np.zeros(k),
+            "green_utilisation": np.where(durations[GREEN] > 0, green_busy / durations[GREEN], 0.0),
+            "avg_wait_s": np.where(vehicles > 0, waited / vehicles, 0.0),
+        }
+
+
+def _evaluate_chunk(args):
+    """Point d’entrée des processus : évalue un paquet de configurations."""
+    times, counts, grid = args
+    return evaluate(times, counts, grid)
+
+
+# =========================================================
+# 🔹 Grille de paramètres
+# =========================================================
+def parse_values(spec):
+    """'2,4,6' -> [2, 4, 6] ; '2:6:2' -> [2, 4, 6] (borne haute incluse)"""
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        n = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 6) for i in range(n)]
+    return [float(x) for x in spec.split(",")]
+
+
+def build_grid(values):
+    """Produit cartésien des valeurs, sans les combinaisons incohérentes."""
+    combos = [c for c in itertools.product(*(values[p] for p in PARAMS))
+              if c[0] <= c[1] and c[3] <= c[4]]  # LOW <= HIGH et MIN_GREEN <= MAX_GREEN
+    array = np.array(combos, dtype=float).reshape(-1, len(PARAMS))
+    return {p: array[:, j] for j, p in enumerate(PARAMS)}
+
+
+def run_grid(times, counts, grid, workers):
+    """Découpe la grille en paquets et les évalue en parallèle."""
+    k = len(grid["low"])
+    workers = max(1, min(workers, k))
+    if workers == 1:
+        return evaluate(times, counts, grid)
+    bounds = np.linspace(0, k, workers + 1).astype(int)
+    chunks = [(times, counts, {p: v[a:b] for p, v in grid.items()})
+              for a, b in zip(bounds, bounds[1:]) if b > a]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(_evaluate_chunk, chunks))
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+
+# =========================================================
+# 🔹 Point d’entrée
+# =========================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Recherche par grille des paramètres du contrôleur")
+    parser.add_argument("traces", nargs="+", help="traces CSV (timestamp/frame + vehicle_count)")
+    parser.add_argument("--rate", type=float, default=10.0, help="images/s si la trace n’est pas horodatée")
+    parser.add_argument("--repeat", type=int, default=1, help="rejouer chaque trace N fois")
+    for p in PARAMS:
+        parser.add_argument(f"--{p.replace('_', '-')}", default=str(DEFAULTS[p]),
+                            help=f"valeurs de {p.upper()} : liste 'a,b,c' ou plage 'début:fin:pas'")
+    parser.add_argument("--objective", choices=sorted(OBJECTIVES), default="avg_wait_s")
+    parser.add_argument("--top", type=int, default=10, help="nombre de configurations affichées")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", help="fichier CSV avec toutes les configurations classées")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    values = {p: parse_values(getattr(args, p)) for p in PARAMS}
+    grid = build_grid(values)
+    k = len(grid["low"])
+    if k == 0:
+        raise SystemExit("❌ Grille vide (vérifier LOW <= HIGH et MIN_GREEN <= MAX_GREEN)")
+
+    stat, maximize = OBJECTIVES[args.objective]
+    t0 = time.perf_counter()
+    per_trace = []
+    simulated = 0.0
+    for path in args.traces:
+        try:
+            times, counts = load_trace(path, rate=args.rate)
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+        times, counts = repeat_trace(times, counts, args.repeat)
+        if len(times) < 2:
+            continue
+        simulated += times[-1] - times[0]
+        per_trace.append(run_grid(np.asarray(times, dtype=float), np.asarray(counts, dtype=float),
+                                  grid, args.workers))
+    if not per_trace:
+        raise SystemExit("❌ Aucune trace exploitable")
+    wall = time.perf_counter() - t0
+
+    # Plusieurs traces : moyenne des statistiques
+    results = {name: np.mean([r[name] for r in per_trace], axis=0) for name in per_trace[0]}
+    order = np.argsort(-results[stat] if maximize else results[stat], kind="stable")
+
+    print(f"🔧 {k} configurations × {simulated / 3600:.2f} h de trace en {wall:.2f} s "
+          f"(objectif : {'max' if maximize else 'min'} {stat})")
+    header = [p.upper() for p in PARAMS] + ["attente(s)", "util.vert", "part vert", "cycles"]
+    print("  ".join(f"{h:>10}" for h in header))
+    for idx in order[:args.top]:
+        row = [f"{grid[p][idx]:>10g}" for p in PARAMS]
+        row += [f"{results['avg_wait_s'][idx]:>10.2f}", f"{results['green_utilisation'][idx]:>10.1%}",
+                f"{results['green_share'][idx]:>10.1%}", f"{results['cycles'][idx]:>10.0f}"]
+        print("  ".join(row))
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            names = list(results)
+            writer.writerow(["rank"] + list(PARAMS) + names)
+            for rank, idx in enumerate(order, start=1):
+                writer.writerow([rank] + [grid[p][idx] for p in PARAMS]
+                                + [round(float(results[n][idx]), 4) for n in names])
+        print(f"✅ Classement complet écrit dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
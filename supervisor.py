@@ -0,0 +1,348 @@
+# =========================================================
+# SR04 Groupe 9 - Projet
+# Fichier : supervisor.py
+# Description :
+#   Supervision des processus serveur / client lancés par run_all.py
+#   - Lancement avec l’interpréteur courant (sys.executable), pas le « python » du PATH
+#   - Sondes de disponibilité par protocole : HTTP, poignée de main WebSocket,
+#     CONNECT MQTT (CONNACK du broker), aller-retour de synchronisation avec le
+#     serveur MQTT (abonné et actif), connexion à la socket locale
+#   - Le client n’est lancé qu’une fois le serveur prêt (plus de time.sleep fixe)
+#   - Redémarrage automatique après un plantage, avec attente croissante (backoff)
+#   - Temps de démarrage mesurés et enregistrés dans startup_times.csv
+#   - CPU / RSS / changements de contexte / octets échantillonnés (resource_usage.py)
+# =========================================================
+
+import base64
+import csv
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from resource_usage import ResourceSampler
+
+STARTUP_LOG = "startup_times.csv"
+PROBE_INTERVAL = 0.1     # s entre deux sondes
+READY_TIMEOUT = 30.0     # s avant d’abandonner l’attente d’un serveur
+BACKOFF_BASE = 1.0       # première attente avant redémarrage (s)
+BACKOFF_MAX = 30.0       # attente maximale (s)
+STABLE_AFTER = 30.0      # un processus qui a tourné 30 s remet le backoff à zéro
+MAX_RESTARTS = 5         # au-delà : abandon (plantage en boucle)
+
+
+# =========================================================
+# 🔹 Sondes de disponibilité (bibliothèque standard uniquement)
+# =========================================================
+def http_probe(host="127.0.0.1", port=5000, path="/metrics", timeout=0.5):
+    """Prêt dès que le serveur répond à une requête HTTP (quel que soit le code)."""
+    def probe():
+        import http.client
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        try:
+            conn.request("GET", path)
+            conn.getresponse().read()
+            return True
+        finally:
+            conn.close()
+    return probe
+
+
+def ws_probe(host="127.0.0.1", port=5001, timeout=0.5):
+    """Prêt quand la poignée de main WebSocket aboutit (101 Switching Protocols)."""
+    def probe():
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = (f"GET / HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+                   f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                   f"Sec-WebSocket-Version: 13\r\n\r\n")
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.sendall(request.encode())
+            status = sock.recv(1024).split(b"\r\n", 1)[0]
+            return status.split()[1:2] == [b"101"]
+    return probe
+
+
+def mqtt_probe(host="localhost", port=1883, timeout=0.5):
+    """Prêt quand le broker accepte un CONNECT MQTT 3.1.1 (CONNACK code 0)."""
+    def probe():
+        client_id = b"sr04-probe"
+        variable = b"\x00\x04MQTT\x04\x02\x00\x05"   # protocole, niveau 4, clean session, keepalive 5 s
+        payload = len(client_id).to_bytes(2, "big") + client_id
+        body = variable + payload
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.sendall(b"\x10" + bytes([len(body)]) + body)
+            connack = sock.recv(4)
+            ok = len(connack) == 4 and connack[0] == 0x20 and connack[3] == 0
+            sock.sendall(b"\xe0\x00")  # DISCONNECT
+            return ok
+    return probe
+
+
+def _mqtt_packet(kind, body):
+    """Paquet MQTT : octet de type + longueur restante (entier variable) + corps."""
+    length, size = b"", len(body)
+    while True:
+        size, digit = divmod(size, 128)
+        length += bytes([digit | (0x80 if size else 0)])
+        if not size:
+            return bytes([kind]) + length + body
+
+
+def _mqtt_read(sock):
+    """Prochain paquet reçu : (type, corps)."""
+    def read(n):
+        data = b""
+        while len(data) < n:
+            chunk = sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("broker MQTT fermé")
+            data += chunk
+        return data
+    kind = read(1)[0]
+    size, shift = 0, 0
+    while True:
+        digit = read(1)[0]
+        size += (digit & 0x7F) << shift
+        shift += 7
+        if not digit & 0x80:
+            return kind, read(size)
+
+
+def _mqtt_string(text):
+    data = text.encode()
+    return len(data).to_bytes(2, "big") + data
+
+
+def mqtt_sync_probe(host="localhost", port=1883, topic="traffic/vehicle_count", timeout=1.0):
+    """
+    Prêt quand le serveur MQTT lui-même répond : abonnement à un topic de réponse,
+    publication d’un {"op": "sync"} sur `topic`, attente de la réponse relayée par le broker.
+    (Un broker déjà en service ne suffit pas : le serveur doit être abonné.)
+    """
+    def probe():
+        client_id = f"sr04-sync-{os.getpid()}-{time.monotonic_ns() % 10 ** 6}"
+        reply_topic = f"traffic/led/{client_id}"
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.sendall(_mqtt_packet(0x10, b"\x00\x04MQTT\x04\x02\x00\x05" + _mqtt_string(client_id)))
+            kind, body = _mqtt_read(sock)
+            if kind != 0x20 or body[1:2] != b"\x00":
+                return False
+            sock.sendall(_mqtt_packet(0x82, b"\x00\x01" + _mqtt_string(reply_topic) + b"\x00"))
+            if _mqtt_read(sock)[0] != 0x90:  # SUBACK : abonné avant de publier
+                return False
+            request = json.dumps({"op": "sync", "seq": -1, "reply_to": reply_topic}).encode()
+            sock.sendall(_mqtt_packet(0x30, _mqtt_string(topic) + request))
+            deadline = time.monotonic() + timeout
+            try:
+                while time.monotonic() < deadline:
+                    kind, body = _mqtt_read(sock)
+                    if kind & 0xF0 != 0x30:
+                        continue
+                    offset = 2 + int.from_bytes(body[:2], "big")
+                    if body[2:offset].decode(errors="replace") != reply_topic:
+                        continue
+                    if kind & 0x06:
+                        offset += 2  # identifiant de paquet (QoS > 0)
+                    try:
+                        return json.loads(body[offset:]).get("op") == "sync"
+                    except ValueError:
+                        return False
+                return False
+            finally:
+                sock.sendall(b"\xe0\x00")  # DISCONNECT
+    return probe
+
+
+def uds_probe(path, fallback=("127.0.0.1", 5002), timeout=0.5):
+    """Prêt quand la socket locale accepte une connexion."""
+    def probe():
+        if hasattr(socket, "AF_UNIX"):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                sock.connect(path)
+        else:
+            socket.create_connection(fallback, timeout=timeout).close()
+        return True
+    return probe
+
+
+# =========================================================
+# 🔹 Processus supervisé
+# =========================================================
+class ManagedProcess:
+    """Un script Python lancé, surveillé et relancé au besoin."""
+
+    def __init__(self, name, script, probe=None, ready_timeout=READY_TIMEOUT, restart=True):
+        self.name = name
+        self.script = script
+        self.probe = probe
+        self.ready_timeout = ready_timeout
+        self.restart = restart
+        self.proc = None
+        self.started_at = None
+        self.startup_time = None
+        self.restarts = 0
+        self.failures = 0          # plantages consécutifs (pour le backoff)
+        self.restart_at = None     # instant prévu du prochain redémarrage
+        self.gave_up = False
+
+    def start(self):
+        self.proc = subprocess.Popen([sys.executable, self.script])
+        self.started_at = time.monotonic()
+        self.startup_time = None
+        self.restart_at = None
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def wait_ready(self, cancelled=lambda: False):
+        """
+        Sonde le processus jusqu’à ce qu’il soit prêt.
+        :param cancelled: fonction renvoyant True pour interrompre l’attente (arrêt demandé)
+        :return: True si prêt, False si arrêté ou délai dépassé
+        """
+        if self.probe is None:
+            self.startup_time = 0.0
+            return self.alive()
+        deadline = self.started_at + self.ready_timeout
+        while time.monotonic() < deadline:
+            if cancelled() or not self.alive():
+                return False
+            try:
+                if self.probe():
+                    self.startup_time = time.monotonic() - self.started_at
+                    return True
+            except OSError:
+                pass  # pas encore à l’écoute
+            time.sleep(PROBE_INTERVAL)
+        return False
+
+    def stop(self, timeout=3):
+        self.restart_at = None
+        if not self.alive():
+            self.proc = None
+            return
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc = None
+
+    def backoff(self):
+        return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(0, self.failures - 1))
+
+
+# =========================================================
+# 🔹 Superviseur
+# =========================================================
+class Supervisor:
+    """
+    Démarre les processus dans l’ordre (chacun attend que le précédent soit prêt),
+    puis check() détecte les plantages et relance avec backoff.
+    """
+
+    def __init__(self, mode, on_event=print, startup_log=STARTUP_LOG, resources_path=None):
+        self.mode = mode
+        self.on_event = on_event
+        self.startup_log = startup_log
+        self.processes = []
+        self.lock = threading.Lock()
+        self.stopping = False
+        self.sampler = ResourceSampler(self.running, resources_path) if resources_path else None
+
+    def add(self, name, script, probe=None, **kwargs):
+        proc = ManagedProcess(name, script, probe, **kwargs)
+        self.processes.append(proc)
+        return proc
+
+    def _record(self, proc, ready):
+        new_file = not os.path.exists(self.startup_log)
+        try:
+            with open(self.startup_log, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(["timestamp", "mode", "process", "attempt", "ready", "startup_s"])
+                writer.writerow([time.time(), self.mode, proc.name, proc.restarts, int(ready),
+                                 round(proc.startup_time, 3) if proc.startup_time is not None else ""])
+        except OSError:
+            pass
+
+    def _launch(self, proc):
+        proc.start()
+        ready = proc.wait_ready(cancelled=lambda: self.stopping)
+        self._record(proc, ready)
+        if ready and proc.probe is None:
+            self.on_event(f"▶ {proc.name} lancé")
+        elif ready:
+            self.on_event(f"✅ {proc.name} prêt en {proc.startup_time:.2f} s")
+        else:
+            self.on_event(f"❌ {proc.name} pas prêt après {proc.ready_timeout:.0f} s")
+        return ready
+
+    def start_all(self):
+        """Lance les processus dans l’ordre ; s’arrête au premier qui n’est pas prêt."""
+        with self.lock:
+            self.stopping = False
+            for proc in self.processes:
+                if self.stopping:
+                    return False
+                if not self._launch(proc):
+                    return False
+            if self.sampler:
+                self.sampler.start()
+            return True
+
+    def check(self):
+        """À appeler périodiquement : détecte les plantages et relance au bon moment."""
+        with self.lock:
+            if self.stopping:
+                return
+            now = time.monotonic()
+            for proc in self.processes:
+                if proc.proc is None or proc.gave_up:
+                    continue
+                code = proc.proc.poll()
+                if code is None:
+                    if proc.failures and now - proc.started_at > STABLE_AFTER:
+                        proc.failures = 0
+                    continue
+                if code == 0 or not proc.restart:
+                    # Fermeture normale (ex. fenêtre du client quittée) : pas de relance
+                    self.on_event(f"🟡 {proc.name} arrêté (code {code}).")
+                    proc.proc = None
+                    continue
+                if proc.restart_at is None:
+                    proc.failures += 1
+                    if proc.restarts >= MAX_RESTARTS:
+                        proc.gave_up = True
+                        self.on_event(f"❌ {proc.name} planté {proc.restarts + 1} fois, abandon.")
+                        continue
+                    proc.restart_at = now + proc.backoff()
+                    self.on_event(f"⚠️ {proc.name} planté (code {code}), "
+                                  f"relance dans {proc.backoff():.1f} s.")
+                elif now >= proc.restart_at:
+                    proc.restarts += 1
+                    self._launch(proc)
+
+    def stop_all(self):
+        """Arrête les processus dans l’ordre inverse du lancement."""
+        self.stopping = True
+        if self.sampler:
+            self.sampler.stop()
+        with self.lock:
+            for proc in reversed(self.processes):
+                try:
+                    proc.stop()
+                except Exception:
+                    pass
+
+    def any_alive(self):
+        return any(proc.alive() for proc in self.processes)
+
+    def running(self):
+        """[(nom, pid), ...] des processus vivants (pour l’échantillonneur)"""
+        return [(proc.name, proc.proc.pid) for proc in self.processes if proc.alive()]